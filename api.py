@@ -1,40 +1,161 @@
-from fastapi import FastAPI, Query
+import os
+import time
+from datetime import datetime
+from fastapi import FastAPI, Query, HTTPException
 from fastapi.responses import JSONResponse
-from app.ingest import ingest_articles
-from app.reason import generate_podcast_script
-from app.speak import text_to_speech
-from fastapi.responses import FileResponse
+from app.pipeline import run_episode
+from app.jobs import JobQueue, public_view
+from app.metrics import METRICS
+from fastapi.responses import FileResponse, StreamingResponse
 
 app = FastAPI(
     title="News-to-Podcast API",
     description="Generate an AI-powered daily news podcast.",
-    version="1.0.0"
+    version="1.1.0"
 )
 
+
+EPISODES_DIR = "output"
+
+
+def episode_path(user: str, topic: str, minutes: int) -> str:
+    today = datetime.now().strftime("%Y-%m-%d")
+    return f"{EPISODES_DIR}/podcast_{user}_{topic}_{minutes}m_{today}.mp3"
+
+
+def run_job(user: str, topic: str, minutes: int) -> dict:
+    # jobs always stream the script into TTS; the finished file is the same either way
+    return run_episode(user=user, topic=topic, minutes=minutes, limit_per_feed=10,
+                       out_path=episode_path(user, topic, minutes), stream=True)
+
+
+def follow_audio(job: dict, path: str, poll: float = 0.2, block: int = 64 * 1024):
+    """
+    Yield the episode's MP3 bytes while the job is still writing them. The
+    job writes path + ".part" and renames it when done; an already open
+    handle keeps reading the same file across the rename.
+    """
+    partial = path + ".part"
+    f = None
+    while f is None:
+        done = job["future"].done()
+        if not done and os.path.exists(partial):
+            f = open(partial, "rb")
+        elif done:
+            if job["status"] != "done" or not os.path.exists(path):
+                return
+            f = open(path, "rb")
+        else:
+            time.sleep(poll)
+    with f:
+        while True:
+            done = job["future"].done()
+            data = f.read(block)
+            if data:
+                yield data
+            elif done:
+                return
+            else:
+                time.sleep(poll)
+
+
+jobs = JobQueue(run_job)
+
+
+@app.on_event("shutdown")
+def stop_workers():
+    jobs.shutdown()
+
+
 @app.get("/")
 def root():
     return {"message": "Welcome to the News-to-Podcast API"}
 
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    minutes: int = Query(5, ge=1, le=15),
+    topic: str = Query("general", description="Focus area, e.g. technology or politics"),
+    user: str = Query("default", description="User feed set from feeds/user_feeds.json"),
+):
+    """Queue a pipeline run; identical in-flight requests share one job."""
+    job = jobs.submit(user=user, topic=topic, minutes=minutes)
+    return {"job_id": job["id"], "status": job["status"]}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Stage timings, API call/token counters, cache hit rates and feed latencies since startup."""
+    view = METRICS.to_dict()
+    view["jobs"] = {status: sum(j["status"] == status for j in list(jobs.jobs.values()))
+                    for status in ("queued", "running", "done", "failed")}
+    return view
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return public_view(job)
+
+
+@app.get("/jobs/{job_id}/audio")
+async def job_audio(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if job["status"] == "failed":
+        return JSONResponse({"error": job["error"]}, status_code=500)
+    if job["status"] != "done":
+        return JSONResponse({"status": job["status"]}, status_code=409)
+
+    file_path = job["result"]["path"]
+    return FileResponse(
+        path=file_path,
+        media_type="audio/mpeg",
+        filename=file_path.split("/")[-1]
+    )
+
+
+@app.get("/episodes/{name}")
+def get_episode(name: str):
+    """Serve a finished episode from output/; emails link here when the MP3 is too large to attach."""
+    path = os.path.join(EPISODES_DIR, name)
+    if name != os.path.basename(name) or not name.endswith(".mp3") or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Unknown episode")
+    return FileResponse(path=path, media_type="audio/mpeg", filename=name)
+
+
+@app.get("/stream")
+def stream_podcast(
+    minutes: int = Query(5, ge=1, le=15),
+    topic: str = Query("general", description="Focus area, e.g. technology or politics"),
+    user: str = Query("default", description="User feed set from feeds/user_feeds.json"),
+):
+    """Start (or join) a job and send its audio as a chunked response while it is narrated."""
+    job = jobs.submit(user=user, topic=topic, minutes=minutes)
+    return StreamingResponse(
+        follow_audio(job, episode_path(user, topic, minutes)),
+        media_type="audio/mpeg",
+        headers={"X-Job-Id": job["id"]},
+    )
+
+
 @app.get("/generate")
 def generate_podcast(
     minutes: int = Query(5, ge=1, le=15),
     topic: str = Query("general", description="Focus area, e.g. technology or politics")
 ):
-    """Run full pipeline: ingest → summarize → synthesize."""
-    try:
-        article_count = ingest_articles(limit_per_feed=10)
-        if article_count == 0:
-            return JSONResponse(
-                {"error": "No articles found"}, status_code=404
-            )
-
-        script = generate_podcast_script(max_minutes=minutes, topic=topic)
-        file_path = text_to_speech(script)
-
-        return FileResponse(
-            path=file_path,
-            media_type="audio/mpeg",
-            filename=file_path.split("/")[-1]
-        )
-    except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=500)
+    """Run full pipeline: ingest → summarize → synthesize. Blocks; prefer POST /jobs."""
+    job = jobs.submit(user="default", topic=topic, minutes=minutes)
+    job = jobs.wait(job["id"])
+    if job["status"] == "failed":
+        return JSONResponse({"error": job["error"]}, status_code=500)
+
+    file_path = job["result"]["path"]
+    return FileResponse(
+        path=file_path,
+        media_type="audio/mpeg",
+        filename=file_path.split("/")[-1]
+    )
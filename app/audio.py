@@ -0,0 +1,133 @@
+import os
+import shutil
+import subprocess
+from datetime import datetime
+
+from app.mp3 import file_duration
+
+# spoken-word encodings; "raw" keeps whatever the TTS backend produced
+PROFILES = {
+    "speech": {"channels": 1, "sample_rate": 24000, "bitrate": "64k"},
+    "speech-low": {"channels": 1, "sample_rate": 22050, "bitrate": "40k"},
+    "high": {"channels": 2, "sample_rate": 44100, "bitrate": "128k"},
+    "raw": None,
+}
+AUDIO_PROFILE = os.getenv("PODCAST_AUDIO_PROFILE", "speech")
+# podcast loudness target (integrated LUFS), true-peak ceiling and loudness range
+LOUDNESS = float(os.getenv("PODCAST_LOUDNESS", "-16"))
+TRUE_PEAK = -1.5
+LOUDNESS_RANGE = 11
+FFMPEG = os.getenv("FFMPEG_BINARY", "ffmpeg")
+AUDIO_WORKERS = int(os.getenv("PODCAST_AUDIO_WORKERS", str(os.cpu_count() or 1)))
+
+CHAPTER_TITLE_CHARS = 60
+
+
+def chapter_title(segment: str, limit: int = CHAPTER_TITLE_CHARS) -> str:
+    """A short title for a script segment: its first sentence, cut at a word boundary."""
+    text = " ".join(segment.split())
+    sentence = text.split(". ", 1)[0].rstrip(".")
+    if len(sentence) <= limit:
+        return sentence
+    return sentence[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def ffmpeg_command(src: str, dst: str, profile: dict, loudness: float = LOUDNESS) -> list:
+    """
+    Re-encode src into dst with the profile's channels, sample rate and
+    bitrate. loudnorm runs in its dynamic (single-pass) mode, which adjusts
+    gain along the episode, so chunks narrated at different levels end up
+    at the same loudness. Source tags are dropped; chapters are written after.
+    """
+    return [
+        FFMPEG, "-hide_banner", "-loglevel", "error", "-y", "-i", src,
+        "-map_metadata", "-1", "-vn",
+        "-af", f"loudnorm=I={loudness}:TP={TRUE_PEAK}:LRA={LOUDNESS_RANGE}",
+        "-ac", str(profile["channels"]), "-ar", str(profile["sample_rate"]),
+        "-codec:a", "libmp3lame", "-b:a", profile["bitrate"],
+        "-f", "mp3", dst,
+    ]
+
+
+def write_tags(path: str, chapters, title: str, seconds: float) -> None:
+    """Replace the file's ID3 tag with a title, its length and one CHAP frame per chapter."""
+    from mutagen.id3 import ID3, CHAP, CTOC, CTOCFlags, TIT2, TPE1, TLEN
+
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text=[title]))
+    tags.add(TPE1(encoding=3, text=["News-to-Podcast"]))
+    tags.add(TLEN(encoding=3, text=[str(int(seconds * 1000))]))
+    ids = []
+    for i, chapter in enumerate(chapters):
+        ids.append(f"chp{i}")
+        tags.add(CHAP(element_id=ids[-1], start_time=int(chapter["start"] * 1000),
+                      end_time=int(chapter["end"] * 1000),
+                      sub_frames=[TIT2(encoding=3, text=[chapter["title"]])]))
+    if ids:
+        tags.add(CTOC(element_id="toc", flags=CTOCFlags.TOP_LEVEL | CTOCFlags.ORDERED,
+                      child_element_ids=ids, sub_frames=[TIT2(encoding=3, text=["Stories"])]))
+    tags.save(path)
+
+
+def postprocess(path: str, chapters=None, profile: str = AUDIO_PROFILE, title: str = None) -> dict:
+    """
+    Re-encode a stitched episode to a spoken-word profile, then tag it with
+    chapters and its exact duration (counted frame by frame). chapters are
+    {"title", "start", "end"} in seconds of the unprocessed audio; they are
+    rescaled to the encoded length. Without ffmpeg the audio is left as is
+    and only tagged. The result is always built in a new file and renamed
+    over path, never modified in place: /stream readers may still hold the
+    narrated file open. Runs in a worker process, so it returns plain data.
+    """
+    settings = PROFILES.get(profile, PROFILES["speech"])
+    chapters = [dict(c) for c in chapters or []]
+    title = title or os.path.splitext(os.path.basename(path))[0]
+    bytes_in = os.path.getsize(path)
+    raw_seconds = file_duration(path)
+
+    tmp = path + ".processing.mp3"
+    encoded = False
+    try:
+        if settings and shutil.which(FFMPEG):
+            try:
+                subprocess.run(ffmpeg_command(path, tmp, settings), check=True, capture_output=True)
+                encoded = True
+            except subprocess.CalledProcessError as e:
+                print(f"[AUDIO] ffmpeg failed ({e.stderr.decode(errors='replace').strip()[-200:]}); "
+                      f"keeping the unprocessed audio")
+        elif settings:
+            print(f"[AUDIO] {FFMPEG} not found; skipping re-encoding and loudness normalization")
+        if not encoded:
+            shutil.copyfile(path, tmp)
+
+        seconds = file_duration(tmp) if encoded else raw_seconds
+        scale = seconds / raw_seconds if raw_seconds else 1.0
+        for chapter in chapters:
+            chapter["start"] = round(min(chapter["start"] * scale, seconds), 3)
+            chapter["end"] = round(min(chapter["end"] * scale, seconds), 3)
+        write_tags(tmp, chapters, title, seconds)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    return {"path": path, "profile": profile if encoded else "raw", "duration": round(seconds, 3),
+            "bytes_in": bytes_in, "bytes_out": os.path.getsize(path), "chapters": chapters}
+
+
+def process_episode(path: str, chapters=None, profile: str = AUDIO_PROFILE, pool=None) -> dict:
+    """
+    Post-process an episode in the shared process pool and wait for it. Each
+    episode's encode runs in its own worker, so concurrent users in a batch
+    use separate cores.
+    """
+    if pool is None:
+        from app.resources import get_audio_pool
+        pool = get_audio_pool()
+    title = f"News Podcast — {datetime.now().strftime('%B %d, %Y')}"
+    result = pool.submit(postprocess, path, chapters, profile, title).result()
+    saved = result["bytes_in"] - result["bytes_out"]
+    print(f"[AUDIO] {os.path.basename(path)}: {result['duration']:.1f}s, {len(result['chapters'])} chapters, "
+          f"{result['bytes_out'] / 1e6:.1f} MB ({result['profile']}"
+          f"{f', {saved / 1e6:.1f} MB smaller' if saved > 0 else ''})")
+    return result
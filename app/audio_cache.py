@@ -0,0 +1,121 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+import unicodedata
+from pathlib import Path
+
+from app.metrics import incr
+
+AUDIO_CACHE_DIR = Path("cache/audio")
+AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", "500"))
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a segment so trivially different spellings share audio."""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+
+def segment_key(text: str, voice: str, model: str) -> str:
+    base = f"{model}\0{voice}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(base).hexdigest()
+
+
+class AudioCache:
+    """
+    Content-addressed store of synthesized segments, one MP3 per key.
+    Reads bump the file's mtime, and eviction drops the least recently used
+    files once the directory grows past max_bytes. Keys pinned by an episode
+    still being stitched are never evicted, whichever episode runs evict().
+    """
+
+    def __init__(self, directory=AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pins = {}   # key -> number of in-flight episodes using it
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.size = sum(p.stat().st_size for p in self.directory.glob("*/*.mp3"))
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.mp3"
+
+    def pin(self, key: str) -> None:
+        """Keep key's file out of eviction until a matching unpin()."""
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key: str) -> None:
+        with self._lock:
+            count = self._pins.pop(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+
+    def get(self, key: str):
+        """Return the cached file for key (marking it recently used), or None."""
+        path = self.path_for(key)
+        with self._lock:
+            if path.exists():
+                os.utime(path)
+                self.hits += 1
+                incr("audio_cache.hits")
+                return str(path)
+            self.misses += 1
+            incr("audio_cache.misses")
+            return None
+
+    def put(self, key: str, src_path: str) -> str:
+        """
+        Move a freshly synthesized file into the cache and return its cached
+        path. Workers narrating the same segment at once each stage into their
+        own temp file; the first to finish is kept and the others are dropped.
+        """
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f"{key}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.move(src_path, tmp)
+            with self._lock:
+                if not path.exists():
+                    os.replace(tmp, path)
+                    self.size += path.stat().st_size
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return str(path)
+
+    def evict(self) -> int:
+        """Delete least recently used segments until the cache fits in max_bytes."""
+        with self._lock:
+            if self.size <= self.max_bytes:
+                return 0
+            files = sorted(self.directory.glob("*/*.mp3"), key=lambda p: p.stat().st_mtime)
+            removed = 0
+            for path in files:
+                if self.size <= self.max_bytes:
+                    break
+                if path.stem in self._pins:
+                    continue
+                size = path.stat().st_size
+                path.unlink(missing_ok=True)
+                self.size -= size
+                removed += 1
+            return removed
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache() -> AudioCache:
+    """Shared audio cache for the process."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AudioCache()
+        return _cache
@@ -0,0 +1,99 @@
+import os
+import json
+import shutil
+from pathlib import Path
+from datetime import datetime, timezone
+
+RUNS_DIR = Path(os.getenv("PODCAST_RUNS_DIR", "data/runs"))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def run_id(user: str, topic: str = "general", minutes: int = 10, day: str = None) -> str:
+    """Runs are keyed by what they produce, so a retry the same day finds the failed run."""
+    day = day or datetime.now().strftime("%Y-%m-%d")
+    return f"{user}_{topic}_{minutes}m_{day}"
+
+
+def _write_json(path: Path, value) -> None:
+    # write-then-rename, so a crash never leaves a half-written checkpoint behind
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(value, f, indent=2)
+    os.replace(tmp, path)
+
+
+class RunManifest:
+    """
+    On-disk record of one pipeline run: which stages have finished, with each
+    stage's output in its own JSON file next to the manifest. A resumed run
+    loads finished stages instead of repeating them; a fresh run with the
+    same id discards the old checkpoints. Stage files are written before
+    the manifest names them, so the manifest never points at a partial file.
+    """
+
+    def __init__(self, run_id: str, directory=RUNS_DIR, resume: bool = False, params: dict = None):
+        self.id = run_id
+        self.dir = Path(directory) / run_id
+        self.path = self.dir / "manifest.json"
+        self.data = None
+        if resume and self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+            print(f"[CHECKPOINT] Resuming run {run_id} ({self.data['status']}); "
+                  f"finished stages: {', '.join(self.data['stages']) or 'none'}")
+        if self.data is None:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.data = {"run_id": run_id, "params": params or {}, "created_at": _now(),
+                         "attempts": 0, "stages": {}}
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.data.update(status="running", error=None, attempts=self.data["attempts"] + 1, updated_at=_now())
+        self._write()
+
+    def _write(self) -> None:
+        _write_json(self.path, self.data)
+
+    @property
+    def status(self) -> str:
+        return self.data["status"]
+
+    def done(self, stage: str) -> bool:
+        entry = self.data["stages"].get(stage)
+        return bool(entry) and (self.dir / entry["file"]).exists()
+
+    def load(self, stage: str):
+        with open(self.dir / self.data["stages"][stage]["file"], "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, stage: str, value) -> None:
+        name = f"{stage}.json"
+        _write_json(self.dir / name, value)
+        self.data["stages"][stage] = {"file": name, "saved_at": _now()}
+        self.data["updated_at"] = _now()
+        self._write()
+
+    def discard(self, stage: str) -> None:
+        """Forget a finished stage (its output turned out to be unusable) so it runs again."""
+        self.data["stages"].pop(stage, None)
+        self._write()
+
+    def finish(self) -> None:
+        self.data.update(status="done", updated_at=_now())
+        self._write()
+
+    def fail(self, error) -> None:
+        self.data.update(status="failed", error=str(error), updated_at=_now())
+        self._write()
+
+
+def checkpointed(manifest, stage: str, produce):
+    """produce()'s value, loaded from the manifest if the stage already finished, else run and saved."""
+    if manifest is not None and manifest.done(stage):
+        print(f"[CHECKPOINT] Skipping {stage} (finished in an earlier attempt)")
+        return manifest.load(stage)
+    value = produce()
+    if manifest is not None:
+        manifest.save(stage, value)
+    return value
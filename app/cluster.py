@@ -1,26 +1,51 @@
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.cluster import AgglomerativeClustering
+import os
+import json
+import time
+from pathlib import Path
+
 import numpy as np
 
+STORY_INDEX_PATH = Path("data/stories")
+
+# above this many articles the O(n^2) agglomerative pass is swapped for centroid assignment
+AGGLOMERATIVE_LIMIT = 2000
+# rows per matrix block so large batches never materialize a full n x k similarity matrix
+BLOCK_SIZE = 4096
+
+
+def _normalize(embeddings) -> np.ndarray:
+    x = np.asarray(embeddings, dtype=np.float32)
+    if x.ndim == 1:
+        x = x.reshape(1, -1)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
 def cluster_articles(embeddings, articles, threshold=0.6):
     """
     Group similar articles based on embedding similarity.
     Returns a list of clusters, where each cluster is a list of article dicts.
+    `embeddings` must be the vectors of `articles`, row for row.
     """
     if len(embeddings) <= 1:
         return [articles]
+    if len(embeddings) != len(articles):
+        raise ValueError(f"got {len(embeddings)} embeddings for {len(articles)} articles")
 
-    # compute similarity matrix
-    sims = cosine_similarity(embeddings)
-    
-    # cluster based on similarity threshold
-    clustering = AgglomerativeClustering(
-        n_clusters=None,
-        distance_threshold=1 - threshold,  # convert similarity to distance
-        metric="cosine",
-        linkage="average"
-    )
-    labels = clustering.fit_predict(embeddings)
+    if len(embeddings) <= AGGLOMERATIVE_LIMIT:
+        from sklearn.cluster import AgglomerativeClustering
+
+        # cluster based on similarity threshold
+        clustering = AgglomerativeClustering(
+            n_clusters=None,
+            distance_threshold=1 - threshold,  # convert similarity to distance
+            metric="cosine",
+            linkage="average"
+        )
+        labels = clustering.fit_predict(np.asarray(embeddings))
+    else:
+        labels = StoryIndex(path=None, threshold=threshold).assign(embeddings)
 
     # group by cluster
     clusters = {}
@@ -28,3 +53,153 @@ def cluster_articles(embeddings, articles, threshold=0.6):
         clusters.setdefault(label, []).append(article)
 
     return list(clusters.values())
+
+
+class StoryIndex:
+    """
+    Persistent story clusters kept as a centroid matrix.
+
+    New articles join the closest story if its centroid is similar enough,
+    otherwise they start a new story, so each day only the new vectors are
+    compared against existing centroids instead of re-clustering everything.
+    """
+
+    def __init__(self, path=STORY_INDEX_PATH, threshold=0.6, max_age_days=7):
+        self.path = Path(path) if path else None
+        self.threshold = threshold
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.stories = []   # one dict per centroid row: id, count, last_seen, title
+        self.members = {}   # article id -> story id
+        self._next_id = 0
+        self._generation = 0   # numbers the centroid file stories.json pairs with
+        if self.path:
+            self._load()
+
+    def _load(self):
+        meta_path = self.path / "stories.json"
+        if not meta_path.exists():
+            return
+        with meta_path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        centroids_path = self.path / data.get("centroids", "centroids.npy")
+        centroids = np.load(centroids_path) if centroids_path.exists() else None
+        if centroids is None or len(centroids) != len(data["stories"]):
+            # an older save that was interrupted between writing its two files
+            print(f"[CLUSTER] {self.path} has centroids that do not match its stories; starting a fresh index")
+            return
+        self.stories = data["stories"]
+        self.members = data["members"]
+        self._next_id = data["next_id"]
+        self._generation = data.get("generation", 0)
+        self.centroids = centroids
+
+    def save(self):
+        """
+        Write the centroids under a new generation's file name, then the
+        stories.json that names it, so the two are replaced as a pair: a crash
+        in between leaves the previous stories.json and its centroids in place.
+        """
+        if not self.path:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        generation = self._generation + 1
+        name = f"centroids.{generation}.npy"
+        np.save(self.path / name, self.centroids)
+        tmp = self.path / "stories.tmp"
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"stories": self.stories, "members": self.members, "next_id": self._next_id,
+                       "generation": generation, "centroids": name}, f)
+        os.replace(tmp, self.path / "stories.json")
+        self._generation = generation
+        for path in self.path.glob("centroids*.npy"):
+            if path.name != name:
+                path.unlink(missing_ok=True)
+
+    def __len__(self):
+        return len(self.stories)
+
+    def assign(self, embeddings, ids=None, titles=None) -> list:
+        """Assign each vector to a story and return the story id per row."""
+        x = _normalize(embeddings)
+        n = len(x)
+        if n == 0:
+            return []
+        now = time.time()
+        rows = np.full(n, -1, dtype=np.int64)
+
+        # articles seen on a previous day keep their story and are not counted twice
+        known = np.zeros(n, dtype=bool)
+        if ids is not None:
+            index_of = {s["id"]: r for r, s in enumerate(self.stories)}
+            for i, article_id in enumerate(ids):
+                row = index_of.get(self.members.get(article_id))
+                if row is not None:
+                    rows[i] = row
+                    known[i] = True
+
+        # 1) one blocked matmul against the existing centroids
+        fresh = np.flatnonzero(rows < 0)
+        if len(self.stories) and len(fresh):
+            for start in range(0, len(fresh), BLOCK_SIZE):
+                block = fresh[start:start + BLOCK_SIZE]
+                sims = x[block] @ self.centroids.T
+                best = sims.argmax(axis=1)
+                ok = sims[np.arange(len(block)), best] >= self.threshold
+                rows[block[ok]] = best[ok]
+
+        # 2) leftovers are leader-clustered against the stories opened in this batch
+        leftovers = np.flatnonzero(rows < 0)
+        if len(leftovers):
+            first_new = len(self.stories)
+            leaders = np.empty((len(leftovers), x.shape[1]), dtype=np.float32)
+            m = 0
+            for i in leftovers:
+                if m:
+                    sims = leaders[:m] @ x[i]
+                    best = int(sims.argmax())
+                    if sims[best] >= self.threshold:
+                        rows[i] = first_new + best
+                        continue
+                leaders[m] = x[i]
+                rows[i] = first_new + m
+                m += 1
+                self.stories.append({"id": self._next_id, "count": 0, "last_seen": now,
+                                     "title": titles[i] if titles else None})
+                self._next_id += 1
+            self.centroids = leaders[:m].copy() if self.centroids.size == 0 \
+                else np.vstack([self.centroids, leaders[:m]])
+
+        # 3) running-mean centroid update, renormalized so dot products stay cosine
+        update = ~known
+        sums = np.zeros_like(self.centroids)
+        np.add.at(sums, rows[update], x[update])
+        counts = np.bincount(rows[update], minlength=len(self.stories))
+        for row in np.flatnonzero(counts):
+            story = self.stories[row]
+            total = story["count"] + counts[row]
+            self.centroids[row] = (self.centroids[row] * story["count"] + sums[row]) / total
+            story["count"] = int(total)
+        self.centroids = _normalize(self.centroids)
+        for row in np.unique(rows):
+            self.stories[row]["last_seen"] = now
+
+        story_ids = [self.stories[r]["id"] for r in rows]
+        if ids is not None:
+            for article_id, story_id in zip(ids, story_ids):
+                self.members[article_id] = story_id
+        return story_ids
+
+    def expire(self):
+        """Drop stories that have not received an article within max_age."""
+        if not self.max_age or not self.stories:
+            return 0
+        cutoff = time.time() - self.max_age
+        keep = [r for r, s in enumerate(self.stories) if s["last_seen"] >= cutoff]
+        dropped = len(self.stories) - len(keep)
+        if dropped:
+            live = {self.stories[r]["id"] for r in keep}
+            self.stories = [self.stories[r] for r in keep]
+            self.centroids = self.centroids[keep]
+            self.members = {a: s for a, s in self.members.items() if s in live}
+        return dropped
@@ -1,53 +1,313 @@
 import os
+import re
+import time
+import base64
 import smtplib
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+from email.header import Header
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+from email.policy import SMTP as SMTP_POLICY
+from email.utils import formatdate, make_msgid
 from dotenv import load_dotenv
 
+from app.metrics import incr
+
 load_dotenv()
 
-def send_email(file_path: str, subject: str = "Your Daily News Podcast") -> None:
-    """Send the generated MP3 file as an email attachment."""
-    EMAIL_USER = os.getenv("EMAIL_USER")
-    EMAIL_PASS = os.getenv("EMAIL_PASS")
-    RECIPIENT_EMAIL = os.getenv("RECIPIENT_EMAIL")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+# local relays and the bench SMTP sink do not speak TLS
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+# servers cap messages per connection (Gmail at about 100); reconnect before hitting it
+SMTP_BATCH_SIZE = int(os.getenv("SMTP_BATCH_SIZE", "50"))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+# idle connections are dropped by the server after a few minutes, so stale ones are not reused
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "60"))
+
+# Gmail rejects messages over 25 MB, and base64 grows the attachment by a third
+MAX_ATTACHMENT_BYTES = int(float(os.getenv("EMAIL_MAX_ATTACHMENT_MB", "18")) * 1024 * 1024)
+# larger episodes are sent as a link to the API's /episodes route instead
+EPISODE_BASE_URL = os.getenv("EPISODE_BASE_URL", "http://localhost:8000/episodes")
+
+BODY = "Here's your automatically generated news podcast for today."
+LINK_BODY = ("Here's your automatically generated news podcast for today.\n\n"
+             "The episode is too large to attach; listen or download it here:\n{url}")
+
+# 57 input bytes make one 76-character base64 line; read many lines per block
+_LINE_BYTES = 57
+_READ_BLOCK = _LINE_BYTES * 1024
+
+
+def recipients_for(user: str = None) -> list:
+    """The user's "email" from user_feeds.json, else the comma-separated RECIPIENT_EMAIL."""
+    configured = None
+    if user:
+        from app.relevance import load_user_config
+        configured = load_user_config(user).get("email")
+    configured = configured or os.getenv("RECIPIENT_EMAIL") or ""
+    if isinstance(configured, str):
+        configured = configured.split(",")
+    return [r.strip() for r in configured if r and r.strip()]
+
+
+def episode_url(file_path: str, base_url: str = None) -> str:
+    return f"{(base_url or EPISODE_BASE_URL).rstrip('/')}/{quote(os.path.basename(file_path))}"
+
+
+def _dot_stuff(data: bytes) -> bytes:
+    # SMTP DATA ends at a line holding a single "."; any line starting with "." is escaped
+    data = re.sub(rb"(?:\r\n|\n|\r(?!\n))", b"\r\n", data)
+    return re.sub(rb"(?m)^\.", b"..", data)
+
+
+def iter_base64(path: str, block: int = _READ_BLOCK):
+    """Base64 of a file in CRLF-terminated 76-character lines, read from disk a block at a time."""
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(block)
+            if not data:
+                return
+            encoded = base64.b64encode(data)
+            yield b"".join(encoded[i:i + 76] + b"\r\n" for i in range(0, len(encoded), 76))
+
+
+def message_chunks(sender: str, recipients, subject: str, body: str, attachment: str = None):
+    """
+    The message's bytes, ready for DATA: headers and the text part first,
+    then the attachment encoded while it is read, so an episode is never
+    held in memory whole (or twice, as raw and encoded copies).
+    """
+    boundary = "=_" + make_msgid(domain="podcast")[1:-1].replace("@", ".")
+    head = (
+        f"From: {sender}\r\n"
+        f"To: {', '.join(recipients)}\r\n"
+        f"Subject: {Header(subject).encode()}\r\n"
+        f"Date: {formatdate(localtime=True)}\r\n"
+        f"Message-ID: {make_msgid(domain='podcast')}\r\n"
+        "MIME-Version: 1.0\r\n"
+        f'Content-Type: multipart/mixed; boundary="{boundary}"\r\n'
+        "\r\n"
+        f"--{boundary}\r\n"
+    ).encode()
+    text = MIMEText(body, "plain", "utf-8").as_bytes(policy=SMTP_POLICY)
+    yield _dot_stuff(head + text + b"\r\n")
+
+    if attachment:
+        name = os.path.basename(attachment)
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Type: audio/mpeg; name="{name}"\r\n'
+            "Content-Transfer-Encoding: base64\r\n"
+            f'Content-Disposition: attachment; filename="{name}"\r\n'
+            "\r\n"
+        ).encode()
+        # base64 lines never start with ".", so they need no dot-stuffing
+        yield from iter_base64(attachment)
+    yield f"--{boundary}--\r\n".encode()
+
+
+class SMTPSession:
+    """
+    One logged-in SMTP connection that sends many messages. It connects on
+    first use, reconnects once if the server dropped it, and starts a fresh
+    connection after max_messages so the server's per-connection cap is
+    never reached.
+    """
+
+    def __init__(self, user: str, password: str, host: str = None, port: int = None,
+                 starttls: bool = None, max_messages: int = SMTP_BATCH_SIZE, timeout: float = SMTP_TIMEOUT):
+        self.user = user
+        self.password = password
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.server = None
+        self.sent = 0
+        self.last_used = time.monotonic()
+        # set once a message's DATA is under way; past that the server may already have queued it
+        self.data_started = False
 
-    if not all([EMAIL_USER, EMAIL_PASS, RECIPIENT_EMAIL]):
+    def connect(self) -> None:
+        self.close()
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.server, self.sent = server, 0
+        incr("email.sessions")
+
+    def close(self) -> None:
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                self.server.close()
+            self.server = None
+
+    def send(self, recipients, open_chunks) -> None:
+        """Send one message; open_chunks() returns its bytes, again if the send is retried."""
+        if self.server is None or self.sent >= self.max_messages:
+            self.connect()
+        try:
+            self._send(recipients, open_chunks())
+        except smtplib.SMTPServerDisconnected:
+            if self.data_started:
+                # the message may have been queued before the reply was lost; a resend could duplicate it
+                self.server = None
+                raise
+            # an idle connection the server already closed; nothing was accepted, so resend
+            self.connect()
+            self._send(recipients, open_chunks())
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+    def _send(self, recipients, chunks) -> None:
+        server = self.server
+        self.data_started = False
+        code, response = server.mail(self.user)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(code, response, self.user)
+        for recipient in recipients:
+            code, response = server.rcpt(recipient)
+            if code not in (250, 251):
+                server.rset()
+                raise smtplib.SMTPRecipientsRefused({recipient: (code, response)})
+        self.data_started = True
+        server.putcmd("data")
+        code, response = server.getreply()
+        if code != 354:
+            server.rset()
+            raise smtplib.SMTPDataError(code, response)
+        for chunk in chunks:
+            server.send(chunk)
+        server.send(b".\r\n")
+        code, response = server.getreply()
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPDataError(code, response)
+
+
+class SMTPPool:
+    """
+    Reusable SMTP sessions shared by every delivery in the process. A caller
+    borrows a session for a batch of messages and returns it; up to `size`
+    idle sessions are kept, and ones idle past idle_seconds are closed
+    rather than reused.
+    """
+
+    def __init__(self, user: str = None, password: str = None, size: int = SMTP_POOL_SIZE,
+                 idle_seconds: float = SMTP_IDLE_SECONDS, **session_options):
+        self.user = user or os.getenv("EMAIL_USER")
+        self.password = password or os.getenv("EMAIL_PASS")
+        self.size = size
+        self.idle_seconds = idle_seconds
+        self.session_options = session_options
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.user and self.password)
+
+    @contextmanager
+    def session(self):
+        session = None
+        with self._lock:
+            while self._idle and session is None:
+                candidate = self._idle.pop()
+                if time.monotonic() - candidate.last_used > self.idle_seconds:
+                    candidate.close()
+                else:
+                    session = candidate
+        session = session or SMTPSession(self.user, self.password, **self.session_options)
+        try:
+            yield session
+        except Exception:
+            session.close()
+            raise
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(session)
+                return
+        session.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.close()
+
+
+def send_episodes(deliveries, pool: SMTPPool = None,
+                  max_attachment_bytes: int = MAX_ATTACHMENT_BYTES, base_url: str = None) -> list:
+    """
+    Send a batch of episode emails over one pooled session. Each delivery is
+    {"path", "to", "subject"}; episodes larger than max_attachment_bytes go
+    out as a link instead of an attachment. Returns one
+    {"sent", "linked", "seconds", "error"} per delivery, in order.
+    """
+    if pool is None:
+        from app.resources import get_smtp_pool
+        pool = get_smtp_pool()
+    if not pool.configured:
         print("[DELIVERY] Missing email credentials in .env — aborting.")
-        return
-
-    print(f"[DELIVERY] Sending from {EMAIL_USER} → {RECIPIENT_EMAIL}")
-
-    msg = MIMEMultipart()
-    msg["From"] = EMAIL_USER
-    msg["To"] = RECIPIENT_EMAIL
-    msg["Subject"] = subject
-
-    body = "Here's your automatically generated news podcast for today."
-    msg.attach(MIMEText(body, "plain"))
-
-    # Attach the file
-    try:
-        with open(file_path, "rb") as attachment:
-            part = MIMEBase("application", "octet-stream")
-            part.set_payload(attachment.read())
-            encoders.encode_base64(part)
-            part.add_header(
-                "Content-Disposition",
-                f"attachment; filename={os.path.basename(file_path)}"
-            )
-            msg.attach(part)
-    except FileNotFoundError:
-        print(f"[DELIVERY] Attachment not found: {file_path}")
-        return
-
-    try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(EMAIL_USER, EMAIL_PASS)
-            server.send_message(msg)
-        print("[DELIVERY] Email sent successfully!")
-    except Exception as e:
-        print(f"[DELIVERY] Failed to send email: {e}")
+        return [{"sent": False, "linked": False, "seconds": 0.0, "error": "missing credentials"}
+                for _ in deliveries]
+
+    results = []
+    with pool.session() as session:
+        for delivery in deliveries:
+            path, recipients = delivery["path"], delivery["to"]
+            subject = delivery.get("subject", "Your Daily News Podcast")
+            result = {"sent": False, "linked": False, "seconds": 0.0, "error": None}
+            results.append(result)
+            start = time.perf_counter()
+
+            if not recipients:
+                result["error"] = "no recipients"
+                print(f"[DELIVERY] No recipients for {path} — skipping.")
+                continue
+            if not os.path.exists(path):
+                result["error"] = "attachment not found"
+                print(f"[DELIVERY] Attachment not found: {path}")
+                continue
+
+            size = os.path.getsize(path)
+            if size > max_attachment_bytes:
+                result["linked"] = True
+                body, attachment = LINK_BODY.format(url=episode_url(path, base_url)), None
+            else:
+                body, attachment = BODY, path
+
+            print(f"[DELIVERY] Sending from {session.user} → {', '.join(recipients)}"
+                  f"{' (link, ' + str(size // (1024 * 1024)) + ' MB episode)' if result['linked'] else ''}")
+            try:
+                session.send(recipients, lambda: message_chunks(session.user, recipients, subject, body, attachment))
+                result["sent"] = True
+                incr("email.sent")
+                incr("email.linked" if result["linked"] else "email.attached")
+                print("[DELIVERY] Email sent successfully!")
+            except Exception as e:
+                result["error"] = str(e)
+                incr("email.failed")
+                print(f"[DELIVERY] Failed to send email: {e}")
+                # the connection may be in an unknown state; the next message starts a new one
+                session.close()
+            result["seconds"] = time.perf_counter() - start
+    return results
+
+
+def send_email(file_path: str, subject: str = "Your Daily News Podcast", recipients=None) -> bool:
+    """Send the generated MP3 file as an email attachment (or a link, if it is too large)."""
+    recipients = recipients or recipients_for()
+    return send_episodes([{"path": file_path, "to": recipients, "subject": subject}])[0]["sent"]
@@ -0,0 +1,226 @@
+import os
+import re
+import hashlib
+
+import numpy as np
+
+from app.metrics import incr, stage, ThreadPool
+
+EMBED_MODEL = "text-embedding-3-small"
+
+# OpenAI embeddings limits: 2048 inputs and ~300k tokens per request, 8191 tokens per input
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300_000
+MAX_TOKENS_PER_INPUT = 8191
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def cache_key(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def make_batches(texts, max_inputs=MAX_INPUTS_PER_REQUEST, max_tokens=MAX_TOKENS_PER_REQUEST):
+    """Split texts into lists of indices that each fit in one embeddings request."""
+    batches, current, current_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = min(estimate_tokens(text), MAX_TOKENS_PER_INPUT)
+        if current and (len(current) >= max_inputs or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+# vector size of each OpenAI embedding model, needed before the first request
+OPENAI_EMBED_DIMS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+
+LOCAL_EMBED_MODEL = os.getenv("LOCAL_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBED_BATCH = int(os.getenv("LOCAL_EMBED_BATCH", "64"))
+# 0 leaves the thread count to torch/onnxruntime (all physical cores)
+LOCAL_EMBED_THREADS = int(os.getenv("LOCAL_EMBED_THREADS", "0"))
+# an ONNX file in the model repo (e.g. onnx/model_qint8_avx512.onnx for the int8 build), or 1 for onnx/model.onnx
+LOCAL_EMBED_ONNX = os.getenv("LOCAL_EMBED_ONNX", "")
+
+
+class OpenAIEmbeddingBackend:
+    """Embeddings over the OpenAI API; the service fans batches out across threads."""
+
+    name = "openai"
+
+    def __init__(self, client, model=EMBED_MODEL, rate_limiter=None,
+                 concurrency=EMBED_CONCURRENCY, max_inputs=MAX_INPUTS_PER_REQUEST,
+                 max_tokens=MAX_TOKENS_PER_REQUEST):
+        self.client = client
+        self.model = model
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.max_inputs = max_inputs
+        self.max_tokens = max_tokens
+        self.dimension = OPENAI_EMBED_DIMS.get(model)
+
+    def embed_batch(self, texts) -> list:
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        response = self.client.embeddings.create(input=texts, model=self.model)
+        incr("embeddings.requests")
+        incr("embeddings.inputs", len(texts))
+        usage = getattr(response, "usage", None)
+        incr("embeddings.tokens", usage.total_tokens if usage else sum(estimate_tokens(t) for t in texts))
+        # the API may return items out of order, so sort by their index
+        data = sorted(response.data, key=lambda d: d.index)
+        return [d.embedding for d in data]
+
+
+def load_local_model(name: str = LOCAL_EMBED_MODEL, threads: int = LOCAL_EMBED_THREADS,
+                     onnx_file: str = LOCAL_EMBED_ONNX):
+    """
+    Load a sentence-transformers model for CPU inference, through ONNX Runtime
+    when onnx_file is set and that backend is installed, otherwise torch.
+    Call through app.resources.get_local_model so each process loads it once.
+    """
+    if threads:
+        # onnxruntime and torch both read this when their thread pools start
+        os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+    from sentence_transformers import SentenceTransformer
+
+    if onnx_file:
+        try:
+            kwargs = {} if onnx_file == "1" else {"file_name": onnx_file}
+            model = SentenceTransformer(name, device="cpu", backend="onnx", model_kwargs=kwargs)
+            print(f"[EMBED] Loaded {name} with ONNX Runtime ({onnx_file})")
+            return model
+        except Exception as e:
+            print(f"[EMBED] ONNX model unavailable ({e}); falling back to torch")
+
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+    model = SentenceTransformer(name, device="cpu")
+    print(f"[EMBED] Loaded {name} on CPU ({torch.get_num_threads()} threads)")
+    return model
+
+
+class LocalEmbeddingBackend:
+    """
+    sentence-transformers on the local CPU. One model instance already uses
+    every core, so the service sends it large slices sequentially and encode()
+    splits them into length-sorted batches of batch_size.
+    """
+
+    name = "local"
+    concurrency = 1
+    max_tokens = 10_000_000
+
+    def __init__(self, model=LOCAL_EMBED_MODEL, batch_size=LOCAL_EMBED_BATCH, encoder=None):
+        if encoder is None:
+            from app.resources import get_local_model
+            encoder = get_local_model(model)
+        self.model = model
+        self.encoder = encoder
+        self.batch_size = batch_size
+        self.max_inputs = batch_size * 16
+        self.dimension = encoder.get_sentence_embedding_dimension()
+
+    def embed_batch(self, texts):
+        incr("embeddings.requests")
+        incr("embeddings.inputs", len(texts))
+        return self.encoder.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True,
+                                   convert_to_numpy=True, show_progress_bar=False)
+
+
+def get_embedding_backend(name: str = None):
+    """Pick an embedding backend from PODCAST_EMBED_BACKEND (openai or local)."""
+    name = name or os.getenv("PODCAST_EMBED_BACKEND", "openai")
+    if name == "local":
+        return LocalEmbeddingBackend()
+    if name == "openai":
+        from app.resources import get_openai_client, get_rate_limiter
+        return OpenAIEmbeddingBackend(get_openai_client(), rate_limiter=get_rate_limiter())
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+def embedding_space(backend) -> str:
+    """
+    Name of the vector space a backend produces, used to keep Chroma
+    collections, vector caches and story indexes apart per model and
+    dimension. The default OpenAI model keeps the original unsuffixed names.
+    """
+    if backend.name == "openai" and backend.model == EMBED_MODEL:
+        return ""
+    slug = re.sub(r"[^a-z0-9]+", "-", backend.model.lower().split("/")[-1]).strip("-")
+    return f"{slug}_{backend.dimension}"
+
+
+class EmbeddingService:
+    """
+    Gathers every text that needs a vector for a pipeline step, serves what it
+    can from the cache and embeds the rest in as few batched requests as the
+    backend allows.
+    """
+
+    def __init__(self, backend, cache=None, concurrency=None, max_inputs=None, max_tokens=None):
+        self.backend = backend
+        self.model = backend.model
+        self.cache = cache
+        self.concurrency = concurrency or backend.concurrency
+        self.max_inputs = max_inputs or backend.max_inputs
+        self.max_tokens = max_tokens or backend.max_tokens
+        self.requests = 0
+
+    def _request(self, texts):
+        self.requests += 1
+        return self.backend.embed_batch(texts)
+
+    def embed(self, texts) -> np.ndarray:
+        """Embed texts without the cache, batched and run concurrently."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # the API rejects empty strings and over-long inputs
+        clean = [(t or " ")[: MAX_TOKENS_PER_INPUT * 3] for t in texts]
+        batches = make_batches(clean, self.max_inputs, self.max_tokens)
+
+        results = [None] * len(clean)
+        with stage("embed"), ThreadPool(max_workers=max(1, min(self.concurrency, len(batches)))) as pool:
+            futures = {pool.submit(self._request, [clean[i] for i in batch]): batch for batch in batches}
+            for future, batch in futures.items():
+                for i, emb in zip(batch, future.result()):
+                    results[i] = emb
+        return np.array(results, dtype=np.float32)
+
+    def embed_cached(self, texts) -> np.ndarray:
+        """Embed texts, only sending cache misses to the API."""
+        if self.cache is None:
+            return self.embed(texts)
+
+        keys = [cache_key(t) for t in texts]
+        vectors, hits = self.cache.get_many(keys)
+        misses = [i for i in range(len(texts)) if not hits[i]]
+        incr("embedding_cache.hits", len(texts) - len(misses))
+        incr("embedding_cache.misses", len(misses))
+
+        if misses:
+            # de-duplicate so repeated titles are only embedded once
+            unique = list(dict.fromkeys(texts[i] for i in misses))
+            fresh = self.embed(unique)
+            self.cache.put_many([cache_key(t) for t in unique], fresh)
+            if vectors.shape[1] != fresh.shape[1]:
+                vectors = np.zeros((len(texts), fresh.shape[1]), dtype=np.float32)
+            lookup = dict(zip(unique, fresh))
+            for i in misses:
+                vectors[i] = lookup[texts[i]]
+            print(f"[EMBED] {len(texts) - len(misses)} cached, {len(unique)} embedded "
+                  f"in {len(make_batches(unique, self.max_inputs, self.max_tokens))} request(s)")
+        self.cache.flush()
+        return vectors
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single query string (cached, so repeated topics cost nothing)."""
+        return self.embed_cached([text])[0]
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+from concurrent.futures import as_completed
+
+import feedparser
+import requests
+
+from app.metrics import METRICS, ThreadPool
+
+# validators (ETag / Last-Modified) from the previous run, keyed by feed url
+FEED_STATE_PATH = Path("data/feed_state.json")
+
+MAX_WORKERS = int(os.getenv("FEED_MAX_WORKERS", "8"))
+PER_HOST_LIMIT = int(os.getenv("FEED_PER_HOST_LIMIT", "2"))
+FEED_TIMEOUT = float(os.getenv("FEED_TIMEOUT", "15"))
+USER_AGENT = "news-to-podcast-agent/1.0 (+https://github.com/rohitgogi/news-to-podcast-agent)"
+
+_local = threading.local()
+_host_locks = {}
+_host_locks_guard = threading.Lock()
+
+
+def load_feed_state(path: Path = FEED_STATE_PATH) -> dict:
+    """Load the saved ETag/Last-Modified headers for each feed."""
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return {}
+
+
+def save_feed_state(state: dict, path: Path = FEED_STATE_PATH) -> None:
+    """Persist feed validators so unchanged feeds come back as 304 next run."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+def _session() -> requests.Session:
+    # one session per worker thread so keep-alive connections get reused
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+        _local.session.headers["User-Agent"] = USER_AGENT
+    return _local.session
+
+
+def _host_slot(url: str, limit: int) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc.lower()
+    with _host_locks_guard:
+        if host not in _host_locks:
+            _host_locks[host] = threading.BoundedSemaphore(limit)
+        return _host_locks[host]
+
+
+def fetch_feed(url: str, validators: dict = None, timeout: float = FEED_TIMEOUT,
+               per_host_limit: int = PER_HOST_LIMIT) -> dict:
+    """
+    Fetch and parse a single feed with a conditional GET.
+    Returns a dict with url, status, feed (None if unchanged/failed),
+    the new validators and elapsed seconds.
+    """
+    validators = validators or {}
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("modified"):
+        headers["If-Modified-Since"] = validators["modified"]
+
+    result = {"url": url, "status": None, "feed": None, "validators": validators,
+              "elapsed": 0.0, "error": None}
+    start = time.monotonic()
+    deadline = start + timeout
+
+    try:
+        with _host_slot(url, per_host_limit):
+            resp = _session().get(url, headers=headers, timeout=timeout, stream=True)
+            with resp:
+                result["status"] = resp.status_code
+                if resp.status_code == 304:
+                    return result
+                resp.raise_for_status()
+
+                # the requests timeout is per socket read, so enforce a whole-feed deadline too
+                body = bytearray()
+                for chunk in resp.iter_content(chunk_size=64 * 1024):
+                    body.extend(chunk)
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"feed took longer than {timeout}s")
+
+                result["validators"] = {
+                    "etag": resp.headers.get("ETag"),
+                    "modified": resp.headers.get("Last-Modified"),
+                }
+        result["feed"] = feedparser.parse(bytes(body))
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        result["elapsed"] = time.monotonic() - start
+        METRICS.record_feed(url, result["elapsed"], result["status"], result["error"])
+    return result
+
+
+def fetch_feeds(urls, state: dict = None, max_workers: int = MAX_WORKERS,
+                timeout: float = FEED_TIMEOUT, per_host_limit: int = PER_HOST_LIMIT):
+    """
+    Fetch many feeds concurrently and yield each result as soon as it arrives,
+    so the caller can start dedup on fast feeds while slow ones are in flight.
+    """
+    state = state if state is not None else {}
+    urls = [u.strip() for u in urls if u and u.strip()]
+    if not urls:
+        return
+
+    with ThreadPool(max_workers=min(max_workers, len(urls))) as pool:
+        futures = [
+            pool.submit(fetch_feed, url, state.get(url), timeout, per_host_limit)
+            for url in urls
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -1,61 +1,42 @@
 import os
-import feedparser
 from dotenv import load_dotenv
-import chromadb
-from chromadb.utils import embedding_functions
 import json
 from datetime import datetime, timezone
 import hashlib
+import time
 from pathlib import Path
 from datetime import timedelta
+from app.fetch import fetch_feeds, load_feed_state, save_feed_state
+from app.resources import get_embedder, get_lexical_index
+from app.lifecycle import get_partition, partition_day, apply_retention
+from app.seen_store import SeenStore
+from app.neardup import NearDuplicateIndex, minhash
+from app.relevance import get_relevance_filter, load_user_config
+from app.metrics import incr, stage
 
 
 load_dotenv()
 
 # load in env variables
 NEWS_FEEDS = os.getenv("NEWS_FEEDS", "").split(",")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# legacy JSON seen map, imported once into the SQLite store
 SEEN_PATH = Path("data/seen_articles.json")
 
-# persistent client keeps vectors across runs and not reset after the script is done
-chroma_client = chromadb.PersistentClient(path="chroma_db")
-embed_fn = embedding_functions.OpenAIEmbeddingFunction(
-    api_key=OPENAI_API_KEY,
-    model_name="text-embedding-3-small",
-)
-
-# we remove yesterday's news articles
-# if "news_articles" in [c.name for c in chroma_client.list_collections()]:
-#     chroma_client.delete_collection("news_articles")
-
-# then create a new one for today
-# get existing collection or create one if missing
-if "news_articles" in [c.name for c in chroma_client.list_collections()]:
-    collection = chroma_client.get_collection(
-        name="news_articles",
-        embedding_function=embed_fn,
-    )
-else:
-    collection = chroma_client.create_collection(
-        name="news_articles",
-        embedding_function=embed_fn,
-    )
-
-def load_seen_articles() -> dict:
-    """Load the JSON file tracking previously seen articles."""
-    SEEN_PATH.parent.mkdir(parents=True, exist_ok=True)
-    if not SEEN_PATH.exists():
-        SEEN_PATH.write_text("{}", encoding="utf-8")
-    with SEEN_PATH.open("r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+# articles older than this are skipped; seen entries live a margin longer before expiring
+FRESHNESS_HOURS = 36
+SEEN_TTL_HOURS = FRESHNESS_HOURS + int(os.getenv("SEEN_TTL_MARGIN_HOURS", "24"))
+
+# the Chroma client and collections are created on first use (see app/resources.py);
+# each day's articles go to that day's partition, and partitions past retention are
+# dropped at ingest (see app/lifecycle.py)
 
-def save_seen_articles(seen: dict) -> None:
-    """Persist the seen-articles map to disk."""
-    with SEEN_PATH.open("w", encoding="utf-8") as f:
-        json.dump(seen, f, indent=2, ensure_ascii=False)
+def open_seen_store() -> SeenStore:
+    """Open the dedup store, importing the old JSON seen map the first time."""
+    store = SeenStore()
+    imported = store.import_json(SEEN_PATH)
+    if imported:
+        print(f"Imported {imported} entries from {SEEN_PATH}")
+    return store
 
 def article_hash(title: str, summary: str) -> str:
     """Stable hash for article content (title + summary)."""
@@ -64,53 +45,131 @@ def article_hash(title: str, summary: str) -> str:
 
 
 
-def load_feeds(user: str = "default"):
-    """Load feed URLs from config."""
-    with open("feeds/default_feeds.json", "r") as f:
-        default_feeds = json.load(f)
+def load_user_feeds() -> dict:
+    """Load the user → feed groups map."""
     user_feeds_path = "feeds/user_feeds.json"
     if os.path.exists(user_feeds_path):
         with open(user_feeds_path, "r") as f:
-            user_feeds = json.load(f)
-    else:
-        user_feeds = {"default": ["general"]}
+            return json.load(f)
+    return {"default": ["general"]}
 
-    selected_groups = user_feeds.get(user, ["general"])
+
+def feeds_for_groups(groups) -> list:
+    """Feed URLs in any of the groups of default_feeds.json (a feed may be listed in several)."""
+    if not os.path.exists("feeds/default_feeds.json"):
+        return []
+    with open("feeds/default_feeds.json", "r") as f:
+        default_feeds = json.load(f)
     urls = []
-    for group in selected_groups:
+    for group in groups:
         urls.extend(default_feeds.get(group, []))
-    return list(set(urls))
+    return list(dict.fromkeys(urls))
 
 
-def ingest_articles(limit_per_feed = 20, user="default") -> int:
-    """Fetch articles from RSS feeds and store them in the vector DB. Returns count stored."""
-    
-    seen = load_seen_articles()
+def load_feeds(user: str = "default"):
+    """Load feed URLs from config."""
+    return feeds_for_groups(load_user_config(user)["groups"])
+
+
+def ingest_articles(limit_per_feed = 20, user="default", feeds=None, relevance=None, pending: dict = None) -> int:
+    """
+    Fetch articles from RSS feeds and store them in the vector DB. Returns count stored.
+    `feeds` overrides the user's feed list and `relevance` the user's keyword filter
+    (batch mode passes the union of all users for both).
+
+    With a `pending` dict, seen-map updates and feed validators are put in it
+    instead of being saved, along with the stored ids; commit_ingest(pending)
+    saves them once the whole run has succeeded, so a failed run's articles
+    still count as new when it is retried.
+    """
+
+    store = open_seen_store()
+    near_dups = NearDuplicateIndex()
+    collapsed = 0
+    seen_updates = {}   # link -> record, written in one transaction at the end
+    sighted = []        # stored links seen again unchanged; their last_seen is refreshed
+    unchanged_feeds = []
+    run_hashes = set()
     new_articles = []
+    # below this run's relevance cutoff: left out of the seen map and near-dup index,
+    # so a run for a user they do match still ingests them
+    irrelevant = []
     now = datetime.utcnow()
-    feeds = load_feeds(user)
-    for url in feeds:
-        url = url.strip()
-        if not url:
+    feeds = feeds if feeds is not None else load_feeds(user)
+    feed_state = load_feed_state()
+    relevance = relevance or get_relevance_filter(user)
+
+    def admit(url, title, summary, link, content_hash, previous, duplicate, score):
+        """Record an article in the seen map and, unless it repeats a known story, keep it."""
+        nonlocal collapsed
+        # 4) Update seen map
+        seen_updates[link] = {
+            "link": link,
+            "hash": content_hash,
+            "first_seen": previous["first_seen"] if previous else now.isoformat(),
+            "last_seen": now.isoformat(),
+            "source": url,
+        }
+        if duplicate or content_hash in run_hashes:
+            return
+        run_hashes.add(content_hash)
+
+        # 5) Collapse near-identical rewrites of the same story before anything is embedded
+        signature = minhash(f"{title} {summary}")
+        match = near_dups.find(signature, exclude=link)
+        if match:
+            collapsed += 1
+            print(f"  near-duplicate of {match}: {title}")
+            return
+        near_dups.add(link, signature)
+
+        # 6) This is a "new enough" or updated article → keep it
+        new_articles.append({
+            "title": title,
+            "summary": summary,
+            "link": link,
+            "source": url,
+            "hash": content_hash,
+            "relevance": score,
+        })
+
+    # feeds are fetched concurrently and handed back as each one completes
+    for result in fetch_feeds(feeds, state=feed_state):
+        url = result["url"]
+        if result["error"]:
+            print(f"Failed to fetch {url}: {result['error']}")
+            continue
+        if result["status"] == 304:
+            print(f"Unchanged since last run: {url} ({result['elapsed']:.2f}s)")
+            unchanged_feeds.append(url)
             continue
-        # if url exists, and has no whitespaces get the RSS XML data into a python object
-        print(f"Fetching from: {url}")
-        feed = feedparser.parse(url)
+
+        feed = result["feed"]
+        feed_state[url] = result["validators"]
+        print(f"Fetched {url} in {result['elapsed']:.2f}s")
         print(f"Found {len(feed.entries[:limit_per_feed])} articles")
-        
-        # only get top (limit_per_feed) artocles
+
+        # one indexed lookup per feed instead of loading the whole seen map
+        entries = []
         for entry in feed.entries[:limit_per_feed]:
             title = getattr(entry, "title", "") or ""
             summary = getattr(entry, "summary", "") or ""
             link = getattr(entry, "link", "") or ""
-            if not link:
-                continue
+            if link:
+                entries.append((entry, title, summary, link, article_hash(title, summary)))
+        seen = store.lookup(e[3] for e in entries)
+        known_hashes = store.known_hashes(e[4] for e in entries)
 
-            content_hash = article_hash(title, summary)
+        # only get top (limit_per_feed) artocles
+        for entry, title, summary, link, content_hash in entries:
+            previous = seen_updates.get(link) or seen.get(link)
 
-            # 1) Skip if already seen with same content
-            if link in seen and seen[link].get("hash") == content_hash:
+            # 1) Skip if already seen with same content (under this link or syndicated under another)
+            if previous and previous["hash"] == content_hash:
+                if link in seen:
+                    sighted.append(link)
                 continue
+            duplicate = content_hash in known_hashes and not previous
 
             # 2) Optional: skip old articles (older than 36h)
             published_dt = None
@@ -119,31 +178,44 @@ def ingest_articles(limit_per_feed = 20, user="default") -> int:
             elif hasattr(entry, "updated_parsed") and entry.updated_parsed:
                 published_dt = datetime(*entry.updated_parsed[:6])
 
-            if published_dt and now - published_dt > timedelta(hours=36):
+            if published_dt and now - published_dt > timedelta(hours=FRESHNESS_HOURS):
                 continue
 
-            # 3) This is a "new enough" or updated article → keep it
-            article = {
-                "title": title,
-                "summary": summary,
-                "link": link,
-                "source": url,
-            }
-            new_articles.append(article)
-
-            # 4) Update seen map
-            record = seen.get(link, {})
-            if "first_seen" not in record:
-                record["first_seen"] = now.isoformat()
-            record["last_seen"] = now.isoformat()
-            record["hash"] = content_hash
-            record["source"] = url
-            seen[link] = record
+            # 3) Score against the compiled keyword pattern; weak matches are not marked seen
+            score = relevance.score(f"{title} {summary}")
+            args = (url, title, summary, link, content_hash, previous, duplicate, score)
+            if score < relevance.min_score:
+                irrelevant.append(args)
+                continue
+            admit(*args)
 
+    if irrelevant and not new_articles:
+        print("No articles matched filter — storing all instead.")
+        for args in irrelevant:
+            admit(*args)
+    elif irrelevant:
+        print(f"{len(irrelevant)} articles fell below the relevance filter.")
 
-    # Persist updated seen map
-    save_seen_articles(seen)
-    print(f"Seen map contains {len(seen)} entries")
+    # Persist updated seen map in a single transaction and drop entries past the TTL.
+    # Sightings of stored entries are written at once, even for a deferred ingest:
+    # they only keep known articles from expiring while their feeds still carry them
+    store.touch(sighted, now=now)
+    store.touch_sources(unchanged_feeds, now=now)
+    if pending is None:
+        store.upsert_many(seen_updates.values())
+        save_feed_state(feed_state)
+    else:
+        pending.update(seen=list(seen_updates.values()), feed_state=feed_state, ids=[])
+    expired = store.expire(SEEN_TTL_HOURS, now=now)
+    print(f"Seen store contains {len(store)} entries ({expired} expired)")
+    store.close()
+    near_dups.commit(now=now)
+    near_dups.expire(SEEN_TTL_HOURS, now=now)
+    near_dups.close()
+    incr("ingest.new", len(new_articles))
+    incr("ingest.near_duplicates", collapsed)
+    if collapsed:
+        print(f"Collapsed {collapsed} near-duplicate articles.")
 
 
     if not new_articles:
@@ -156,27 +228,32 @@ def ingest_articles(limit_per_feed = 20, user="default") -> int:
     with open(f"logs/ingest_{today}.json", "w") as f:
         json.dump(new_articles, f, indent=2)
     
-    KEYWORDS = ["AI", "artificial intelligence", "machine learning", "technology", "innovation", "US", "America"]
-
-    # keyword filter logic to clear articles irrelevant to our prompt
-    filtered_articles = []
-    for a in new_articles:
-        text = f"{a['title']} {a['summary']}".lower()
-        if any(k.lower() in text for k in KEYWORDS):
-            filtered_articles.append(a)
-
-    if not filtered_articles:
-        print("No articles matched filter — storing all instead.")
-        filtered_articles = new_articles
-
-    articles = filtered_articles
+    articles = new_articles
 
     ids = [a["link"] for a in articles]
     docs = [f"{a['title']}\n\n{a['summary']}" for a in articles]
-    metas = [{"title": a["title"], "link": a["link"], "source": a["source"]} for a in articles]
+    # ingest time and source feed let retrieval filter inside Chroma instead of scanning everything
+    ingested_at = int(time.time())
+    metas = [{"title": a["title"], "link": a["link"], "source": a["source"], "relevance": a["relevance"],
+              "hash": a["hash"], "ingested_at": ingested_at}
+             for a in articles]
         
     
-    collection.upsert(ids=ids, documents=docs, metadatas=metas)
+    # vectors come from the shared embedding service (cached, batched, any backend)
+    # so ingest and reason always embed with the same model
+    embeddings = get_embedder().embed_cached(docs)
+    with stage("ingest.upsert"):
+        get_partition(partition_day(ingested_at)).upsert(ids=ids, documents=docs, metadatas=metas,
+                                                          embeddings=embeddings)
+    with stage("ingest.retention"):
+        apply_retention()
+    with stage("ingest.lexical"):
+        lexical = get_lexical_index()
+        lexical.add_many((i, d, m["ingested_at"], m["source"]) for i, d, m in zip(ids, docs, metas))
+        lexical.expire()
+    incr("ingest.stored", len(articles))
+    if pending is not None:
+        pending["ids"] = ids
     print(f"Ingested {len(new_articles)} new articles.")
     print(f"Total stored: {len(articles)} articles across {len(NEWS_FEEDS)} feeds.")
     print("Sample headlines:")
@@ -184,6 +261,19 @@ def ingest_articles(limit_per_feed = 20, user="default") -> int:
         print(f"  - {a['title']} ({a['source']})")
     return len(articles)
 
+def commit_ingest(pending: dict) -> None:
+    """Save the seen-map updates and feed validators an ingest deferred into `pending`."""
+    if not pending or "seen" not in pending:
+        return
+    store = open_seen_store()
+    try:
+        store.upsert_many(pending["seen"])
+    finally:
+        store.close()
+    save_feed_state(pending["feed_state"])
+    print(f"[INGEST] Committed {len(pending['seen'])} seen-map updates")
+
+
 if __name__ == "__main__":
     count = ingest_articles(limit_per_feed=10)
     print(f"Ingested {count} articles.")
@@ -0,0 +1,93 @@
+import os
+import uuid
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+API_WORKERS = int(os.getenv("PODCAST_API_WORKERS", "2"))
+# finished jobs kept around for status polling before the oldest are forgotten
+MAX_FINISHED_JOBS = 200
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobQueue:
+    """
+    Runs pipeline jobs on a bounded worker pool. Submitting the same
+    parameters while an identical job is still queued or running returns
+    that job instead of starting a duplicate pipeline.
+    """
+
+    def __init__(self, runner, max_workers: int = API_WORKERS):
+        self.runner = runner
+        self.jobs = {}
+        self._inflight = {}   # coalescing key -> job id
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="podcast-job")
+
+    @staticmethod
+    def job_key(params: dict) -> tuple:
+        day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        return tuple(sorted(params.items())) + (("day", day),)
+
+    def submit(self, **params) -> dict:
+        key = self.job_key(params)
+        with self._lock:
+            job_id = self._inflight.get(key)
+            if job_id:
+                return self.jobs[job_id]
+
+            job_id = uuid.uuid4().hex
+            job = {
+                "id": job_id,
+                "status": "queued",
+                "params": params,
+                "created_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            self.jobs[job_id] = job
+            self._inflight[key] = job_id
+            self._prune()
+            job["future"] = self._pool.submit(self._run, job, key)
+        return job
+
+    def _run(self, job: dict, key: tuple):
+        job["status"] = "running"
+        job["started_at"] = _now()
+        try:
+            job["result"] = self.runner(**job["params"])
+            job["status"] = "done"
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = _now()
+            with self._lock:
+                self._inflight.pop(key, None)
+        return job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: float = None) -> dict:
+        job = self.jobs[job_id]
+        job["future"].result(timeout=timeout)
+        return job
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j["status"] in ("done", "failed")]
+        for job in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            self.jobs.pop(job["id"], None)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def public_view(job: dict) -> dict:
+    """The JSON-safe part of a job for API responses."""
+    return {k: v for k, v in job.items() if k != "future"}
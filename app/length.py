@@ -0,0 +1,147 @@
+import os
+import re
+import json
+import threading
+from pathlib import Path
+
+from app.metrics import incr
+
+PACE_PATH = Path("data/pace.json")
+# the speaking rate the script prompt assumed before any episode was measured
+DEFAULT_WPM = 130
+# weight of the newest episode in the rolling words-per-minute estimate
+PACE_SMOOTHING = 0.3
+# an episode may land this far (as a fraction) either side of the requested length
+LENGTH_TOLERANCE = float(os.getenv("PODCAST_LENGTH_TOLERANCE", "0.1"))
+# words held back for the sign-off while the script is still streaming in
+SIGN_OFF_WORDS = 25
+# a closing segment longer than this is content rather than a sign-off, and is trimmed like a story
+MAX_SIGN_OFF_WORDS = 2 * SIGN_OFF_WORDS
+# measurements outside this range come from bad audio or a mismatched script, not a voice
+PLAUSIBLE_WPM = (60, 260)
+MIN_MEASURED_WORDS = 50
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+class PaceTracker:
+    """
+    Rolling words-per-minute estimate per TTS voice, measured from finished
+    episodes and kept in data/pace.json so every run starts from the last one.
+    """
+
+    def __init__(self, path=PACE_PATH, smoothing: float = PACE_SMOOTHING, default: float = DEFAULT_WPM):
+        self.path = Path(path)
+        self.smoothing = smoothing
+        self.default = default
+        self._lock = threading.Lock()
+        self.voices = {}
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                self.voices = json.load(f)
+
+    def wpm(self, voice: str) -> float:
+        return self.voices.get(voice, {}).get("wpm", self.default)
+
+    def observe(self, voice: str, words: int, seconds: float) -> float:
+        """Fold one episode's measured pace into the voice's estimate and return the new estimate."""
+        if words < MIN_MEASURED_WORDS or seconds <= 0:
+            return self.wpm(voice)
+        measured = words * 60 / seconds
+        if not PLAUSIBLE_WPM[0] <= measured <= PLAUSIBLE_WPM[1]:
+            print(f"[LENGTH] Ignoring implausible pace of {measured:.0f} wpm for {voice}")
+            return self.wpm(voice)
+        with self._lock:
+            entry = self.voices.get(voice)
+            if entry:
+                entry["wpm"] = round((1 - self.smoothing) * entry["wpm"] + self.smoothing * measured, 2)
+                entry["episodes"] += 1
+            else:
+                entry = self.voices[voice] = {"wpm": round(measured, 2), "episodes": 1}
+            self._save()
+        print(f"[LENGTH] {voice}: measured {measured:.0f} wpm, estimate now {entry['wpm']:.0f} wpm")
+        return entry["wpm"]
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.voices, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def _fit(segment: str, budget: float):
+    """The segment if it fits in budget words, else its leading sentences that do, else None."""
+    if word_count(segment) <= budget:
+        return segment
+    kept, used = [], 0
+    for sentence in _SENTENCE_END.split(segment):
+        used += word_count(sentence)
+        if used > budget:
+            break
+        kept.append(sentence)
+    return " ".join(kept) or None
+
+
+def fit_segments(segments, target_seconds: float, wpm: float, tolerance: float = LENGTH_TOLERANCE,
+                 extras=()):
+    """
+    Yield script segments (paragraphs) adjusted so the narration lands within
+    tolerance of target_seconds at wpm, without asking the LLM again.
+
+    The opening segment is yielded at once and a short closing one is always
+    kept; segments lazily arrive one ahead, so a streamed script is fitted
+    while it is written. Stories run in ranked order, so an over-long script
+    loses its last stories first (cut to whole sentences where one only
+    partly fits). Room is kept for the segment after each one, up to a
+    sign-off's length, in case it is the closing; a longer closing segment,
+    or a script that arrives as one paragraph, is cut like a story. A short
+    script gets `extras`, spare story paragraphs, inserted before the sign-off.
+    """
+    upper = target_seconds * (1 + tolerance) * wpm / 60
+    lower = target_seconds * (1 - tolerance) * wpm / 60
+    segments = iter(segments)
+    first = next(segments, None)
+    if first is None:
+        return
+    # never nothing: an opening sentence longer than the whole budget is still spoken
+    opening = _fit(first, upper - SIGN_OFF_WORDS) or first
+    yield opening
+    spoken, trimmed, extended = word_count(opening), word_count(first) - word_count(opening), 0
+
+    last = next(segments, None)
+    for following in segments:
+        segment, last = last, following
+        reserve = min(word_count(following), MAX_SIGN_OFF_WORDS)
+        kept = _fit(segment, upper - spoken - reserve)
+        trimmed += word_count(segment) - (word_count(kept) if kept else 0)
+        if kept:
+            spoken += word_count(kept)
+            yield kept
+
+    if last is not None and word_count(last) > MAX_SIGN_OFF_WORDS:
+        kept = _fit(last, upper - spoken)
+        trimmed += word_count(last) - (word_count(kept) if kept else 0)
+        last = kept
+
+    if last is not None:
+        closing = word_count(last)
+        for extra in extras:
+            if spoken + closing >= lower:
+                break
+            kept = _fit(extra, upper - spoken - closing)
+            if kept:
+                spoken += word_count(kept)
+                extended += word_count(kept)
+                yield kept
+        spoken += closing
+        yield last
+
+    incr("length.trimmed_words", trimmed)
+    incr("length.extended_words", extended)
+    print(f"[LENGTH] Script fitted to {spoken} words (~{spoken / wpm:.1f} min at {wpm:.0f} wpm, "
+          f"target {target_seconds / 60:.1f} min): {trimmed} words trimmed, {extended} added")
@@ -0,0 +1,253 @@
+import os
+import re
+import gzip
+import json
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+
+from app.resources import get_chroma_client, get_collection, forget, space_name, COLLECTION_NAME
+
+# partitions older than this are archived (if enabled) and dropped
+RETENTION_DAYS = int(os.getenv("PODCAST_RETENTION_DAYS", "14"))
+ARCHIVE_PARTITIONS = os.getenv("PODCAST_ARCHIVE_PARTITIONS", "1") != "0"
+ARCHIVE_DIR = Path("data/archive")
+# rows read per collection.get while copying or archiving a partition
+PAGE_SIZE = 1000
+
+_INCLUDE = ["documents", "metadatas", "embeddings"]
+
+
+def partition_day(timestamp: float = None) -> str:
+    """The UTC day (YYYYMMDD) an ingest timestamp belongs to."""
+    return datetime.fromtimestamp(timestamp if timestamp is not None else time.time(), timezone.utc).strftime("%Y%m%d")
+
+
+def partition_name(day: str, base: str = None) -> str:
+    return f"{base or space_name(COLLECTION_NAME)}__d{day}"
+
+
+def get_partition(day: str):
+    """The day's article collection in the active embedding space, created on first use."""
+    return get_collection(partition_name(day))
+
+
+def list_partitions(base: str = None) -> list:
+    """(day, name) for every partition of the active embedding space, oldest first."""
+    base = base or space_name(COLLECTION_NAME)
+    pattern = re.compile(re.escape(base) + r"__d(\d{8})$")
+    found = []
+    for collection in get_chroma_client().list_collections():
+        name = getattr(collection, "name", collection)
+        match = pattern.match(name)
+        if match:
+            found.append((match.group(1), name))
+    return sorted(found)
+
+
+def _legacy_name(base: str = None):
+    """The single unpartitioned collection from before partitioning, if it still exists."""
+    base = base or space_name(COLLECTION_NAME)
+    names = {getattr(c, "name", c) for c in get_chroma_client().list_collections()}
+    return base if base in names else None
+
+
+def _rows(collection, include=_INCLUDE, page: int = PAGE_SIZE):
+    """Yield a collection's rows a page at a time as (id, document, metadata, embedding)."""
+    offset = 0
+    while True:
+        batch = collection.get(limit=page, offset=offset, include=include)
+        ids = batch["ids"]
+        if not ids:
+            return
+        docs = batch["documents"] if batch.get("documents") is not None else [None] * len(ids)
+        metas = batch["metadatas"] if batch.get("metadatas") is not None else [None] * len(ids)
+        embeddings = batch["embeddings"] if batch.get("embeddings") is not None else [None] * len(ids)
+        yield from zip(ids, docs, metas, embeddings)
+        offset += len(ids)
+
+
+class PartitionedCollection:
+    """
+    Read-only view over several day partitions with the query/get/count
+    calls retrieval makes on a single Chroma collection. Partitions are
+    searched newest first; an article re-ingested on a later day shadows its
+    older copy, and query results are merged by distance.
+    """
+
+    def __init__(self, collections):
+        # newest first, so the first copy of an id found is the current one
+        self.collections = list(collections)
+
+    def count(self) -> int:
+        return sum(c.count() for c in self.collections)
+
+    def query(self, query_embeddings, n_results: int = 10, where=None, include=_INCLUDE) -> dict:
+        include = list(dict.fromkeys(list(include) + ["distances"]))
+        hits, seen = [], set()
+        for collection in self.collections:
+            result = collection.query(query_embeddings=query_embeddings, n_results=n_results,
+                                      where=where, include=include)
+            columns = [result[k][0] if result.get(k) is not None else [] for k in ["ids"] + include]
+            for row in zip(*columns):
+                if row[0] not in seen:
+                    seen.add(row[0])
+                    hits.append(row)
+        hits.sort(key=lambda row: row[-1])
+        hits = hits[:n_results]
+        keys = ["ids"] + include
+        return {k: [[row[i] for row in hits]] for i, k in enumerate(keys)}
+
+    def get(self, ids, include=_INCLUDE) -> dict:
+        include = list(include)
+        found = {}
+        for collection in self.collections:
+            missing = [i for i in ids if i not in found]
+            if not missing:
+                break
+            result = collection.get(ids=missing, include=include)
+            columns = [result[k] if result.get(k) is not None else [None] * len(result["ids"]) for k in include]
+            for doc_id, *values in zip(result["ids"], *columns):
+                found[doc_id] = values
+        ordered = [i for i in ids if i in found]
+        out = {"ids": ordered}
+        for n, k in enumerate(include):
+            out[k] = [found[i][n] for i in ordered]
+        return out
+
+
+def partitions_for(window_hours: float = None, now: float = None) -> PartitionedCollection:
+    """
+    The partitions an episode needs: those whose day overlaps the last
+    window_hours, or every partition (plus the legacy collection, until it is
+    compacted away) when window_hours is None.
+    """
+    days = list_partitions()
+    names = [name for _, name in days]
+    if window_hours:
+        first = partition_day((now or time.time()) - window_hours * 3600)
+        names = [name for day, name in days if day >= first]
+    else:
+        legacy = _legacy_name()
+        if legacy:
+            names.insert(0, legacy)
+    return PartitionedCollection(get_collection(name) for name in reversed(names))
+
+
+def archive_partition(name: str, directory=None) -> Path:
+    """Write a partition's rows to <directory>/<name>.jsonl.gz (one JSON object per article)."""
+    directory = Path(directory or ARCHIVE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.jsonl.gz"
+    tmp = path.with_suffix(".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        for doc_id, doc, meta, embedding in _rows(get_collection(name)):
+            f.write(json.dumps({"id": doc_id, "document": doc, "metadata": meta,
+                                "embedding": [float(x) for x in embedding]}) + "\n")
+    os.replace(tmp, path)
+    return path
+
+
+def drop_partition(name: str) -> None:
+    get_chroma_client().delete_collection(name)
+    forget(f"collection:{name}")
+
+
+def apply_retention(days: int = RETENTION_DAYS, archive: bool = ARCHIVE_PARTITIONS, now: float = None) -> list:
+    """Archive (optionally) and drop partitions older than `days`; returns the dropped names."""
+    cutoff = partition_day((now or time.time()) - days * 86400)
+    dropped = []
+    for day, name in list_partitions():
+        if day >= cutoff:
+            continue
+        if archive:
+            print(f"[LIFECYCLE] Archived {name} to {archive_partition(name)}")
+        drop_partition(name)
+        dropped.append(name)
+    if dropped:
+        print(f"[LIFECYCLE] Dropped {len(dropped)} partitions older than {days} days")
+    return dropped
+
+
+def migrate_legacy(now: float = None) -> int:
+    """
+    Move the unpartitioned collection's articles into day partitions by their
+    ingested_at. Articles stored before ingest recorded a timestamp go into
+    today's partition, stamped now, and age out with it.
+    """
+    legacy = _legacy_name()
+    if not legacy:
+        return 0
+    now = int(now or time.time())
+    batches, moved = {}, 0
+
+    def flush(day):
+        ids, docs, metas, embeddings = zip(*batches.pop(day))
+        get_partition(day).upsert(ids=list(ids), documents=list(docs), metadatas=list(metas),
+                                  embeddings=[list(map(float, e)) for e in embeddings])
+
+    for doc_id, doc, meta, embedding in _rows(get_collection(legacy)):
+        meta = dict(meta or {})
+        meta.setdefault("ingested_at", now)
+        day = partition_day(meta["ingested_at"])
+        batches.setdefault(day, []).append((doc_id, doc, meta, embedding))
+        moved += 1
+        if len(batches[day]) >= PAGE_SIZE:
+            flush(day)
+    for day in list(batches):
+        flush(day)
+
+    # drop only after every row has a new home
+    drop_partition(legacy)
+    print(f"[LIFECYCLE] Moved {moved} articles from {legacy} into day partitions")
+    return moved
+
+
+def compact(retention_days: int = RETENTION_DAYS, archive: bool = ARCHIVE_PARTITIONS, now: float = None) -> dict:
+    """
+    Bring storage back to its steady state: migrate the legacy collection,
+    delete copies of articles that a newer partition re-ingested, drop
+    empty partitions and apply retention.
+    """
+    report = {"migrated": migrate_legacy(now=now), "duplicates_removed": 0, "empty_dropped": 0}
+
+    newer_ids = set()
+    for _, name in reversed(list_partitions()):
+        collection = get_collection(name)
+        ids = [doc_id for doc_id, *_ in _rows(collection, include=[])]
+        stale = [doc_id for doc_id in ids if doc_id in newer_ids]
+        for i in range(0, len(stale), PAGE_SIZE):
+            collection.delete(ids=stale[i:i + PAGE_SIZE])
+        report["duplicates_removed"] += len(stale)
+        newer_ids.update(ids)
+        if len(ids) == len(stale):
+            drop_partition(name)
+            report["empty_dropped"] += 1
+
+    report["dropped"] = apply_retention(retention_days, archive, now=now)
+    print(f"[LIFECYCLE] Compaction: {report}")
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the day-partitioned article collections")
+    parser.add_argument("command", choices=["list", "retain", "compact"])
+    parser.add_argument("--retention-days", type=int, default=RETENTION_DAYS)
+    parser.add_argument("--no-archive", action="store_true", help="Drop expired partitions without archiving")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for day, name in list_partitions():
+            print(f"{day}  {get_collection(name).count():>7}  {name}")
+        legacy = _legacy_name()
+        if legacy:
+            print(f"unpartitioned  {get_collection(legacy).count():>7}  {legacy} (run compact to migrate)")
+    elif args.command == "retain":
+        apply_retention(args.retention_days, archive=not args.no_archive)
+    else:
+        compact(args.retention_days, archive=not args.no_archive)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import os
+import re
+import time
+
+from app.metrics import incr
+
+CHAT_MODEL = "gpt-4o-mini"
+LLM_RETRIES = 3
+
+
+def with_retries(fn, retries: int = LLM_RETRIES, base_delay: float = 1.0, label: str = "LLM"):
+    """Call fn(), retrying with exponential backoff on any exception."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = base_delay * 2 ** attempt
+            print(f"[{label}] Call failed ({e}); retrying in {delay:.0f}s...")
+            time.sleep(delay)
+
+
+def stream_with_retries(open_stream, retries: int = LLM_RETRIES, base_delay: float = 1.0, label: str = "LLM"):
+    """
+    Yield from open_stream(), retrying with backoff only while nothing has been
+    yielded yet; a stream that fails part-way cannot be replayed and re-raises.
+    """
+    for attempt in range(retries + 1):
+        started = False
+        try:
+            for piece in open_stream():
+                started = True
+                yield piece
+            return
+        except Exception as e:
+            if started or attempt == retries:
+                raise
+            delay = base_delay * 2 ** attempt
+            print(f"[{label}] Stream failed ({e}); retrying in {delay:.0f}s...")
+            time.sleep(delay)
+
+
+def iter_paragraphs(deltas):
+    """Group streamed text deltas into paragraphs, yielding each once its blank line arrives."""
+    buffer = ""
+    for delta in deltas:
+        buffer += delta
+        parts = re.split(r"\n\s*\n", buffer)
+        buffer = parts.pop()
+        for part in parts:
+            if part.strip():
+                yield part.strip()
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def _count_usage(usage, calls: int = 1) -> None:
+    incr("llm.calls", calls)
+    if usage:
+        incr("llm.prompt_tokens", usage.prompt_tokens)
+        incr("llm.completion_tokens", usage.completion_tokens)
+
+
+class OpenAIChatBackend:
+    """Chat completions through the shared OpenAI client and rate limiter."""
+
+    name = "openai"
+
+    def __init__(self, client=None, model=CHAT_MODEL, rate_limiter=None):
+        from app.resources import get_openai_client, get_rate_limiter
+        self.client = client or get_openai_client()
+        self.model = model
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+
+    def complete(self, messages, temperature: float = 0.2) -> str:
+        self.rate_limiter.acquire()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+        )
+        _count_usage(response.usage)
+        return response.choices[0].message.content.strip()
+
+    def stream(self, messages, temperature: float = 0.2):
+        """Yield the completion's text deltas as they arrive."""
+        self.rate_limiter.acquire()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        for chunk in response:
+            # with include_usage the last chunk carries the token counts and no choices
+            if getattr(chunk, "usage", None):
+                _count_usage(chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class FakeLLMBackend:
+    """
+    Deterministic offline stand-in. Numbered article blocks ("[3] Title: ...")
+    come back as numbered one-line summaries, and numbered context lines come
+    back as one script paragraph each, which is enough to drive the pipeline.
+    """
+
+    name = "fake"
+    model = "fake-llm"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def complete(self, messages, temperature: float = 0.2) -> str:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        prompt = messages[-1]["content"]
+        text = self.respond(prompt)
+        # token counts are estimated so offline runs still report realistic usage
+        incr("llm.calls")
+        incr("llm.prompt_tokens", sum(len(m["content"]) // 4 + 1 for m in messages))
+        incr("llm.completion_tokens", len(text) // 4 + 1)
+        return text
+
+    def respond(self, prompt: str) -> str:
+        """The canned reply for a prompt (also served by bench's fake OpenAI server)."""
+        blocks = re.findall(r"^\[(\d+)\] Title: (.*?)\n\n(.*?)(?=^\[\d+\] Title: |\Z)", prompt, re.M | re.S)
+        if blocks:
+            return "\n".join(f"{n}. {title}: {_first_sentence(body)}" for n, title, body in blocks)
+
+        items = re.findall(r"^\s*\d+\.\s+(.+)$", prompt, re.M)
+        if items:
+            paragraphs = [items[0]] + [f"Moving on. {item}" for item in items[1:]]
+            return "\n\n".join(paragraphs + ["That's all for today. Thanks for listening."])
+        return " ".join(prompt.split()[:200])
+
+    def stream(self, messages, temperature: float = 0.2):
+        """complete() delivered in small deltas, with the delay spread across them."""
+        delay, self.delay = self.delay, 0.0
+        try:
+            text = self.complete(messages, temperature)
+        finally:
+            self.delay = delay
+        pieces = [text[i:i + 24] for i in range(0, len(text), 24)]
+        for piece in pieces:
+            if delay:
+                time.sleep(delay / len(pieces))
+            yield piece
+
+
+def _first_sentence(text: str) -> str:
+    text = " ".join(text.split())
+    match = re.match(r"(.+?[.!?])(\s|$)", text)
+    return match.group(1) if match else text[:200]
+
+
+def get_llm_backend(name: str = None):
+    """Pick a chat backend from PODCAST_LLM_BACKEND (openai or fake)."""
+    name = name or os.getenv("PODCAST_LLM_BACKEND", "openai")
+    if name == "fake":
+        return FakeLLMBackend()
+    if name == "openai":
+        return OpenAIChatBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+METRICS_DIR = os.getenv("PODCAST_METRICS_DIR", "logs")
+# per-feed fetch records kept for the /metrics endpoint and run reports
+FEED_HISTORY = 2000
+
+# the per-run collectors of every track_run block the current code runs inside
+_RUNS = contextvars.ContextVar("metrics_runs", default=())
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class StageTimer:
+    """What `with metrics.stage(...)` yields; seconds is set when the block exits."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = None
+
+
+class Metrics:
+    """
+    Process-wide stage timings and counters. Stages accumulate call counts
+    and wall time, counters accumulate API calls, tokens and cache hits, and
+    feed fetches are kept individually. Everything is thread-safe, so worker
+    pools record into the same instance as the thread that started a run.
+    The process-wide instance also records into the collectors of the runs
+    tracked in the current context (see track_run and ThreadPool).
+    """
+
+    def __init__(self, tracks_runs: bool = False):
+        self.tracks_runs = tracks_runs
+        self._lock = threading.Lock()
+        self.started_at = _now()
+        self.stages = {}     # name -> [calls, seconds]
+        self.counters = {}   # name -> int
+        self.feeds = deque(maxlen=FEED_HISTORY)
+        self._feed_seq = 0
+        self.last_run = None
+
+    @contextmanager
+    def stage(self, name: str):
+        timer = StageTimer(name)
+        start = time.perf_counter()
+        try:
+            yield timer
+        finally:
+            timer.seconds = time.perf_counter() - start
+            self.observe(name, timer.seconds)
+
+    def _targets(self):
+        return (self, *_RUNS.get()) if self.tracks_runs else (self,)
+
+    def observe(self, name: str, seconds: float) -> None:
+        for metrics in self._targets():
+            with metrics._lock:
+                entry = metrics.stages.setdefault(name, [0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+
+    def incr(self, name: str, n: int = 1) -> None:
+        if not n:
+            return
+        for metrics in self._targets():
+            with metrics._lock:
+                metrics.counters[name] = metrics.counters.get(name, 0) + n
+
+    def record_feed(self, url: str, seconds: float, status=None, error: str = None) -> None:
+        outcome = "failed" if error else "not_modified" if status == 304 else "fetched"
+        record = {"url": url, "seconds": round(seconds, 3), "status": status, "error": error}
+        for metrics in self._targets():
+            with metrics._lock:
+                metrics._feed_seq += 1
+                metrics.feeds.append((metrics._feed_seq, record))
+                metrics.counters[f"feeds.{outcome}"] = metrics.counters.get(f"feeds.{outcome}", 0) + 1
+
+    def report(self) -> dict:
+        """Stages, counters, cache hit rates and feed fetches recorded so far."""
+        with self._lock:
+            stages = {k: {"calls": c, "seconds": round(s, 3)} for k, (c, s) in self.stages.items()}
+            counters = dict(self.counters)
+            feeds = [f for _, f in self.feeds]
+        return _view(stages, counters, feeds)
+
+    def to_dict(self) -> dict:
+        """Cumulative view since the process started, plus the last run's report."""
+        view = self.report()
+        view["started_at"] = self.started_at
+        view["last_run"] = self.last_run
+        return view
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+            self.feeds.clear()
+            self.last_run = None
+
+
+def _view(stages: dict, counters: dict, feeds: list) -> dict:
+    # hit rate for every "<cache>.hits" counter that has a matching "<cache>.misses"
+    hit_rates = {}
+    for name, hits in counters.items():
+        if name.endswith(".hits"):
+            prefix = name[: -len(".hits")]
+            total = hits + counters.get(f"{prefix}.misses", 0)
+            hit_rates[prefix] = round(hits / total, 3) if total else None
+    for name, misses in counters.items():
+        if name.endswith(".misses"):
+            hit_rates.setdefault(name[: -len(".misses")], 0.0 if misses else None)
+    return {
+        "stages": stages,
+        "counters": dict(sorted(counters.items())),
+        "cache_hit_rates": hit_rates,
+        "feeds": sorted(feeds, key=lambda f: -f["seconds"]),
+    }
+
+
+METRICS = Metrics(tracks_runs=True)
+
+
+class ThreadPool(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor whose tasks run in a copy of the submitting thread's
+    context, so what they record lands in the runs tracked there too.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def stage(name: str):
+    """Time a block under `name` in the process-wide metrics."""
+    return METRICS.stage(name)
+
+
+def incr(name: str, n: int = 1) -> None:
+    METRICS.incr(name, n)
+
+
+@contextmanager
+def track_run(label: str, directory: str = METRICS_DIR):
+    """
+    Collect everything recorded during the block into a per-run report and
+    write it to logs/metrics_<label>_<timestamp>.json. The run's own
+    collector lives in a context variable, so runs that overlap in one
+    process (API workers, batch episodes) each report only their own work;
+    worker pools must be metrics.ThreadPool to carry it into their threads.
+    """
+    run = {"label": label, "started_at": _now(), "status": "ok"}
+    collector = Metrics()
+    token = _RUNS.set((*_RUNS.get(), collector))
+    try:
+        yield run
+    except Exception as e:
+        run["status"] = "failed"
+        run["error"] = str(e)
+        raise
+    finally:
+        _RUNS.reset(token)
+        run["finished_at"] = _now()
+        run.update(collector.report())
+        METRICS.last_run = run
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+        path = os.path.join(directory, f"metrics_{label}_{stamp}.json")
+        with open(path, "w") as f:
+            json.dump(run, f, indent=2)
+        run["report"] = path
+        print(f"[METRICS] Run report written to {path}")
@@ -0,0 +1,78 @@
+# just enough MP3 frame parsing to stitch TTS chunks together and time them
+
+# kbps by [version is MPEG-1][bitrate index] for Layer III
+_BITRATES = {
+    True: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+    False: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+}
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def parse_header(header: bytes):
+    """Return (frame_length, samples_per_frame, sample_rate) for a Layer III header, else None."""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x3
+    layer = (header[1] >> 1) & 0x3
+    bitrate_idx = header[2] >> 4
+    rate_idx = (header[2] >> 2) & 0x3
+    padding = (header[2] >> 1) & 0x1
+    if version == 1 or layer != 1 or rate_idx == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _BITRATES[mpeg1][bitrate_idx] * 1000
+    if not bitrate:
+        return None
+    sample_rate = _SAMPLE_RATES[version][rate_idx]
+    samples = 1152 if mpeg1 else 576
+    length = samples // 8 * bitrate // sample_rate + padding
+    return length, samples, sample_rate
+
+
+def silent_frame(mono: bool = True) -> bytes:
+    """One 36 ms MPEG-1 Layer III frame (32 kbps, 32 kHz) of digital silence."""
+    header = bytes([0xFF, 0xFB, 0x18, 0xC4 if mono else 0x04])
+    return header + bytes(144 - 4)
+
+
+def id3v2_end(data: bytes) -> int:
+    """Offset just past a leading ID3v2 tag, or 0 if there is none."""
+    if data[:3] == b"ID3" and len(data) >= 10:
+        return 10 + ((data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9])
+    return 0
+
+
+def audio_bounds(data: bytes):
+    """
+    Offsets (start, end) of the raw audio frames, skipping a leading ID3v2 tag,
+    a Xing/Info header frame and a trailing ID3v1 tag, so chunks can be concatenated.
+    """
+    start, end = id3v2_end(data), len(data)
+    if end - 128 >= start and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+
+    info = parse_header(data[start:start + 4])
+    if info and (b"Xing" in data[start:start + min(info[0], 64)]
+                 or b"Info" in data[start:start + min(info[0], 64)]):
+        start += info[0]
+    return start, end
+
+
+def duration(data: bytes) -> float:
+    """Duration in seconds, counted frame by frame (exact for CBR and VBR)."""
+    pos, end = audio_bounds(data)
+    seconds = 0.0
+    while pos + 4 <= end:
+        info = parse_header(data[pos:pos + 4])
+        if not info:
+            pos += 1
+            continue
+        length, samples, rate = info
+        seconds += samples / rate
+        pos += length
+    return seconds
+
+
+def file_duration(path: str) -> float:
+    with open(path, "rb") as f:
+        return duration(f.read())
@@ -0,0 +1,161 @@
+import os
+import re
+import html
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import numpy as np
+
+NEARDUP_DB_PATH = Path("data/seen.db")
+
+# estimated Jaccard similarity of word bigrams at which two articles count as the same story
+NEARDUP_THRESHOLD = float(os.getenv("NEARDUP_THRESHOLD", "0.5"))
+NUM_PERM = 64
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+_TAG = re.compile(r"<[^>]+>")
+_WORD = re.compile(r"[a-z0-9]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS neardup_signatures (
+    link      TEXT PRIMARY KEY,
+    signature BLOB NOT NULL,
+    seen_at   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS neardup_buckets (
+    bucket INTEGER NOT NULL,
+    link   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS neardup_bucket ON neardup_buckets(bucket);
+CREATE INDEX IF NOT EXISTS neardup_bucket_link ON neardup_buckets(link);
+CREATE INDEX IF NOT EXISTS neardup_seen_at ON neardup_signatures(seen_at);
+"""
+
+
+def shingles(text: str, size: int = 2) -> set:
+    """Word n-grams of the text with HTML tags and entities stripped."""
+    words = _WORD.findall(html.unescape(_TAG.sub(" ", text)).lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text: str) -> np.ndarray:
+    """NUM_PERM-value MinHash signature of the text's word bigrams."""
+    grams = shingles(text)
+    if not grams:
+        return np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    hv = np.array(
+        [int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), "big") for g in grams],
+        dtype=np.uint64,
+    )
+    perms = (np.outer(hv, _PERM_A) + _PERM_B) % _MERSENNE
+    return perms.min(axis=0)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+def choose_bands(threshold: float, num_perm: int = NUM_PERM):
+    """Pick (bands, rows) so the LSH S-curve turns over near the threshold."""
+    options = [(num_perm // r, r) for r in range(1, num_perm + 1) if num_perm % r == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash LSH index. Signatures are split into bands, and each
+    band is hashed into a bucket stored in SQLite. A lookup only compares
+    against articles that share a bucket, then confirms with the estimated
+    Jaccard similarity.
+    """
+
+    def __init__(self, path=NEARDUP_DB_PATH, threshold: float = NEARDUP_THRESHOLD):
+        self.threshold = threshold
+        self.bands, self.rows = choose_bands(threshold)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self._pending = {}          # link -> signature added this run
+        self._pending_buckets = {}  # bucket -> [links] for this run
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _buckets(self, signature: np.ndarray) -> list:
+        buckets = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(bytes([band]) + chunk, digest_size=8).digest()
+            buckets.append(int.from_bytes(digest, "big", signed=True))
+        return buckets
+
+    def find(self, signature: np.ndarray, exclude: str = None):
+        """Return the link of a known near-duplicate, or None."""
+        buckets = self._buckets(signature)
+
+        candidates = {link for b in buckets for link in self._pending_buckets.get(b, ())}
+        for link in candidates:
+            if link != exclude and similarity(signature, self._pending[link]) >= self.threshold:
+                return link
+
+        marks = ",".join("?" * len(buckets))
+        rows = self.conn.execute(
+            f"""SELECT s.link, s.signature FROM neardup_signatures s
+                WHERE s.link IN (SELECT DISTINCT link FROM neardup_buckets WHERE bucket IN ({marks}))""",
+            buckets,
+        ).fetchall()
+        for link, blob in rows:
+            if link != exclude and similarity(signature, np.frombuffer(blob, dtype=np.uint64)) >= self.threshold:
+                return link
+        return None
+
+    def add(self, link: str, signature: np.ndarray) -> None:
+        """Queue a signature; find() sees it immediately and commit() persists it."""
+        self._pending[link] = signature
+        for b in self._buckets(signature):
+            self._pending_buckets.setdefault(b, []).append(link)
+
+    def commit(self, now: datetime = None) -> None:
+        """Write this run's signatures in one transaction."""
+        if not self._pending:
+            return
+        seen_at = (now or datetime.utcnow()).isoformat()
+        with self._lock, self.conn:
+            links = list(self._pending)
+            self.conn.executemany("DELETE FROM neardup_buckets WHERE link = ?", [(l,) for l in links])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO neardup_signatures VALUES (?, ?, ?)",
+                [(l, self._pending[l].tobytes(), seen_at) for l in links],
+            )
+            self.conn.executemany(
+                "INSERT INTO neardup_buckets VALUES (?, ?)",
+                [(b, l) for b, ls in self._pending_buckets.items() for l in ls],
+            )
+        self._pending = {}
+        self._pending_buckets = {}
+
+    def expire(self, max_age_hours: float, now: datetime = None) -> int:
+        """Forget signatures older than max_age_hours."""
+        now = now or datetime.utcnow()
+        cutoff = (now - timedelta(hours=max_age_hours)).isoformat()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM neardup_buckets WHERE link IN "
+                "(SELECT link FROM neardup_signatures WHERE seen_at < ?)", (cutoff,)
+            )
+            return self.conn.execute(
+                "DELETE FROM neardup_signatures WHERE seen_at < ?", (cutoff,)
+            ).rowcount
@@ -0,0 +1,239 @@
+import os
+import time
+import threading
+from concurrent.futures import as_completed
+
+from app.ingest import ingest_articles, commit_ingest, load_feeds, load_user_feeds
+from app.reason import build_script_request, generate_podcast_script, stream_podcast_script
+from app.speak import text_to_speech
+from app.audio import process_episode
+from app.tts import voice_key
+from app.resources import get_pace_tracker
+from app.delivery import send_episodes, recipients_for
+from app.checkpoint import RunManifest, checkpointed, run_id
+from app.relevance import combined_filter
+from app.metrics import stage, track_run, incr, ThreadPool
+
+BATCH_WORKERS = int(os.getenv("PODCAST_BATCH_WORKERS", "4"))
+
+# ingest rewrites the shared seen map and feed state, so only one run may ingest at a time
+_ingest_lock = threading.Lock()
+
+
+def ingest(user: str = "default", limit_per_feed: int = 20, feeds=None, relevance=None,
+           pending: dict = None) -> int:
+    print("Step 1: Ingesting latest news...")
+    with _ingest_lock, stage("ingest"):
+        article_count = ingest_articles(limit_per_feed=limit_per_feed, user=user, feeds=feeds,
+                                        relevance=relevance, pending=pending)
+    print(f"→ Ingested {article_count} articles.\n")
+    if article_count == 0:
+        print("No new articles — switching to recap mode.\n")
+    return article_count
+
+
+def ingest_stage(user: str, limit_per_feed: int) -> dict:
+    """Ingest with the seen-map commit deferred; the returned dict is the stage's checkpoint."""
+    pending = {}
+    article_count = ingest(user=user, limit_per_feed=limit_per_feed, pending=pending)
+    return {"article_count": article_count, **pending}
+
+
+def produce_episode(user: str = "default", topic: str = "general", minutes: int = 10,
+                    recap: bool = False, deliver: bool = False, out_path: str = None,
+                    stream: bool = False, manifest: RunManifest = None) -> dict:
+    """
+    Reason → speak → post-process (→ deliver) for one user, timing each
+    stage. With stream, the script is narrated paragraph by paragraph while
+    it is still being written, so the two stages overlap and are timed together.
+    With a manifest, every stage's output is checkpointed, and stages an
+    earlier attempt finished are loaded instead of run again.
+    """
+    timings = {}
+
+    def request():
+        # ranked candidates, their summaries and the script prompt, kept so a retry skips retrieval
+        if manifest is None:
+            return None
+        return checkpointed(manifest, "request", lambda: build_script_request(
+            max_minutes=minutes, topic=topic, recap=recap, user=user))
+
+    if manifest is not None and manifest.done("audio") and not os.path.exists(manifest.load("audio")["path"]):
+        # the narrated file is gone, so narrate (and post-process) again from the saved script
+        manifest.discard("audio")
+        manifest.discard("postprocess")
+
+    if stream and not (manifest is not None and manifest.done("script")):
+        with stage("script+audio") as t:
+            print(f"Steps 2-3: Streaming the podcast script into audio for {user}...")
+            narrated, chapters = [], []
+            segments = (narrated.append(s) or s for s in stream_podcast_script(
+                max_minutes=minutes, topic=topic, recap=recap, user=user, request=request()))
+            file_path = text_to_speech(segments, user, out_path=out_path, chapters=chapters)
+            script = "\n\n".join(narrated)
+            narration = {"path": file_path, "chapters": chapters}
+            if manifest is not None:
+                manifest.save("script", {"text": script})
+                manifest.save("audio", narration)
+        timings["script+audio"] = t.seconds
+    else:
+        with stage("script") as t:
+            print(f"Step 2: Generating podcast script for {user}...")
+            script = checkpointed(manifest, "script", lambda: {"text": generate_podcast_script(
+                max_minutes=minutes, topic=topic, recap=recap, user=user, request=request())})["text"]
+            print("→ Script generated successfully.\n")
+        timings["script"] = t.seconds
+
+        with stage("audio") as t:
+            print(f"Step 3: Generating audio file for {user}...")
+            narration = checkpointed(manifest, "audio", lambda: narrate(script, user, out_path))
+        timings["audio"] = t.seconds
+
+    with stage("postprocess") as t:
+        audio = checkpointed(manifest, "postprocess", lambda: postprocess_episode(narration, script))
+    timings["postprocess"] = t.seconds
+
+    if deliver:
+        with stage("delivery") as t:
+            print(f"Step 4: Sending email for {user}...")
+            checkpointed(manifest, "delivery", lambda: deliver_episode(user, narration["path"]))
+        timings["delivery"] = t.seconds
+
+    return {"user": user, "path": narration["path"], "recap": recap, "timings": timings,
+            "duration": audio["duration"], "chapters": audio["chapters"], "words": audio["words"]}
+
+
+def narrate(script: str, user: str, out_path: str = None) -> dict:
+    chapters = []
+    file_path = text_to_speech(script, user, out_path=out_path, chapters=chapters)
+    return {"path": file_path, "chapters": chapters}
+
+
+def postprocess_episode(narration: dict, script: str) -> dict:
+    audio = process_episode(narration["path"], narration["chapters"])
+    incr("audio.bytes_in", audio["bytes_in"])
+    incr("audio.bytes_out", audio["bytes_out"])
+    # the measured pace sets the word target and length fitting of the next episode in this voice
+    audio["words"] = len(script.split())
+    get_pace_tracker().observe(voice_key(), audio["words"], audio["duration"])
+    return audio
+
+
+def deliver_episode(user: str, file_path: str) -> dict:
+    """Email one episode; a failed send fails the run so a retry sends it again."""
+    [outcome] = send_episodes([{"path": file_path, "to": recipients_for(user), "subject": episode_subject(user)}])
+    if not outcome["sent"] and outcome["error"] != "missing credentials":
+        raise RuntimeError(f"Email delivery failed: {outcome['error']}")
+    return outcome
+
+
+def episode_subject(user: str) -> str:
+    return f"{user.title()}'s Daily News Podcast"
+
+
+def run_episode(user: str = "default", topic: str = "general", minutes: int = 10,
+                limit_per_feed: int = 20, deliver: bool = False, out_path: str = None,
+                stream: bool = False, resume: bool = False) -> dict:
+    """
+    Run ingest → reason → speak (→ deliver) for one episode and return what it
+    produced; the run's metrics report is written to logs/.
+
+    Each stage is checkpointed under data/runs/<run id>/. With resume, a run
+    that failed earlier today picks up after its last finished stage. Articles
+    are marked as seen only once the whole run succeeds, so a retry after a
+    failure covers the same news instead of falling back to a recap.
+    """
+    manifest = RunManifest(run_id(user, topic, minutes), resume=resume,
+                           params={"user": user, "topic": topic, "minutes": minutes, "stream": stream,
+                                   "deliver": deliver, "out_path": out_path})
+    with track_run(f"episode_{user}") as run:
+        try:
+            ingested = checkpointed(manifest, "ingest", lambda: ingest_stage(user, limit_per_feed))
+            result = produce_episode(user=user, topic=topic, minutes=minutes,
+                                     recap=ingested["article_count"] == 0, deliver=deliver,
+                                     out_path=out_path, stream=stream, manifest=manifest)
+            commit_ingest(ingested)
+            manifest.finish()
+        except Exception as e:
+            manifest.fail(e)
+            print(f"[CHECKPOINT] Run {manifest.id} failed: {e}. Rerun with --resume to continue from here.")
+            raise
+    result["article_count"] = ingested["article_count"]
+    result["run"] = manifest.id
+    result["metrics"] = run["report"]
+    return result
+
+
+def run_batch(users=None, minutes: int = 10, limit_per_feed: int = 20, deliver: bool = False,
+              max_workers: int = BATCH_WORKERS) -> list:
+    """
+    Ingest the union of every user's feeds once, then generate and narrate
+    each user's episode concurrently. OpenAI calls from all users share the
+    process-wide rate limiter. Emails go out afterwards as one batch over a
+    pooled SMTP session instead of one connection and login per user.
+    """
+    with track_run("batch"):
+        users = users or list(load_user_feeds())
+        feeds = sorted({url for user in users for url in load_feeds(user)})
+        print(f"Batch run for {len(users)} users over {len(feeds)} unique feeds.\n")
+
+        start = time.perf_counter()
+        pending = {}
+        article_count = ingest(user="batch", limit_per_feed=limit_per_feed, feeds=feeds,
+                               relevance=combined_filter(users), pending=pending)
+        ingest_seconds = time.perf_counter() - start
+
+        results = []
+        with ThreadPool(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(produce_episode, user=user, minutes=minutes,
+                            recap=article_count == 0): user
+                for user in users
+            }
+            for future in as_completed(futures):
+                user = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"[BATCH] Episode for {user} failed: {e}")
+                    result = {"user": user, "path": None, "error": str(e), "timings": {}}
+                results.append(result)
+
+        results.sort(key=lambda r: users.index(r["user"]))
+        if deliver:
+            deliver_batch(results)
+
+        # as in run_episode, articles count as seen only when every episode made it out
+        failed = [r["user"] for r in results if not r.get("path") or r.get("delivered") is False]
+        if failed:
+            print(f"[BATCH] Leaving the seen map uncommitted: {', '.join(failed)} failed, "
+                  f"so a rerun treats today's articles as new.")
+        else:
+            commit_ingest(pending)
+
+    print_batch_report(results, ingest_seconds)
+    return results
+
+
+def deliver_batch(results) -> None:
+    """Email every produced episode in one batch; each result gets its own delivery timing."""
+    produced = [r for r in results if r.get("path")]
+    print(f"Step 4: Sending {len(produced)} emails in one batch...")
+    with stage("delivery"):
+        sent = send_episodes([{"path": r["path"], "to": recipients_for(r["user"]),
+                               "subject": episode_subject(r["user"])} for r in produced])
+    for result, outcome in zip(produced, sent):
+        result["timings"]["delivery"] = outcome["seconds"]
+        # without credentials nothing is sent, but that is configuration, not a failed run
+        result["delivered"] = outcome["sent"] or outcome.get("error") == "missing credentials"
+
+
+def print_batch_report(results, ingest_seconds: float) -> None:
+    print(f"\nShared ingest: {ingest_seconds:.1f}s")
+    print(f"{'user':<16}{'script':>9}{'audio':>9}{'post':>9}{'email':>9}{'total':>9}  status")
+    for r in results:
+        t = r["timings"]
+        cells = [t.get("script"), t.get("audio"), t.get("postprocess"), t.get("delivery")]
+        cols = "".join(f"{c:>8.1f}s" if c is not None else f"{'-':>9}" for c in cells)
+        status = "ok" if r.get("path") else f"failed: {r.get('error')}"
+        print(f"{r['user']:<16}{cols}{sum(v for v in cells if v):>8.1f}s  {status}")
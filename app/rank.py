@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+
+# weight of the optional title-embedding signal; 0 ranks on the stored document vectors only
+TITLE_RERANK_WEIGHT = float(os.getenv("RANK_TITLE_WEIGHT", "0"))
+
+
+def cosine_scores(query_vec, matrix) -> np.ndarray:
+    """Cosine similarity of one query vector against every row of a matrix."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.size == 0:
+        return np.zeros(len(matrix), dtype=np.float32)
+    query_vec = np.asarray(query_vec, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vec)
+    norms[norms == 0] = 1.0
+    return matrix @ query_vec / norms
+
+
+def rank_candidates(query_vec, doc_embeddings, title_embeddings=None,
+                    title_weight: float = TITLE_RERANK_WEIGHT, top_k: int = 7):
+    """
+    Score candidates against the query in one matrix operation.
+    Returns (indices of the top_k candidates best first, scores for all candidates).
+    """
+    scores = cosine_scores(query_vec, doc_embeddings)
+    if title_embeddings is not None and title_weight > 0:
+        scores = (1 - title_weight) * scores + title_weight * cosine_scores(query_vec, title_embeddings)
+
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return order, scores
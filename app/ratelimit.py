@@ -0,0 +1,34 @@
+import os
+import time
+import threading
+
+# requests per second allowed against the OpenAI API across every thread in the process
+OPENAI_MAX_RPS = float(os.getenv("OPENAI_MAX_RPS", "5"))
+
+
+class RateLimiter:
+    """Token bucket shared by all threads; acquire() blocks until a request may go out."""
+
+    def __init__(self, rate: float = OPENAI_MAX_RPS, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens from the bucket, sleeping if needed. Returns seconds waited."""
+        if not self.rate or self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
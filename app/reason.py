@@ -1,57 +1,70 @@
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
-import chromadb
-from chromadb.utils import embedding_functions
+import threading
+from itertools import chain
 import numpy as np
-from app.utils import load_cache, save_cache
-import hashlib
-
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-# connect to existing daily collection
-chroma_client = chromadb.PersistentClient(path="chroma_db")
-print("Step 1: Loading collection...")
-
-# necessary because we need to make sure ingestion and reasoning both use 384 dimention embeddings
-embed_fn = embedding_functions.OpenAIEmbeddingFunction(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    model_name="text-embedding-3-small",
-)
-collection = chroma_client.get_collection(
-    name="news_articles",
-    embedding_function=embed_fn,
-)
+from app.resources import (get_embedder, get_lexical_index, get_llm, get_pace_tracker,
+                           get_summary_cache, space_name)
+from app.rank import rank_candidates, TITLE_RERANK_WEIGHT
+from app.cluster import StoryIndex, STORY_INDEX_PATH
+from app.summarize import summarize_articles, reduce_summaries
+from app.llm import with_retries, stream_with_retries, iter_paragraphs
+from app.metrics import stage
+from app.relevance import load_user_config
+from app.retrieve import (retrieve_candidates, reciprocal_rank_fusion, plain_text, RETRIEVAL_WINDOW_HOURS,
+                          RECAP_WINDOW_HOURS)
+from app.ingest import article_hash, feeds_for_groups
+from app.length import fit_segments
+from app.lifecycle import partitions_for
+from app.tts import voice_key
+
+SCRIPT_ARTICLES = 7
+# next-ranked articles kept aside as ready-made segments for a script that runs short
+RESERVE_ARTICLES = 4
+RESERVE_SIMILARITY = 0.6
+
+# concurrent episodes (batch mode, API workers) share the on-disk story index
+_story_lock = threading.Lock()
 
 def summarize_article(title, content):
     """Summarize a single article into 2-3 key sentences."""
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+    return get_llm().complete(
+        [
             {"role": "system", "content": "You are a concise news summarizer."},
             {"role": "user", "content": f"Summarize this article in 2-3 sentences:\n\nTitle: {title}\n\n{content}"}
         ],
         temperature=0.3,
     )
-    return response.choices[0].message.content.strip()
 
 
-def generate_podcast_script(
+def content_hash_of(meta: dict, doc: str) -> str:
+    """Ingest's article_hash for documents stored before the hash was kept in metadata."""
+    summary = doc.split("\n\n", 1)[1] if "\n\n" in doc else doc
+    return article_hash(meta["title"], summary)
+
+
+def build_script_request(
     max_minutes: int = 5,
     topic: str = "general",
     recap: bool = False,
     style: str = "conversational",
-    user: str = "default"
+    user: str = "default",
+    title_rerank_weight: float = TITLE_RERANK_WEIGHT,
 ):
+    """
+    Retrieve, rank, cluster and summarize today's articles, and return the
+    request for the final script completion as plain data (so a run can
+    checkpoint it): messages, intro, extras, and the ranked candidates with
+    their summaries. messages is None when there is nothing to talk about
+    and intro is the whole script. extras are spare story paragraphs for
+    lengthening a short script.
+    """
 
-    """Query the vector DB for today's articles and create a spoken script."""
+    llm = get_llm()
+    embedder = get_embedder()
 
-    if collection.count() == 0:
+    everything = partitions_for()
+    if everything.count() == 0:
         print("[REASON] No data in collection — returning empty script.")
-        return "No news available today."
+        return empty_request()
 
     # Determine query and mode
     if recap:
@@ -61,55 +74,56 @@ def generate_podcast_script(
         query = f"Top {topic} news from the last 24 hours."
         mode_text = "Generate a fresh daily episode summarizing today's main events."
 
+    # embed the query once and hand the same vector to Chroma and the ranking step
+    query_embedding = embedder.embed_query(query)
+
+    # hybrid retrieval: vector and BM25 search over the feeds in the user's groups within the
+    # ingest window (narrowed to one group when the topic names it), fused by reciprocal rank
+    config = load_user_config(user)
+    sources = feeds_for_groups([topic] if topic in config["groups"] else config["groups"])
+    terms = ([topic] if topic != "general" else []) + list(config["keywords"])
+    window = RECAP_WINDOW_HOURS if recap else RETRIEVAL_WINDOW_HOURS
+
     print("Step 2: Querying Chroma...")
-    result = collection.query(query_texts=[query], n_results=30)
+    with stage("reason.query"):
+        # only the day partitions the window overlaps are searched
+        result = retrieve_candidates(partitions_for(window), query_embedding, terms, sources, window,
+                                     lexical=get_lexical_index())
+        if not result["ids"]:
+            # articles stored before ingest recorded timestamps carry no metadata to filter on
+            print("[REASON] Nothing in the retrieval window — searching the whole collection.")
+            result = retrieve_candidates(everything, query_embedding, terms, window_hours=None,
+                                         lexical=get_lexical_index())
     print("Step 2 complete.")
+    if not result["ids"]:
+        return empty_request()
 
-    docs = result["documents"][0]
-    metas = result["metadatas"][0]
+    ids = result["ids"]
+    docs = result["documents"]
+    metas = result["metadatas"]
+    doc_embeddings = np.asarray(result["embeddings"], dtype=np.float32)
 
     print("Step 2b: Ranking articles by semantic relevance...")
 
-    # create an embedding for query
-    query_embedding = client.embeddings.create(
-        input=query,
-        model="text-embedding-3-small"
-    ).data[0].embedding
-
-    # for each doc, compute cosine similarity to query embedding
-    def cosine_similarity(a, b):
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+    # the collection already stores document vectors from the same model, so rank on those;
+    # title embeddings are only fetched when they are used as an extra rerank signal
+    title_embeddings = None
+    if title_rerank_weight > 0:
+        title_embeddings = embedder.embed_cached([meta["title"] for meta in metas])
 
-    # fetch embeddings from chroma or re-embed titles
-    ranked = []
-    for doc, meta in zip(docs, metas):
-        
-        # if title already exists in the cache reuse the vector else embed and store
-        cache = load_cache()
-        cache_key = hashlib.sha256(meta["title"].encode()).hexdigest()
-        print(f"Loaded {len(cache)} cached embeddings.")
-
-        if cache_key in cache:
-            emb = cache[cache_key]
-        else:
-            emb = client.embeddings.create(
-                input=meta["title"],
-                model="text-embedding-3-small"
-            ).data[0].embedding
-            cache[cache_key] = emb
-            save_cache(cache)
-            print(f"Cached new embedding for: {meta['title']}")
-                
-        score = cosine_similarity(query_embedding, emb)
-        ranked.append((score, doc, meta))
-
-    # Sort by score and get top 7
-    ranked.sort(key=lambda x: x[0], reverse=True)
-    ranked = ranked[:7]
+    vector_order, _ = rank_candidates(
+        query_embedding, doc_embeddings, title_embeddings, title_weight=title_rerank_weight, top_k=len(ids)
+    )
+    position = {doc_id: i for i, doc_id in enumerate(ids)}
+    fused = reciprocal_rank_fusion([[ids[i] for i in vector_order], result["lexical"]])
+    order = [position[doc_id] for doc_id in fused[:SCRIPT_ARTICLES]]
+    reserve = [position[doc_id] for doc_id in fused[SCRIPT_ARTICLES:]]
+    extras = spare_segments(reserve, docs, metas, doc_embeddings, doc_embeddings[order], llm)
 
     # rebuild docs/metas for summarization
-    docs = [r[1] for r in ranked]
-    metas = [r[2] for r in ranked]
+    docs = [docs[i] for i in order]
+    metas = [metas[i] for i in order]
+    candidate_embeddings = doc_embeddings[order]
     
     # build the context for retrieval
     context_blocks = []
@@ -120,47 +134,40 @@ def generate_podcast_script(
 
     print("Step 3: Summarizing individual articles...")
 
-    # Instead of just using all docs directly:
-    embeddings = collection.get(include=["embeddings"])["embeddings"]
-    articles = [{"title": m["title"], "source": m["source"], "text": d}
+    # cluster only the candidates, using their own vectors, against the persistent story index
+    articles = [{"title": m["title"], "source": m["source"], "link": m["link"], "text": d,
+                 "hash": m.get("hash") or content_hash_of(m, d)}
                 for m, d in zip(metas, docs)]
 
-    from app.cluster import cluster_articles
-    clusters = cluster_articles(embeddings, articles)
-
-    # Merge cluster content
-    merged_contexts = []
-    for cluster in clusters:
-        combined_text = "\n\n".join([a["text"] for a in cluster])
-        merged_contexts.append(combined_text)
-
-    # compressed stories
-    print(f"[REASON] Summarizing {len(docs)} articles in batch...")
-
-    titles_and_bodies = "\n\n".join(
-        [f"Title: {m['title']}\n\n{d}" for m, d in zip(metas, docs)]
-    )
-
-    batch_prompt = f"""
-    Summarize each of the following articles in 2–3 sentences.
-    Return them numbered (1., 2., 3., etc.), one per line.
-    Be factual and concise, focusing on the key developments only.
-
-    {titles_and_bodies}
-    """
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a concise and accurate news summarizer."},
-            {"role": "user", "content": batch_prompt},
-        ],
-        temperature=0.2,
-    )
-
-    context_text = response.choices[0].message.content.strip()
+    with _story_lock:
+        story_index = StoryIndex(space_name(str(STORY_INDEX_PATH)))
+        story_ids = story_index.assign(
+            candidate_embeddings,
+            ids=[m["link"] for m in metas],
+            titles=[m["title"] for m in metas],
+        )
+        story_index.expire()
+        story_index.save()
+
+    # map: summarize the candidates in token-budgeted shards, concurrently; summaries already
+    # made for the same article content (earlier days, other users) come from the cache,
+    # and a recap is built from cached summaries alone
+    with stage("reason.summarize"):
+        summaries = summarize_articles(articles, llm, cache=get_summary_cache(), allow_llm=not recap)
+
+    # reduce: one context line per story, merging articles that cover the same one
+    clusters = {}
+    for story_id, article, summary in zip(story_ids, articles, summaries):
+        clusters.setdefault(story_id, []).append((article, summary))
+    clusters = list(clusters.values())
+    print(f"[REASON] {len(articles)} candidates fall into {len(clusters)} stories "
+          f"({len(story_index)} tracked).")
+
+    with stage("reason.reduce"):
+        context_text = reduce_summaries(clusters, None if recap else llm)
     print("[REASON] Batch summarization complete.")
-    target_words = max_minutes * 130  # we want it to speak slow enough (around 130 words per minute) that we can understand but also we can 2x speed it
+    # ask for as many words as the narrating voice has been measured to speak in the time
+    target_words = round(max_minutes * get_pace_tracker().wpm(voice_key()))
 
     prompt = f"""
 You are writing a spoken news script for a short AI-generated podcast. 
@@ -182,30 +189,96 @@ Guidelines:
 Context (real articles to summarize):
 {context_text}
 """
-    # call the LLM with our prompt, low temperature because we want more accurate info and dont care as much about diversity 
-    completion = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": """You are a professional podcast scriptwriter and expert news anchor
-            who summarizes important events in a short spoken podcast."""},
-            {"role": "user", "content": prompt},
-        ],
-        temperature=0.2,
-    )
-
-    script = completion.choices[0].message.content.strip()
+    messages = [
+        {"role": "system", "content": """You are a professional podcast scriptwriter and expert news anchor
+        who summarizes important events in a short spoken podcast."""},
+        {"role": "user", "content": prompt},
+    ]
     if recap:
-        script = (
-            "Good day. There are no major new updates, "
-            "so here’s a recap of the key stories from the last few days.\n\n"
-            + script
-        )
+        intro = ("Good day. There are no major new updates, "
+                 "so here’s a recap of the key stories from the last few days.")
     else:
-        script = "Here are today’s top stories.\n\n" + script
-        
+        intro = "Here are today’s top stories."
+    return {"messages": messages, "intro": intro, "extras": extras,
+            "candidates": [{"link": a["link"], "title": a["title"], "story": int(story), "summary": summary}
+                           for a, story, summary in zip(articles, story_ids, summaries)]}
+
+
+def empty_request() -> dict:
+    return {"messages": None, "intro": "No news available today.", "extras": [], "candidates": []}
+
+
+def spare_segments(reserve, docs, metas, embeddings, chosen, llm) -> list:
+    """
+    Short paragraphs for the next-ranked articles that are not the same story
+    as any chosen one, from cached summaries or the article's own lead; no
+    LLM calls, so a script that runs short can be lengthened for free.
+    """
+    def unit(x):
+        return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), 1e-12)
+
+    picked = []
+    for i in reserve:
+        if len(picked) == RESERVE_ARTICLES:
+            break
+        if len(chosen) and float(np.max(unit(chosen) @ unit(embeddings[i]))) >= RESERVE_SIMILARITY:
+            continue
+        picked.append(i)
+    articles = [{"title": metas[i]["title"], "source": metas[i]["source"],
+                 "text": docs[i].split("\n\n", 1)[-1],
+                 "hash": metas[i].get("hash") or content_hash_of(metas[i], docs[i])}
+                for i in picked]
+    summaries = summarize_articles(articles, llm, cache=get_summary_cache(), allow_llm=False)
+    return [f"Also in the news, from {a['source']}: {plain_text(a['title']).rstrip('.')}. {plain_text(summary)}"
+            for a, summary in zip(articles, summaries)]
+
+
+def generate_podcast_script(max_minutes: int = 5, topic: str = "general", recap: bool = False,
+                            style: str = "conversational", user: str = "default",
+                            title_rerank_weight: float = TITLE_RERANK_WEIGHT, request: dict = None):
+    """
+    Query the vector DB for today's articles and create a spoken script,
+    fitted by segment to max_minutes at the voice's measured pace. A request
+    from build_script_request (e.g. a resumed run's checkpoint) skips retrieval.
+    """
+    request = request or build_script_request(max_minutes, topic, recap, style, user, title_rerank_weight)
+    messages, intro, extras = request["messages"], request["intro"], request["extras"]
+    if messages is None:
+        return intro
+
+    llm = get_llm()
+    # call the LLM with our prompt, low temperature because we want more accurate info and dont care as much about diversity 
+    with stage("reason.script"):
+        script = with_retries(lambda: llm.complete(messages, temperature=0.2))
+    wpm = get_pace_tracker().wpm(voice_key())
+    segments = chain([intro], iter_paragraphs([script]))
+    script = "\n\n".join(fit_segments(segments, max_minutes * 60, wpm, extras=extras))
+
     print(f"[REASON] Generated podcast script ({len(script.split())} words)")
     return script
 
+
+def stream_podcast_script(max_minutes: int = 5, topic: str = "general", recap: bool = False,
+                          style: str = "conversational", user: str = "default",
+                          title_rerank_weight: float = TITLE_RERANK_WEIGHT, request: dict = None):
+    """Like generate_podcast_script, but yield the script paragraph by paragraph as it is written."""
+    request = request or build_script_request(max_minutes, topic, recap, style, user, title_rerank_weight)
+    messages, intro, extras = request["messages"], request["intro"], request["extras"]
+    if messages is None:
+        yield intro
+        return
+
+    llm = get_llm()
+    words = 0
+    deltas = stream_with_retries(lambda: llm.stream(messages, temperature=0.2))
+    # the intro is yielded before the completion starts, so narration can begin right away
+    segments = chain([intro], iter_paragraphs(deltas))
+    wpm = get_pace_tracker().wpm(voice_key())
+    for paragraph in fit_segments(segments, max_minutes * 60, wpm, extras=extras):
+        words += len(paragraph.split())
+        yield paragraph
+    print(f"[REASON] Streamed podcast script ({words} words)")
+
 if __name__ == "__main__":
     script = generate_podcast_script(max_minutes=5)
     print(script)
@@ -0,0 +1,96 @@
+import re
+import json
+import os
+from functools import lru_cache
+
+USER_FEEDS_PATH = "feeds/user_feeds.json"
+
+# used for users whose entry in user_feeds.json is a plain list of feed groups
+DEFAULT_KEYWORDS = {
+    "AI": 1.0,
+    "artificial intelligence": 1.0,
+    "machine learning": 1.0,
+    "technology": 1.0,
+    "innovation": 1.0,
+    "US": 1.0,
+    "U.S.": 1.0,
+    "America": 1.0,
+}
+DEFAULT_MIN_SCORE = 1.0
+
+
+def _is_acronym(term: str) -> bool:
+    # short all-caps terms ("AI", "US") only match in capitals so "us" and "ai" in prose don't count
+    letters = [c for c in term if c.isalpha()]
+    return bool(letters) and len(letters) <= 4 and all(c.isupper() for c in letters)
+
+
+class RelevanceFilter:
+    """
+    Weighted keyword scorer compiled into one regex. Terms match on word
+    boundaries; acronyms are case-sensitive, everything else is not. An
+    article's score is the summed weight of the distinct terms it contains.
+    """
+
+    def __init__(self, terms: dict = None, min_score: float = DEFAULT_MIN_SCORE):
+        self.terms = dict(terms if terms is not None else DEFAULT_KEYWORDS)
+        self.min_score = min_score
+        self._weights = {}
+        alternatives = []
+        # longest first so "artificial intelligence" wins over a shorter overlapping term
+        for i, term in enumerate(sorted(self.terms, key=len, reverse=True)):
+            name = f"t{i}"
+            self._weights[name] = float(self.terms[term])
+            body = re.escape(term).replace(r"\ ", r"\s+")
+            if not _is_acronym(term):
+                body = f"(?i:{body})"
+            alternatives.append(f"(?P<{name}>{body})")
+        self.pattern = re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + r")(?!\w)") if alternatives else None
+
+    def score(self, text: str) -> float:
+        if not self.pattern:
+            return 0.0
+        matched = {m.lastgroup for m in self.pattern.finditer(text)}
+        return sum(self._weights[name] for name in matched)
+
+    def is_relevant(self, text: str) -> bool:
+        return self.score(text) >= self.min_score
+
+
+def load_user_config(user: str, path: str = None) -> dict:
+    """
+    A user's entry in user_feeds.json, normalized to {"groups", "keywords", "min_score", "email"}.
+    Entries may be a list of feed groups or an object with those keys.
+    """
+    path = path or USER_FEEDS_PATH
+    config = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            config = json.load(f).get(user, {})
+    if isinstance(config, list):
+        config = {"groups": config}
+    return {
+        "groups": config.get("groups", ["general"]),
+        "keywords": config.get("keywords", DEFAULT_KEYWORDS),
+        "min_score": config.get("min_score", DEFAULT_MIN_SCORE),
+        # recipients for this user's episode; None falls back to RECIPIENT_EMAIL
+        "email": config.get("email"),
+    }
+
+
+@lru_cache(maxsize=None)
+def get_relevance_filter(user: str = "default") -> RelevanceFilter:
+    """Compiled filter for a user, built once per process."""
+    config = load_user_config(user)
+    return RelevanceFilter(config["keywords"], config["min_score"])
+
+
+def combined_filter(users) -> RelevanceFilter:
+    """One filter for a shared ingest: the highest weight per term and the loosest cutoff."""
+    terms, cutoffs = {}, []
+    for user in users:
+        config = load_user_config(user)
+        for term, weight in config["keywords"].items():
+            terms[term] = max(weight, terms.get(term, weight))
+        cutoffs.append(config["min_score"])
+    return RelevanceFilter(terms, min(cutoffs) if cutoffs else DEFAULT_MIN_SCORE)
@@ -0,0 +1,177 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHROMA_PATH = "chroma_db"
+COLLECTION_NAME = "news_articles"
+EMBED_MODEL = "text-embedding-3-small"  # keep in step with app.embeddings.EMBED_MODEL
+
+# importing the pipeline modules must stay cheap; app/test_startup.py enforces this
+IMPORT_BUDGET_SECONDS = float(os.getenv("PODCAST_IMPORT_BUDGET", "1.0"))
+
+_resources = {}
+_lock = threading.RLock()
+
+
+def _get(name: str, factory):
+    """Build a resource on first use and hand the same instance to every caller."""
+    resource = _resources.get(name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(name)
+            if resource is None:
+                resource = factory()
+                _resources[name] = resource
+    return resource
+
+
+def reset() -> None:
+    """Forget every resource (tests, or after forking worker processes)."""
+    with _lock:
+        _resources.clear()
+
+
+def forget(name: str) -> None:
+    """Drop one resource, e.g. a collection handle after the collection was deleted."""
+    with _lock:
+        _resources.pop(name, None)
+
+
+def get_openai_client():
+    """One OpenAI client per process so its HTTP connection pool is reused."""
+    def build():
+        from openai import OpenAI
+        return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _get("openai", build)
+
+
+def get_chroma_client():
+    # persistent client keeps vectors across runs and not reset after the script is done
+    def build():
+        import chromadb
+        return chromadb.PersistentClient(path=CHROMA_PATH)
+    return _get("chroma", build)
+
+
+def get_embedding_function():
+    # ingestion and reasoning must embed with the same model so vector dimensions match
+    def build():
+        from chromadb.utils import embedding_functions
+        return embedding_functions.OpenAIEmbeddingFunction(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            model_name=EMBED_MODEL,
+            # the OpenAI client reads OPENAI_BASE_URL itself; Chroma's wrapper needs it passed
+            api_base=os.getenv("OPENAI_BASE_URL"),
+        )
+    return _get("embed_fn", build)
+
+
+def get_embedding_backend():
+    """The embedding backend for this process (PODCAST_EMBED_BACKEND=openai or local)."""
+    def build():
+        from app.embeddings import get_embedding_backend as make_backend
+        return make_backend()
+    return _get("embed_backend", build)
+
+
+def get_local_model(name: str):
+    """Load a sentence-transformers model once per process, however many services use it."""
+    def build():
+        from app.embeddings import load_local_model
+        return load_local_model(name)
+    return _get(f"local_model:{name}", build)
+
+
+def space_name(base: str) -> str:
+    """
+    Suffix a collection, cache or index name with the active embedding space,
+    so vectors from different models or dimensions never share storage.
+    """
+    from app.embeddings import embedding_space
+    space = embedding_space(get_embedding_backend())
+    return f"{base}__{space}" if space else base
+
+
+def get_collection(name: str = None):
+    """Get the article collection for the active embedding space, creating it if missing."""
+    name = name or space_name(COLLECTION_NAME)
+
+    def build():
+        # vectors are always passed in explicitly; only the original OpenAI collection
+        # keeps the embedding function it was created with
+        ef = get_embedding_function() if name == COLLECTION_NAME else None
+        return get_chroma_client().get_or_create_collection(name=name, embedding_function=ef)
+    return _get(f"collection:{name}", build)
+
+
+def get_embedder():
+    """Shared embedding service backed by the on-disk vector cache for its embedding space."""
+    def build():
+        from app.embeddings import EmbeddingService
+        from app.utils import get_embedding_cache
+        return EmbeddingService(get_embedding_backend(), cache=get_embedding_cache(space_name("embeddings")))
+    return _get("embedder", build)
+
+
+def get_lexical_index():
+    """BM25 index over ingested articles, shared by ingest and retrieval."""
+    def build():
+        from app.retrieve import LexicalIndex
+        return LexicalIndex()
+    return _get("lexical_index", build)
+
+
+def get_rate_limiter():
+    """Process-wide limiter every OpenAI call goes through (OPENAI_MAX_RPS)."""
+    def build():
+        from app.ratelimit import RateLimiter
+        return RateLimiter()
+    return _get("rate_limiter", build)
+
+
+def get_llm():
+    """Shared chat backend (PODCAST_LLM_BACKEND=openai or fake)."""
+    def build():
+        from app.llm import get_llm_backend
+        return get_llm_backend()
+    return _get("llm", build)
+
+
+def get_summary_cache():
+    """Per-article summary cache shared by every episode in the process."""
+    def build():
+        from app.summary_cache import SummaryCache
+        cache = SummaryCache()
+        cache.expire()
+        return cache
+    return _get("summary_cache", build)
+
+
+def get_smtp_pool():
+    """Pooled SMTP sessions, so each batch of emails shares one connection and login."""
+    def build():
+        from app.delivery import SMTPPool
+        return SMTPPool()
+    return _get("smtp_pool", build)
+
+
+def get_audio_pool():
+    """Worker processes for audio post-processing, so episodes in a batch encode on separate cores."""
+    def build():
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from app.audio import AUDIO_WORKERS
+        # spawn, not fork: the pipeline forks from threads that may hold locks
+        return ProcessPoolExecutor(max_workers=AUDIO_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _get("audio_pool", build)
+
+
+def get_pace_tracker():
+    """Measured words-per-minute per TTS voice, shared by script writing and post-processing."""
+    def build():
+        from app.length import PaceTracker
+        return PaceTracker()
+    return _get("pace_tracker", build)
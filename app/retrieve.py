@@ -0,0 +1,164 @@
+import os
+import re
+import html
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+LEXICAL_DB_PATH = Path("data/lexical.db")
+
+# ingest-timestamp windows for a daily episode and for a recap of the last few days
+RETRIEVAL_WINDOW_HOURS = float(os.getenv("RETRIEVAL_WINDOW_HOURS", "36"))
+RECAP_WINDOW_HOURS = float(os.getenv("RECAP_WINDOW_HOURS", "96"))
+# lexical postings older than this are dropped at ingest; no window ever reaches them
+LEXICAL_TTL_HOURS = float(os.getenv("LEXICAL_TTL_HOURS", "168"))
+RETRIEVAL_CANDIDATES = 30
+# the usual reciprocal-rank-fusion constant; damps the influence of the very top ranks
+RRF_K = 60
+
+_TAG = re.compile(r"<[^>]+>")
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS lexical USING fts5(
+    doc_id UNINDEXED,
+    text,
+    ingested_at UNINDEXED,
+    source UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+
+
+def plain_text(text: str) -> str:
+    return " ".join(html.unescape(_TAG.sub(" ", text)).split())
+
+
+def match_expression(terms) -> str:
+    """An FTS5 query matching any of the terms; multi-word terms match as phrases."""
+    quoted = []
+    for term in dict.fromkeys(t.strip() for t in terms if t and t.strip()):
+        quoted.append('"' + term.replace('"', '""') + '"')
+    return " OR ".join(quoted)
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over ingested articles, kept in SQLite FTS5 and
+    updated incrementally: each ingest adds only its new documents, and
+    search filters on ingest time and source feed like the Chroma query does.
+    """
+
+    def __init__(self, path=LEXICAL_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(lexical)")]
+        if columns and "source" not in columns:
+            # indexes built before filtering by source feed; rebuilt by the next ingests
+            print(f"[RETRIEVE] Rebuilding {self.path} with a source column")
+            self.conn.execute("DROP TABLE lexical")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM lexical").fetchone()[0]
+
+    def add_many(self, records) -> None:
+        """Index (doc_id, text, ingested_at, source) records, replacing earlier versions of a doc."""
+        records = [(doc_id, plain_text(text), ingested_at, source) for doc_id, text, ingested_at, source in records]
+        if not records:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM lexical WHERE doc_id = ?", [(r[0],) for r in records])
+            self.conn.executemany("INSERT INTO lexical VALUES (?, ?, ?, ?)", records)
+
+    def search(self, terms, k: int = RETRIEVAL_CANDIDATES, since: float = None, sources=None) -> list:
+        """Top-k (doc_id, score) by BM25 for any of the terms, best first."""
+        expression = match_expression(terms)
+        if not expression:
+            return []
+        sql = "SELECT doc_id, bm25(lexical) AS rank FROM lexical WHERE lexical MATCH ?"
+        params = [expression]
+        if since is not None:
+            sql += " AND ingested_at >= ?"
+            params.append(since)
+        if sources:
+            sql += f" AND source IN ({','.join('?' * len(sources))})"
+            params.extend(sources)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(k)
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        # FTS5's bm25() is negative, lower is better
+        return [(doc_id, -rank) for doc_id, rank in rows]
+
+    def expire(self, max_age_hours: float = LEXICAL_TTL_HOURS, now: float = None) -> int:
+        cutoff = (now or time.time()) - max_age_hours * 3600
+        with self._lock, self.conn:
+            return self.conn.execute("DELETE FROM lexical WHERE ingested_at < ?", (cutoff,)).rowcount
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K) -> list:
+    """Merge ranked id lists: each id scores sum(1 / (k + rank)), best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda d: -scores[d])
+
+
+def metadata_filter(since: float = None, sources=None):
+    """Chroma `where` clause for the ingest window and source feeds, or None."""
+    clauses = []
+    if since is not None:
+        clauses.append({"ingested_at": {"$gte": since}})
+    if sources:
+        clauses.append({"source": {"$in": list(sources)}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def retrieve_candidates(collection, query_embedding, terms, sources=None, window_hours: float = RETRIEVAL_WINDOW_HOURS,
+                        n_results: int = RETRIEVAL_CANDIDATES, lexical: LexicalIndex = None) -> dict:
+    """
+    Vector search and BM25 search over the same filtered slice of the
+    collection. Returns the union of both hit lists as Chroma-style columns
+    (ids, documents, metadatas, embeddings) plus the lexical ranking by id.
+    window_hours=None searches every ingest time.
+    """
+    since = time.time() - window_hours * 3600 if window_hours else None
+    where = metadata_filter(since, sources)
+    result = collection.query(
+        query_embeddings=[list(map(float, query_embedding))],
+        n_results=n_results,
+        where=where,
+        include=["documents", "metadatas", "embeddings"],
+    )
+    ids = list(result["ids"][0])
+    docs = list(result["documents"][0])
+    metas = list(result["metadatas"][0])
+    embeddings = list(result["embeddings"][0])
+
+    lexical_ids = [doc_id for doc_id, _ in lexical.search(terms, n_results, since, sources)] if lexical else []
+    known = set(ids)
+    missing = [doc_id for doc_id in lexical_ids if doc_id not in known]
+    if missing:
+        extra = collection.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+        ids += list(extra["ids"])
+        docs += list(extra["documents"])
+        metas += list(extra["metadatas"])
+        embeddings += list(extra["embeddings"])
+
+    # a lexical hit no longer in this collection (another embedding space, pruned) is dropped
+    known = set(ids)
+    lexical_ids = [doc_id for doc_id in lexical_ids if doc_id in known]
+    print(f"[RETRIEVE] {len(result['ids'][0])} vector and {len(lexical_ids)} lexical hits "
+          f"within {f'{window_hours:.0f}h' if window_hours else 'all time'} ({len(ids)} candidates)")
+    return {"ids": ids, "documents": docs, "metadatas": metas, "embeddings": embeddings,
+            "lexical": lexical_ids}
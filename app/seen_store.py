@@ -0,0 +1,133 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+
+SEEN_DB_PATH = Path("data/seen.db")
+
+# SQLite caps bound parameters per statement, so IN (...) lookups go in slices
+_LOOKUP_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    link       TEXT PRIMARY KEY,
+    hash       TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen  TEXT NOT NULL,
+    source     TEXT
+);
+CREATE INDEX IF NOT EXISTS seen_hash ON seen(hash);
+CREATE INDEX IF NOT EXISTS seen_last_seen ON seen(last_seen);
+CREATE INDEX IF NOT EXISTS seen_source ON seen(source);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+class SeenStore:
+    """
+    Dedup store for ingested articles, indexed by link and by content hash.
+    Writes are batched into one transaction per ingest run and entries that
+    have not been seen for a while are expired instead of kept forever.
+    """
+
+    def __init__(self, path=SEEN_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def _select_in(self, column: str, values) -> list:
+        values = list(values)
+        rows = []
+        for i in range(0, len(values), _LOOKUP_CHUNK):
+            chunk = values[i:i + _LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows.extend(self.conn.execute(
+                f"SELECT link, hash, first_seen, last_seen, source FROM seen WHERE {column} IN ({marks})",
+                chunk,
+            ).fetchall())
+        return rows
+
+    def lookup(self, links) -> dict:
+        """Return {link: record} for the links that are already known."""
+        return {
+            link: {"hash": h, "first_seen": first, "last_seen": last, "source": source}
+            for link, h, first, last, source in self._select_in("link", links)
+        }
+
+    def known_hashes(self, hashes) -> set:
+        """Content hashes already stored under any link (the same story syndicated elsewhere)."""
+        return {row[1] for row in self._select_in("hash", hashes)}
+
+    def upsert_many(self, records) -> None:
+        """
+        Insert or refresh many records in a single transaction.
+        Each record needs link, hash, last_seen and source; first_seen is kept if present.
+        """
+        rows = [(r["link"], r["hash"], r.get("first_seen") or r["last_seen"], r["last_seen"], r.get("source"))
+                for r in records]
+        if not rows:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO seen (link, hash, first_seen, last_seen, source) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(link) DO UPDATE SET
+                    hash = excluded.hash,
+                    last_seen = excluded.last_seen,
+                    source = excluded.source
+                """,
+                rows,
+            )
+
+    def touch(self, links, now: datetime = None) -> None:
+        """Record a sighting of already-stored links whose content did not change."""
+        self._touch("link", links, now)
+
+    def touch_sources(self, sources, now: datetime = None) -> None:
+        """Record a sighting of every stored entry from feeds that answered "not modified"."""
+        self._touch("source", sources, now)
+
+    def _touch(self, column: str, values, now: datetime = None) -> None:
+        values = list(values)
+        when = (now or datetime.utcnow()).isoformat()
+        with self._lock, self.conn:
+            for i in range(0, len(values), _LOOKUP_CHUNK):
+                chunk = values[i:i + _LOOKUP_CHUNK]
+                self.conn.execute(
+                    f"UPDATE seen SET last_seen = ? WHERE {column} IN ({','.join('?' * len(chunk))})",
+                    [when, *chunk],
+                )
+
+    def expire(self, max_age_hours: float, now: datetime = None) -> int:
+        """Delete entries whose last sighting is older than max_age_hours."""
+        now = now or datetime.utcnow()
+        cutoff = (now - timedelta(hours=max_age_hours)).isoformat()
+        with self._lock, self.conn:
+            return self.conn.execute("DELETE FROM seen WHERE last_seen < ?", (cutoff,)).rowcount
+
+    def import_json(self, path) -> int:
+        """One-off import of the old seen_articles.json map."""
+        path = Path(path)
+        done = self.conn.execute("SELECT value FROM meta WHERE key = 'json_imported'").fetchone()
+        if done or not path.exists():
+            return 0
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                seen = json.load(f)
+        except json.JSONDecodeError:
+            seen = {}
+        self.upsert_many({"link": link, **record} for link, record in seen.items() if record.get("hash"))
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('json_imported', ?)", (str(path),))
+        return len(seen)
@@ -1,34 +1,220 @@
 import os
+import re
+import time
+import shutil
+import tempfile
 from datetime import datetime
+from concurrent.futures import wait, FIRST_COMPLETED
 from dotenv import load_dotenv
-from openai import OpenAI
-from app.reason import generate_podcast_script
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+
+from app.tts import get_tts_backend, MAX_TTS_CHARS
+from app.mp3 import audio_bounds, file_duration, id3v2_end
+from app.audio import chapter_title
+from app.audio_cache import get_audio_cache, segment_key
+from app.metrics import ThreadPool
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))
+TTS_RETRIES = 3
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"'”’)])\s+")
+
+
+def split_script(text: str, max_chars: int = MAX_TTS_CHARS) -> list:
+    """
+    Split a script into TTS chunks at segment (paragraph) boundaries.
+    Paragraphs over max_chars are split between sentences, and a sentence
+    that is still too long is split between words.
+    """
+    chunks = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            chunks.append(paragraph)
+            continue
+
+        current = ""
+        for sentence in _SENTENCE_END.split(paragraph):
+            pieces = [sentence]
+            if len(sentence) > max_chars:
+                pieces, word_run = [], ""
+                for word in sentence.split():
+                    if word_run and len(word_run) + 1 + len(word) > max_chars:
+                        pieces.append(word_run)
+                        word_run = ""
+                    word_run = f"{word_run} {word}".strip()
+                pieces.append(word_run)
+            for piece in pieces:
+                if current and len(current) + 1 + len(piece) > max_chars:
+                    chunks.append(current)
+                    current = ""
+                current = f"{current} {piece}".strip()
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def _synthesize_with_retry(backend, text: str, part_path: str, retries: int = TTS_RETRIES,
+                           cache=None, key: str = None) -> str:
+    for attempt in range(retries + 1):
+        try:
+            backend.synthesize(text, part_path)
+            return cache.put(key, part_path) if cache else part_path
+        except Exception as e:
+            if attempt == retries:
+                raise
+            wait_s = 2 ** attempt
+            print(f"[TTS] Chunk failed ({e}); retrying in {wait_s}s...")
+            time.sleep(wait_s)
+
+
+def _append_audio(out, part_path: str, first: bool) -> None:
+    """Append one chunk's MP3 frames to the open output file without loading it whole."""
+    with open(part_path, "rb") as part:
+        head = part.read(64 * 1024)
+        size = os.path.getsize(part_path)
+        # chunks drop their Xing/Info frames, whose frame and byte counts describe that
+        # chunk alone, and their ID3 tags so the frames run on seamlessly; the first
+        # chunk's ID3v2 tag is kept as the episode's
+        start, _ = audio_bounds(head)
+        part.seek(max(size - 128, 0))
+        end = size - 128 if part.read(3) == b"TAG" else size
+        ranges = [(0, id3v2_end(head)), (start, end)] if first else [(start, end)]
+        for range_start, range_end in ranges:
+            part.seek(range_start)
+            remaining = range_end - range_start
+            while remaining > 0:
+                buf = part.read(min(64 * 1024, remaining))
+                if not buf:
+                    break
+                out.write(buf)
+                remaining -= len(buf)
+    out.flush()
+
+
+def _split_segments(segments, seen: list, titles: list):
+    """
+    Lazily split segments into TTS chunks, recording (segment number, chunk)
+    in seen and each segment's chapter title in titles.
+    """
+    for segment in segments:
+        titles.append(chapter_title(segment))
+        for chunk in split_script(segment):
+            seen.append((len(titles) - 1, chunk))
+            yield chunk
+
+
+def _chapters(seen: list, titles: list, durations: list) -> list:
+    """One chapter per segment, spanning the audio of its chunks."""
+    chapters, position = [], 0.0
+    for (number, _), seconds in zip(seen, durations):
+        if not chapters or chapters[-1]["number"] != number:
+            chapters.append({"number": number, "title": titles[number], "start": position})
+        position += seconds
+        chapters[-1]["end"] = position
+    return [{"title": c["title"], "start": c["start"], "end": c["end"]} for c in chapters]
+
+
+def synthesize_chunks(chunks, out_path: str, backend=None, max_workers: int = TTS_CONCURRENCY,
+                      retries: int = TTS_RETRIES, cache=None, durations: list = None) -> str:
+    """
+    Synthesize chunks concurrently and stitch them into out_path in script
+    order, appending each one as soon as it and everything before it is done.
+    chunks may be a lazy iterator (a script still being written): each chunk
+    is submitted as it arrives and finished audio is written in between.
+    With a cache, segments already narrated in the same voice are reused as is.
+    Audio is written to out_path + ".part" and renamed once complete.
+    durations, if given, receives each chunk's length in seconds, in order.
+    """
+    backend = backend or get_tts_backend()
+    partial = out_path + ".part"
+    work_dir = tempfile.mkdtemp(prefix="tts_", dir=os.path.dirname(out_path) or ".")
+    # cached segments are pinned until stitched, so another episode's evict() cannot delete them
+    pinned = []
+    try:
+        with open(partial, "wb") as out, ThreadPool(max_workers=max_workers) as pool:
+            done_parts = {}
+            pending = {}
+            next_index = 0
+
+            def collect(block: bool) -> None:
+                nonlocal next_index
+                if pending:
+                    finished, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        done_parts[pending.pop(future)] = future.result()
+                while next_index in done_parts:
+                    part_path = done_parts.pop(next_index)
+                    if durations is not None:
+                        durations.append(file_duration(part_path))
+                    _append_audio(out, part_path, first=next_index == 0)
+                    if not cache:
+                        os.remove(part_path)
+                    next_index += 1
+
+            for i, text in enumerate(chunks):
+                key = segment_key(text, backend.voice, backend.model) if cache else None
+                if cache:
+                    cache.pin(key)
+                    pinned.append(key)
+                cached = cache.get(key) if cache else None
+                if cached:
+                    done_parts[i] = cached
+                else:
+                    future = pool.submit(_synthesize_with_retry, backend, text,
+                                         os.path.join(work_dir, f"{i:04d}.mp3"), retries, cache, key)
+                    pending[future] = i
+                collect(block=False)
+
+            while pending or next_index in done_parts:
+                collect(block=True)
+        os.replace(partial, out_path)
+    finally:
+        for key in pinned:
+            cache.unpin(key)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if os.path.exists(partial):
+            os.remove(partial)
+
+    if cache:
+        cache.evict()
+    return out_path
+
 
-def text_to_speech(text: str, user: str = "default"):
+def text_to_speech(text, user: str = "default", backend=None, out_path: str = None,
+                   cache=None, chapters: list = None):
+    """
+    Narrate a script into output/. text is either the whole script or an
+    iterator of segments (paragraphs) that is narrated while it is produced.
+    chapters, if given, receives one {"title", "start", "end"} per segment.
+    """
     today = datetime.now().strftime("%Y-%m-%d")
     os.makedirs("output", exist_ok=True)
-    out_path = f"output/podcast_{user}_{today}.mp3"
+    out_path = out_path or f"output/podcast_{user}_{today}.mp3"
 
-    with client.audio.speech.with_streaming_response.create(
-        model="gpt-4o-mini-tts",
-        voice="alloy",
-        input=text,
-    ) as response:
-        response.stream_to_file(out_path)
+    cache = cache or get_audio_cache()
+    hits_before = cache.hits
+    chunks, titles, durations = [], [], []
+    if isinstance(text, str):
+        segments = [p for p in re.split(r"\n\s*\n", text) if p.strip()]
+        source = list(_split_segments(segments, chunks, titles))
+        print(f"[TTS] Synthesizing {len(chunks)} chunks with up to {TTS_CONCURRENCY} in parallel...")
+    else:
+        source = _split_segments(text, chunks, titles)
+        print(f"[TTS] Narrating segments as they arrive, up to {TTS_CONCURRENCY} in parallel...")
+    synthesize_chunks(source, out_path, backend=backend, cache=cache, durations=durations)
+    if chapters is not None:
+        chapters.extend(_chapters(chunks, titles, durations))
+    print(f"[TTS] Reused {cache.hits - hits_before}/{len(chunks)} segments from the audio cache.")
 
     print(f"Podcast saved to {out_path}")
     return out_path
 
 if __name__ == "__main__":
+    from app.reason import generate_podcast_script
     print("[RUN] Generating script...")
     script = generate_podcast_script(max_minutes=5)
     print("[RUN] Converting to audio...")
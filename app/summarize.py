@@ -0,0 +1,162 @@
+import os
+import re
+from functools import lru_cache
+
+from app.embeddings import estimate_tokens
+from app.llm import with_retries, LLM_RETRIES
+from app.metrics import ThreadPool
+
+# input tokens per map request, leaving room in the context window for the summaries
+MAP_TOKEN_BUDGET = int(os.getenv("SUMMARIZE_SHARD_TOKENS", "6000"))
+# above this the merged summaries get one more LLM pass before the script prompt
+REDUCE_TOKEN_BUDGET = int(os.getenv("SUMMARIZE_REDUCE_TOKENS", "12000"))
+SUMMARIZE_CONCURRENCY = int(os.getenv("SUMMARIZE_CONCURRENCY", "4"))
+
+# bump whenever MAP_PROMPT changes so cached summaries from the old prompt are not reused
+SUMMARY_PROMPT_VERSION = "map-v1"
+
+SYSTEM_PROMPT = "You are a concise and accurate news summarizer."
+MAP_PROMPT = """Summarize each of the following articles in 2–3 sentences.
+Return them numbered with the article's number (e.g. "3. ..."), one per line.
+Be factual and concise, focusing on the key developments only.
+
+{articles}"""
+REDUCE_PROMPT = """Condense these story summaries, keeping their numbering and one line per story.
+Merge repeated facts and keep every story, but cut each to its essential development.
+
+{summaries}"""
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when it is available, otherwise a character estimate."""
+    encoder = _encoder()
+    return len(encoder.encode(text)) if encoder else estimate_tokens(text)
+
+
+def _article_block(number: int, article: dict, max_tokens: int) -> str:
+    body = article["text"]
+    # a single article larger than the shard budget is truncated rather than dropped
+    if count_tokens(body) > max_tokens:
+        body = body[: max_tokens * 4]
+    return f"[{number}] Title: {article['title']}\n\n{body}\n"
+
+
+def shard_articles(articles, budget: int = MAP_TOKEN_BUDGET) -> list:
+    """Group article indices into shards whose prompts stay under the token budget."""
+    overhead = count_tokens(MAP_PROMPT)
+    shards, current, used = [], [], overhead
+    for i, article in enumerate(articles):
+        tokens = count_tokens(_article_block(i + 1, article, budget - overhead))
+        if current and used + tokens > budget:
+            shards.append(current)
+            current, used = [], overhead
+        current.append(i)
+        used += tokens
+    if current:
+        shards.append(current)
+    return shards
+
+
+def parse_numbered(text: str) -> dict:
+    """Map "N. summary" lines (continuations included) to {N: summary}."""
+    out, number = {}, None
+    for line in text.splitlines():
+        match = re.match(r"^\s*\[?(\d+)[.)\]]\s*(.*)$", line)
+        if match:
+            number = int(match.group(1))
+            out[number] = match.group(2).strip()
+        elif number is not None and line.strip():
+            out[number] += " " + line.strip()
+    return out
+
+
+def _summarize_shard(llm, articles, indices, budget, retries) -> dict:
+    blocks = "\n".join(_article_block(i + 1, articles[i], budget) for i in indices)
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": MAP_PROMPT.format(articles=blocks)},
+    ]
+    text = with_retries(lambda: llm.complete(messages, temperature=0.2), retries=retries, label="SUMMARIZE")
+    parsed = parse_numbered(text)
+    return {i: parsed.get(i + 1) for i in indices}
+
+
+def summarize_articles(articles, llm, budget: int = MAP_TOKEN_BUDGET,
+                       concurrency: int = SUMMARIZE_CONCURRENCY, retries: int = LLM_RETRIES,
+                       cache=None, allow_llm: bool = True) -> list:
+    """
+    Map step: summarize articles in token-budgeted shards, running shards
+    concurrently. Returns one summary per article, in input order; an article
+    the model skipped falls back to its own opening text.
+
+    With a cache, articles carrying a content "hash" are looked up first and
+    only misses are sent to the LLM. allow_llm=False serves cache hits only.
+    """
+    if not articles:
+        return []
+    summaries = [None] * len(articles)
+
+    if cache is not None:
+        cached = cache.get_many([a["hash"] for a in articles if a.get("hash")],
+                                SUMMARY_PROMPT_VERSION, llm.model)
+        for i, a in enumerate(articles):
+            summaries[i] = cached.get(a.get("hash"))
+
+    todo = [i for i, s in enumerate(summaries) if s is None]
+    if todo and allow_llm:
+        pending = [articles[i] for i in todo]
+        shards = shard_articles(pending, budget)
+        print(f"[SUMMARIZE] {len(pending)} of {len(articles)} articles need the LLM: "
+              f"{len(shards)} shard(s), up to {concurrency} at once")
+
+        fresh = {}
+        with ThreadPool(max_workers=max(1, min(concurrency, len(shards)))) as pool:
+            futures = [pool.submit(_summarize_shard, llm, pending, shard, budget, retries) for shard in shards]
+            for future in futures:
+                for j, summary in future.result().items():
+                    summaries[todo[j]] = summary
+                    if summary and pending[j].get("hash"):
+                        fresh[pending[j]["hash"]] = summary
+        if cache is not None:
+            cache.put_many(fresh, SUMMARY_PROMPT_VERSION, llm.model)
+    elif todo:
+        print(f"[SUMMARIZE] {len(articles) - len(todo)} cached summaries, "
+              f"{len(todo)} articles use their own text (no LLM calls)")
+
+    for i, summary in enumerate(summaries):
+        if not summary:
+            summaries[i] = " ".join(articles[i]["text"].split()[:60])
+    return summaries
+
+
+def reduce_summaries(clusters, llm=None, budget: int = REDUCE_TOKEN_BUDGET,
+                     retries: int = LLM_RETRIES) -> str:
+    """
+    Reduce step: merge per-article summaries into one numbered line per story.
+    `clusters` is a list of stories, each a list of (article, summary) pairs.
+    Only if the result is over budget is it condensed with one more LLM call.
+    """
+    lines = []
+    for n, story in enumerate(clusters, 1):
+        titles = " / ".join(dict.fromkeys(a["title"] for a, _ in story))
+        sources = ", ".join(dict.fromkeys(a["source"] for a, _ in story))
+        text = " ".join(dict.fromkeys(s for _, s in story))
+        lines.append(f"{n}. {titles}: {text} (Sources: {sources})")
+    context = "\n".join(lines)
+
+    if llm is not None and count_tokens(context) > budget:
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": REDUCE_PROMPT.format(summaries=context)},
+        ]
+        context = with_retries(lambda: llm.complete(messages, temperature=0.2), retries=retries, label="SUMMARIZE")
+    return context
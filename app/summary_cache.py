@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+
+from app.metrics import incr
+
+SUMMARY_CACHE_PATH = Path("cache/summaries.db")
+SUMMARY_CACHE_MAX_AGE_DAYS = int(os.getenv("SUMMARY_CACHE_MAX_AGE_DAYS", "14"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    content_hash   TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    model          TEXT NOT NULL,
+    summary        TEXT NOT NULL,
+    created_at     TEXT NOT NULL,
+    used_at        TEXT NOT NULL,
+    PRIMARY KEY (content_hash, prompt_version, model)
+);
+CREATE INDEX IF NOT EXISTS summaries_used_at ON summaries(used_at);
+"""
+
+
+class SummaryCache:
+    """
+    Per-article summaries keyed by (content hash, prompt version, model), shared
+    across runs and users. Changing the prompt or the model naturally misses.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get_many(self, hashes, prompt_version: str, model: str) -> dict:
+        """Return {content_hash: summary} for the hashes that are cached."""
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                found.update(self.conn.execute(
+                    f"SELECT content_hash, summary FROM summaries WHERE prompt_version = ? AND model = ? "
+                    f"AND content_hash IN ({marks})",
+                    [prompt_version, model, *chunk],
+                ).fetchall())
+            if found:
+                now = datetime.utcnow().isoformat()
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE summaries SET used_at = ? WHERE content_hash = ? AND prompt_version = ? AND model = ?",
+                        [(now, h, prompt_version, model) for h in found],
+                    )
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        incr("summary_cache.hits", len(found))
+        incr("summary_cache.misses", len(hashes) - len(found))
+        return found
+
+    def put_many(self, summaries: dict, prompt_version: str, model: str) -> None:
+        """Store {content_hash: summary} in one transaction."""
+        if not summaries:
+            return
+        now = datetime.utcnow().isoformat()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?)",
+                [(h, prompt_version, model, s, now, now) for h, s in summaries.items()],
+            )
+
+    def expire(self, max_age_days: float = SUMMARY_CACHE_MAX_AGE_DAYS) -> int:
+        """Drop summaries not used within max_age_days."""
+        cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).isoformat()
+        with self._lock, self.conn:
+            return self.conn.execute("DELETE FROM summaries WHERE used_at < ?", (cutoff,)).rowcount
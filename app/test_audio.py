@@ -0,0 +1,115 @@
+import os
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from mutagen.id3 import ID3
+
+from app import audio
+from app.audio import PROFILES, chapter_title, ffmpeg_command, postprocess, process_episode
+from app.audio_cache import AudioCache
+from app.mp3 import file_duration
+from app.speak import text_to_speech
+from app.tts import LocalTTSBackend
+
+SCRIPT = ("Here are today's top stories. First up, chips.\n\n"
+          + "Chip makers raced to ship new accelerators this week. " * 8
+          + "\n\nIn politics, the Senate passed the budget.\n\nThat's all for today.")
+
+
+def narrate(tmp_path, name="ep.mp3"):
+    chapters = []
+    path = text_to_speech(SCRIPT, backend=LocalTTSBackend(), out_path=str(tmp_path / name),
+                          cache=AudioCache(tmp_path / "audio"), chapters=chapters)
+    return path, chapters
+
+
+def test_chapters_follow_script_segments(tmp_path):
+    path, chapters = narrate(tmp_path)
+    assert [c["title"] for c in chapters] == [
+        "Here are today's top stories", "Chip makers raced to ship new accelerators this week",
+        "In politics, the Senate passed the budget", "That's all for today"]
+    assert chapters[0]["start"] == 0.0
+    assert all(a["end"] == b["start"] for a, b in zip(chapters, chapters[1:]))
+    assert abs(chapters[-1]["end"] - file_duration(path)) < 1e-6
+
+
+def test_chapter_titles_are_cut_at_a_word():
+    assert chapter_title("word " * 40, limit=22) == "word word word word…"
+
+
+def test_ffmpeg_command_applies_profile_and_loudnorm():
+    command = ffmpeg_command("in.mp3", "out.mp3", PROFILES["speech"], loudness=-16)
+    assert command[command.index("-ac") + 1] == "1"
+    assert command[command.index("-b:a") + 1] == "64k"
+    assert command[command.index("-af") + 1].startswith("loudnorm=I=-16")
+    assert command[-1] == "out.mp3"
+
+
+def test_postprocess_without_ffmpeg_tags_chapters_and_duration(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio, "FFMPEG", str(tmp_path / "no-ffmpeg"))
+    path, chapters = narrate(tmp_path)
+    seconds = file_duration(path)
+
+    result = postprocess(path, chapters, profile="speech", title="Test episode")
+    assert result["profile"] == "raw" and result["duration"] == round(seconds, 3)
+    tags = ID3(path)
+    assert str(tags["TIT2"]) == "Test episode"
+    assert int(str(tags["TLEN"])) == int(seconds * 1000)
+    chaps = sorted(tags.getall("CHAP"), key=lambda c: c.start_time)
+    assert [str(c.sub_frames["TIT2"]) for c in chaps] == [c["title"] for c in chapters]
+    assert tags.getall("CTOC")[0].child_element_ids == [c.element_id for c in chaps]
+    # the tag replaces the first chunk's header; the audio itself is untouched
+    assert file_duration(path) == seconds
+
+
+def test_stream_reader_is_unaffected_by_postprocess_without_ffmpeg(tmp_path, monkeypatch):
+    from concurrent.futures import Future
+    from api import follow_audio
+
+    monkeypatch.setattr(audio, "FFMPEG", str(tmp_path / "no-ffmpeg"))
+    path, chapters = narrate(tmp_path)
+    narrated = open(path, "rb").read()
+    os.rename(path, path + ".part")
+
+    # a /stream client is part-way through the file when narration finishes and tagging starts
+    job = {"future": Future(), "status": "running"}
+    stream = follow_audio(job, path, poll=0, block=1024)
+    head = next(stream)
+    os.rename(path + ".part", path)
+    postprocess(path, chapters, profile="speech", title="Test episode")
+    job["status"] = "done"
+    job["future"].set_result(None)
+
+    assert head + b"".join(stream) == narrated
+    assert str(ID3(path)["TIT2"]) == "Test episode"
+
+
+def test_encoded_episode_rescales_chapters(tmp_path, monkeypatch):
+    # stand-in encoder that keeps every other frame, halving the duration
+    fake = tmp_path / "fake-ffmpeg"
+    fake.write_text(f"#!{sys.executable}\n" + """import sys
+from app.mp3 import silent_frame, file_duration
+src, dst = sys.argv[sys.argv.index("-i") + 1], sys.argv[-1]
+frames = round(file_duration(src) / 0.036) // 2
+open(dst, "wb").write(silent_frame() * frames)
+""")
+    fake.chmod(0o755)
+    monkeypatch.setattr(audio, "FFMPEG", str(fake))
+    monkeypatch.setenv("PYTHONPATH", str(audio.__file__).rsplit("/app/", 1)[0])
+    path, chapters = narrate(tmp_path)
+
+    result = postprocess(path, chapters, profile="speech")
+    assert result["profile"] == "speech"
+    assert abs(result["duration"] - file_duration(path)) < 1e-3
+    assert abs(result["chapters"][-1]["end"] - result["duration"]) < 0.01
+    assert abs(result["chapters"][1]["start"] - chapters[1]["start"] / 2) < 0.05
+
+
+def test_episodes_are_processed_in_worker_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio, "FFMPEG", str(tmp_path / "no-ffmpeg"))
+    episodes = [narrate(tmp_path, f"ep{i}.mp3") for i in range(2)]
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = [process_episode(path, chapters, pool=pool) for path, chapters in episodes]
+    assert [r["path"] for r in results] == [path for path, _ in episodes]
+    assert all(len(ID3(r["path"]).getall("CHAP")) == 4 for r in results)
@@ -0,0 +1,79 @@
+import pytest
+
+from app import pipeline
+from app.checkpoint import RunManifest, checkpointed
+
+
+def test_manifest_resumes_finished_stages(tmp_path):
+    manifest = RunManifest("run", directory=tmp_path)
+    assert checkpointed(manifest, "script", lambda: {"text": "hello"}) == {"text": "hello"}
+    manifest.fail("boom")
+
+    resumed = RunManifest("run", directory=tmp_path, resume=True)
+    assert resumed.data["attempts"] == 2 and resumed.status == "running"
+    assert checkpointed(resumed, "script", lambda: pytest.fail("script ran again")) == {"text": "hello"}
+
+    fresh = RunManifest("run", directory=tmp_path)
+    assert not fresh.done("script") and fresh.data["attempts"] == 1
+
+
+class Calls:
+    def __init__(self):
+        self.counts = {}
+
+    def __call__(self, name, value=None, fail=False):
+        def fn(*args, **kwargs):
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if fail:
+                raise RuntimeError(f"{name} failed")
+            return value(*args, **kwargs) if callable(value) else value
+        return fn
+
+
+def stub_pipeline(monkeypatch, calls, tts_fails=False):
+    def ingest_articles(pending=None, **kw):
+        pending.update(seen=[{"link": "http://a", "hash": "h", "last_seen": "2026-01-01T00:00:00"}],
+                       feed_state={}, ids=["http://a"])
+        return 1
+
+    monkeypatch.setattr(pipeline, "ingest_articles", calls("ingest", ingest_articles))
+    monkeypatch.setattr(pipeline, "commit_ingest", calls("commit"))
+    monkeypatch.setattr(pipeline, "build_script_request", calls(
+        "request", {"messages": [], "intro": "Hi.", "extras": [], "candidates": []}))
+    monkeypatch.setattr(pipeline, "generate_podcast_script", calls("script", "Hi.\n\nStory."))
+    monkeypatch.setattr(pipeline, "text_to_speech", calls(
+        "tts", lambda script, user, out_path=None, chapters=None: open("ep.mp3", "w").close() or "ep.mp3",
+        fail=tts_fails))
+    monkeypatch.setattr(pipeline, "process_episode", calls(
+        "postprocess", lambda path, chapters: {"path": path, "duration": 60.0, "chapters": chapters,
+                                               "bytes_in": 1, "bytes_out": 1}))
+
+
+def test_failed_run_resumes_without_redoing_finished_stages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = Calls()
+    stub_pipeline(monkeypatch, calls, tts_fails=True)
+    with pytest.raises(RuntimeError):
+        pipeline.run_episode(user="u")
+    # the articles were not marked as seen, so a plain rerun would not fall back to a recap
+    assert "commit" not in calls.counts
+
+    stub_pipeline(monkeypatch, calls)
+    result = pipeline.run_episode(user="u", resume=True)
+    assert result["path"] == "ep.mp3" and result["article_count"] == 1 and not result["recap"]
+    assert calls.counts == {"ingest": 1, "request": 1, "script": 1, "tts": 2, "postprocess": 1, "commit": 1}
+
+    # resuming a finished run repeats nothing
+    pipeline.run_episode(user="u", resume=True)
+    assert calls.counts["tts"] == 2 and calls.counts["postprocess"] == 1
+
+
+def test_rerun_without_resume_starts_over(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = Calls()
+    stub_pipeline(monkeypatch, calls, tts_fails=True)
+    with pytest.raises(RuntimeError):
+        pipeline.run_episode(user="u")
+    stub_pipeline(monkeypatch, calls)
+    pipeline.run_episode(user="u")
+    assert calls.counts["ingest"] == 2 and calls.counts["script"] == 2
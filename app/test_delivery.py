@@ -0,0 +1,109 @@
+import os
+import email
+import tracemalloc
+
+from app import delivery
+from app.delivery import SMTPPool, send_episodes, message_chunks
+from bench.smtp_sink import SMTPSink
+
+
+def make_pool(sink, **options):
+    return SMTPPool(user="podcast@localhost", password="x", host=sink.host, port=sink.port,
+                    starttls=False, **options)
+
+
+def write_episode(path, size):
+    data = os.urandom(size)
+    path.write_bytes(data)
+    return data
+
+
+def test_batch_shares_one_session_and_attachments_round_trip(tmp_path):
+    episodes = {f"ep{i}.mp3": write_episode(tmp_path / f"ep{i}.mp3", 100_000 + i) for i in range(3)}
+    with SMTPSink() as sink:
+        pool = make_pool(sink)
+        results = send_episodes([{"path": str(tmp_path / name), "to": [f"{name}@localhost"],
+                                  "subject": "Zoë's Daily News Podcast"} for name in episodes], pool=pool)
+        # a second batch borrows the idle session instead of logging in again
+        send_episodes([{"path": str(tmp_path / "ep0.mp3"), "to": ["again@localhost"]}], pool=pool)
+        pool.close()
+
+    assert all(r["sent"] and not r["linked"] for r in results)
+    assert sink.sessions == 1 and len(sink.messages) == 4
+    for message, (name, data) in zip(sink.messages, episodes.items()):
+        parsed = email.message_from_bytes(message["data"])
+        assert str(email.header.make_header(email.header.decode_header(parsed["Subject"]))) == \
+            "Zoë's Daily News Podcast"
+        attachment = [p for p in parsed.walk() if p.get_filename()][0]
+        assert attachment.get_filename() == name
+        assert attachment.get_payload(decode=True) == data
+
+
+def test_sessions_reconnect_after_batch_size(tmp_path):
+    write_episode(tmp_path / "ep.mp3", 1000)
+    with SMTPSink() as sink:
+        pool = make_pool(sink, max_messages=2)
+        results = send_episodes([{"path": str(tmp_path / "ep.mp3"), "to": ["a@localhost"]}] * 5, pool=pool)
+        pool.close()
+    assert all(r["sent"] for r in results)
+    assert sink.sessions == 3 and len(sink.messages) == 5
+
+
+def test_large_episode_is_sent_as_a_link(tmp_path):
+    write_episode(tmp_path / "big episode.mp3", 50_000)
+    with SMTPSink() as sink:
+        pool = make_pool(sink)
+        [result] = send_episodes([{"path": str(tmp_path / "big episode.mp3"), "to": ["a@localhost"]}],
+                                 pool=pool, max_attachment_bytes=10_000, base_url="http://podcast.local/episodes")
+        pool.close()
+    assert result["sent"] and result["linked"]
+    parsed = email.message_from_bytes(sink.messages[0]["data"])
+    assert not [p for p in parsed.walk() if p.get_filename()]
+    assert "http://podcast.local/episodes/big%20episode.mp3" in parsed.get_payload()[0].get_payload(decode=True).decode()
+
+
+def test_attachment_is_encoded_without_loading_the_file(tmp_path):
+    write_episode(tmp_path / "ep.mp3", 8 * 1024 * 1024)
+    tracemalloc.start()
+    size = sum(len(chunk) for chunk in message_chunks("a@localhost", ["b@localhost"], "s", "body",
+                                                        str(tmp_path / "ep.mp3")))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert size > 8 * 1024 * 1024 * 4 // 3
+    assert peak < 1024 * 1024
+
+
+def test_missing_credentials_send_nothing(tmp_path, monkeypatch):
+    monkeypatch.delenv("EMAIL_USER", raising=False)
+    monkeypatch.delenv("EMAIL_PASS", raising=False)
+    [result] = send_episodes([{"path": "ep.mp3", "to": ["a@localhost"]}], pool=delivery.SMTPPool())
+    assert not result["sent"] and result["error"] == "missing credentials"
+
+
+def test_stale_session_is_resent_but_a_lost_final_reply_is_not(tmp_path):
+    write_episode(tmp_path / "ep.mp3", 1000)
+    deliveries = [{"path": str(tmp_path / "ep.mp3"), "to": ["a@localhost"]}]
+    with SMTPSink() as sink:
+        pool = make_pool(sink)
+        send_episodes(deliveries, pool=pool)
+        # the server dropped the idle session: nothing was accepted, so it is sent again
+        with pool.session() as session:
+            session.server.close()
+        assert send_episodes(deliveries, pool=pool)[0]["sent"]
+        assert sink.sessions == 2 and len(sink.messages) == 2
+
+        # the connection drops while waiting for the reply to the message itself
+        with pool.session() as session:
+            getreply, replies = session.server.getreply, []
+
+            def dropped_after_data():
+                replies.append(getreply())
+                if len(replies) > 1 and replies[-2][0] == 354:
+                    raise delivery.smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+                return replies[-1]
+
+            session.server.getreply = dropped_after_data
+        [result] = send_episodes(deliveries, pool=pool)
+        pool.close()
+    assert not result["sent"]
+    assert sink.sessions == 2 and len(sink.messages) == 3
@@ -0,0 +1,90 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.embeddings import EmbeddingService, OpenAIEmbeddingBackend, make_batches
+from app.vector_cache import VectorCache
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def create(self, input, model):
+        with self.lock:
+            self.calls.append(list(input))
+        data = [SimpleNamespace(index=i, embedding=[float(len(t)), 1.0]) for i, t in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def fake_client():
+    return SimpleNamespace(embeddings=FakeEmbeddings())
+
+
+def test_batches_respect_input_and_token_limits():
+    texts = ["x" * 40] * 10  # ~11 tokens each
+    assert [len(b) for b in make_batches(texts, max_inputs=4)] == [4, 4, 2]
+    assert [len(b) for b in make_batches(texts, max_tokens=25)] == [2] * 5
+
+
+def test_cold_run_is_one_request_and_warm_run_is_none(tmp_path):
+    client = fake_client()
+    service = EmbeddingService(OpenAIEmbeddingBackend(client), cache=VectorCache(tmp_path))
+    titles = ["alpha", "beta", "gamma", "alpha"]
+
+    out = service.embed_cached(titles)
+    assert len(client.embeddings.calls) == 1
+    assert client.embeddings.calls[0] == ["alpha", "beta", "gamma"]
+    assert np.allclose(out[:, 0], [5, 4, 5, 5])
+
+    again = service.embed_cached(titles)
+    assert len(client.embeddings.calls) == 1
+    assert np.allclose(again, out)
+
+
+def test_large_miss_sets_fan_out_concurrently():
+    client = fake_client()
+    service = EmbeddingService(OpenAIEmbeddingBackend(client), max_inputs=3, concurrency=4)
+    out = service.embed([f"t{i}" for i in range(10)])
+    assert out.shape == (10, 2)
+    assert len(client.embeddings.calls) == 4
+
+
+class FakeEncoder:
+    """Stands in for a SentenceTransformer model."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+    def encode(self, texts, batch_size, normalize_embeddings, convert_to_numpy, show_progress_bar):
+        self.calls.append((len(texts), batch_size))
+        x = np.array([[len(t), 1.0, 0.0] for t in texts], dtype=np.float32)
+        return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def test_local_backend_encodes_large_slices_sequentially(tmp_path):
+    from app.embeddings import LocalEmbeddingBackend
+
+    encoder = FakeEncoder()
+    backend = LocalEmbeddingBackend(model="sentence-transformers/all-MiniLM-L6-v2", batch_size=4, encoder=encoder)
+    service = EmbeddingService(backend, cache=VectorCache(tmp_path, name="embeddings__local"))
+    out = service.embed_cached([f"text {i}" for i in range(100)])
+
+    assert out.shape == (100, 3)
+    assert np.allclose(np.linalg.norm(out, axis=1), 1.0)
+    # 100 texts in slices of batch_size * 16, each encoded in batches of 4
+    assert encoder.calls == [(64, 4), (36, 4)]
+
+
+def test_each_model_gets_its_own_embedding_space():
+    from app.embeddings import LocalEmbeddingBackend, embedding_space
+
+    assert embedding_space(OpenAIEmbeddingBackend(None)) == ""
+    assert embedding_space(OpenAIEmbeddingBackend(None, model="text-embedding-3-large")) == "text-embedding-3-large_3072"
+    local = LocalEmbeddingBackend(model="sentence-transformers/all-MiniLM-L6-v2", encoder=FakeEncoder())
+    assert embedding_space(local) == "all-minilm-l6-v2_3"
@@ -0,0 +1,63 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from app.fetch import fetch_feeds
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Local</title>
+<item><title>Story one</title><link>http://example.com/1</link><description>First.</description></item>
+<item><title>Story two</title><link>http://example.com/2</link><description>Second.</description></item>
+</channel></rss>"""
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(RSS)))
+        self.end_headers()
+        self.wfile.write(RSS)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve():
+    server = HTTPServer(("127.0.0.1", 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_conditional_get_skips_unchanged_feed():
+    server = serve()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/rss"
+        state = {}
+        first = list(fetch_feeds([url], state=state))
+        assert first[0]["status"] == 200
+        assert len(first[0]["feed"].entries) == 2
+        assert first[0]["validators"]["etag"] == '"v1"'
+
+        state[url] = first[0]["validators"]
+        second = list(fetch_feeds([url], state=state))
+        assert second[0]["status"] == 304
+        assert second[0]["feed"] is None
+    finally:
+        server.shutdown()
+
+
+def test_failed_feed_does_not_stop_others():
+    server = serve()
+    try:
+        good = f"http://127.0.0.1:{server.server_port}/rss"
+        bad = "http://127.0.0.1:1/unreachable"
+        results = {r["url"]: r for r in fetch_feeds([good, bad], timeout=2)}
+        assert results[good]["feed"] is not None
+        assert results[bad]["error"]
+    finally:
+        server.shutdown()
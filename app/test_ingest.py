@@ -0,0 +1,145 @@
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from app import ingest
+
+ITEMS = [
+    ("FAA cuts flights", "FAA orders airlines to cut flights at 40 major US airports as the shutdown drags on."),
+    ("FAA cuts flights amid shutdown", "The FAA ordered airlines to cut flights at 40 major US airports as the shutdown drags on."),
+    ("New AI model released", "OpenAI released a new AI model for faster reasoning tasks."),
+]
+
+
+def rss(items):
+    body = "".join(
+        f"<item><title>{t}</title><link>http://example.com/{i}</link><description>{d}</description></item>"
+        for i, (t, d) in enumerate(items)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>T</title>{body}</channel></rss>'.encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        data = rss(ITEMS)
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeCollection:
+    def __init__(self):
+        self.upserts = []
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        assert len(embeddings) == len(ids)
+        self.upserts.append(ids)
+
+
+def test_ingest_dedups_and_skips_unchanged_feeds(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    collection = FakeCollection()
+    monkeypatch.setattr(ingest, "get_partition", lambda day: collection)
+    monkeypatch.setattr(ingest, "apply_retention", lambda: [])
+    monkeypatch.setattr(ingest, "get_lexical_index", lambda: SimpleNamespace(add_many=list, expire=lambda: 0))
+    monkeypatch.setattr(ingest, "get_embedder", lambda: SimpleNamespace(embed_cached=lambda docs: [[1.0]] * len(docs)))
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/rss"
+        assert ingest.ingest_articles(feeds=[url]) == 2
+        assert collection.upserts == [["http://example.com/0", "http://example.com/2"]]
+
+        # second run: the feed answers 304 and nothing is re-ingested
+        assert ingest.ingest_articles(feeds=[url]) == 0
+        assert len(collection.upserts) == 1
+    finally:
+        server.shutdown()
+
+
+def test_deferred_ingest_commits_seen_map_only_when_asked(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    collection = FakeCollection()
+    monkeypatch.setattr(ingest, "get_partition", lambda day: collection)
+    monkeypatch.setattr(ingest, "apply_retention", lambda: [])
+    monkeypatch.setattr(ingest, "get_lexical_index", lambda: SimpleNamespace(add_many=list, expire=lambda: 0))
+    monkeypatch.setattr(ingest, "get_embedder", lambda: SimpleNamespace(embed_cached=lambda docs: [[1.0]] * len(docs)))
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/rss"
+        pending = {}
+        assert ingest.ingest_articles(feeds=[url], pending=pending) == 2
+        assert pending["ids"] == ["http://example.com/0", "http://example.com/2"]
+
+        # the run that ingested them failed: nothing was committed, so a retry sees the same news
+        assert ingest.ingest_articles(feeds=[url], pending={}) == 2
+
+        ingest.commit_ingest(pending)
+        assert ingest.ingest_articles(feeds=[url]) == 0
+    finally:
+        server.shutdown()
+
+
+def test_unchanged_entries_keep_their_seen_entry_alive(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    collection = FakeCollection()
+    monkeypatch.setattr(ingest, "get_partition", lambda day: collection)
+    monkeypatch.setattr(ingest, "apply_retention", lambda: [])
+    monkeypatch.setattr(ingest, "get_lexical_index", lambda: SimpleNamespace(add_many=list, expire=lambda: 0))
+    monkeypatch.setattr(ingest, "get_embedder", lambda: SimpleNamespace(embed_cached=lambda docs: [[1.0]] * len(docs)))
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def age_entries(hours):
+        store = ingest.open_seen_store()
+        with store.conn:
+            store.conn.execute("UPDATE seen SET last_seen = ?",
+                               ((datetime.utcnow() - timedelta(hours=hours)).isoformat(),))
+        store.close()
+
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/rss"
+        assert ingest.ingest_articles(feeds=[url]) == 2
+
+        # still in the feed one TTL later, whether the feed answers 304 or sends the same items again
+        for feed in (url, url + "?refetch"):
+            age_entries(ingest.SEEN_TTL_HOURS - 1)
+            assert ingest.ingest_articles(feeds=[feed]) == 0
+            store = ingest.open_seen_store()
+            assert store.expire(ingest.SEEN_TTL_HOURS, now=datetime.utcnow() + timedelta(hours=2)) == 0
+            store.close()
+        assert len(collection.upserts) == 1
+    finally:
+        server.shutdown()
+
+
+def test_article_filtered_out_for_one_user_is_still_ingested_for_another(tmp_path, monkeypatch):
+    from app.relevance import RelevanceFilter
+
+    monkeypatch.chdir(tmp_path)
+    collection = FakeCollection()
+    monkeypatch.setattr(ingest, "get_partition", lambda day: collection)
+    monkeypatch.setattr(ingest, "apply_retention", lambda: [])
+    monkeypatch.setattr(ingest, "get_lexical_index", lambda: SimpleNamespace(add_many=list, expire=lambda: 0))
+    monkeypatch.setattr(ingest, "get_embedder", lambda: SimpleNamespace(embed_cached=lambda docs: [[1.0]] * len(docs)))
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/rss"
+        assert ingest.ingest_articles(feeds=[url], relevance=RelevanceFilter({"FAA": 1.0})) == 1
+        # the AI story fell below user A's cutoff, so it is neither seen nor a near-duplicate for user B
+        assert ingest.ingest_articles(feeds=[url + "?user=b"], relevance=RelevanceFilter({"AI": 1.0})) == 1
+        assert collection.upserts == [["http://example.com/0"], ["http://example.com/2"]]
+    finally:
+        server.shutdown()
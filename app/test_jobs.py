@@ -0,0 +1,43 @@
+import threading
+
+from app.jobs import JobQueue, public_view
+
+
+def test_identical_inflight_requests_share_a_job():
+    release = threading.Event()
+    calls = []
+
+    def runner(**params):
+        calls.append(params)
+        release.wait(5)
+        return {"path": "output/x.mp3"}
+
+    queue = JobQueue(runner, max_workers=2)
+    a = queue.submit(user="default", topic="ai", minutes=5)
+    b = queue.submit(user="default", topic="ai", minutes=5)
+    c = queue.submit(user="default", topic="politics", minutes=5)
+    assert a["id"] == b["id"] != c["id"]
+
+    release.set()
+    assert queue.wait(a["id"], timeout=5)["status"] == "done"
+    queue.wait(c["id"], timeout=5)
+    assert len(calls) == 2
+
+    # once finished, the same request starts a fresh job
+    d = queue.submit(user="default", topic="ai", minutes=5)
+    assert d["id"] != a["id"]
+    queue.wait(d["id"], timeout=5)
+    queue.shutdown()
+
+
+def test_failed_job_reports_error():
+    def runner(**params):
+        raise RuntimeError("boom")
+
+    queue = JobQueue(runner, max_workers=1)
+    job = queue.wait(queue.submit(user="u")["id"], timeout=5)
+    view = public_view(job)
+    assert view["status"] == "failed"
+    assert view["error"] == "boom"
+    assert "future" not in view
+    queue.shutdown()
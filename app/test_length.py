@@ -0,0 +1,85 @@
+from app.audio_cache import AudioCache
+from app.length import PaceTracker, fit_segments, word_count
+from app.mp3 import file_duration
+from app.speak import text_to_speech
+from app.tts import LocalTTSBackend
+
+INTRO = "Here are today's top stories."
+SIGN_OFF = "That's all for today. Thanks for listening."
+
+
+def story(n, sentences=5):
+    return " ".join(f"Story {n} has development number {i} to report today." for i in range(sentences))
+
+
+def test_pace_tracker_rolls_and_persists(tmp_path):
+    tracker = PaceTracker(tmp_path / "pace.json", smoothing=0.5, default=130)
+    assert tracker.wpm("local") == 130
+    assert tracker.observe("local", words=300, seconds=120) == 150
+    assert tracker.observe("local", words=340, seconds=120) == 160
+    # too short to measure, or not a speaking rate at all
+    assert tracker.observe("local", words=10, seconds=60) == 160
+    assert tracker.observe("local", words=3000, seconds=60) == 160
+    assert PaceTracker(tmp_path / "pace.json").wpm("local") == 160
+    assert PaceTracker(tmp_path / "pace.json").wpm("other") == 130
+
+
+def test_long_script_loses_its_last_stories_first():
+    segments = [INTRO] + [story(n) for n in range(12)] + [SIGN_OFF]
+    fitted = list(fit_segments(segments, target_seconds=120, wpm=150, tolerance=0.1))
+    words = sum(word_count(s) for s in fitted)
+    assert 270 <= words <= 330
+    assert fitted[0] == INTRO and fitted[-1] == SIGN_OFF
+    assert fitted[1] == story(0)
+    assert story(11) not in fitted
+
+
+def test_short_script_is_extended_with_spare_stories():
+    segments = [INTRO, story(0), SIGN_OFF]
+    extras = [story(n) for n in range(100, 110)]
+    fitted = list(fit_segments(segments, target_seconds=120, wpm=150, tolerance=0.1, extras=extras))
+    assert 270 <= sum(word_count(s) for s in fitted) <= 330
+    assert fitted[-1] == SIGN_OFF and fitted[2] == story(100)
+
+
+def test_intro_is_yielded_before_the_script_arrives():
+    pulled = []
+
+    def streamed():
+        yield INTRO
+        for n in range(3):
+            pulled.append(n)
+            yield story(n)
+        yield SIGN_OFF
+
+    fitted = fit_segments(streamed(), target_seconds=600, wpm=150)
+    assert next(fitted) == INTRO and pulled == []
+    assert list(fitted)[-1] == SIGN_OFF
+
+
+def test_measured_pace_brings_episodes_to_length(tmp_path):
+    # the local voice reads at 150 wpm while the tracker starts out assuming 130
+    tracker = PaceTracker(tmp_path / "pace.json", smoothing=1.0, default=130)
+    backend, cache = LocalTTSBackend(words_per_minute=150), AudioCache(tmp_path / "audio")
+    segments = [INTRO] + [story(n) for n in range(30)] + [SIGN_OFF]
+    errors = []
+    for episode in range(2):
+        script = "\n\n".join(fit_segments(segments, 180, tracker.wpm("local"), tolerance=0.05))
+        path = text_to_speech(script, backend=backend, out_path=str(tmp_path / f"ep{episode}.mp3"), cache=cache)
+        seconds = file_duration(path)
+        errors.append(abs(seconds - 180) / 180)
+        tracker.observe("local", word_count(script), seconds)
+    assert errors[0] > 0.05
+    assert errors[1] <= 0.05
+
+
+def test_script_in_one_long_paragraph_is_still_cut_to_length():
+    paragraph = " ".join([INTRO] + [story(n) for n in range(12)] + [SIGN_OFF])
+    fitted = list(fit_segments([paragraph], target_seconds=120, wpm=150, tolerance=0.1))
+    assert fitted[0].startswith(INTRO)
+    assert sum(word_count(s) for s in fitted) <= 330
+
+    # or with everything after the intro run together as the closing segment
+    fitted = list(fit_segments([INTRO, paragraph], target_seconds=120, wpm=150, tolerance=0.1))
+    assert fitted[0] == INTRO
+    assert sum(word_count(s) for s in fitted) <= 330
@@ -0,0 +1,82 @@
+import gzip
+import json
+import time
+
+import pytest
+
+from app import lifecycle, resources
+
+NOW = time.time()
+DAY = 86400
+
+
+@pytest.fixture
+def chroma(tmp_path, monkeypatch):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    resources.reset()
+    resources._resources["chroma"] = client
+    monkeypatch.setattr(lifecycle, "space_name", lambda base: f"{base}__test")
+    yield client
+    resources.reset()
+
+
+def store(day_offset: int, ids, vectors, stamp=True):
+    ingested_at = int(NOW - day_offset * DAY)
+    metas = [{"title": i, "source": "feed", **({"ingested_at": ingested_at} if stamp else {})} for i in ids]
+    lifecycle.get_partition(lifecycle.partition_day(ingested_at)).upsert(
+        ids=list(ids), documents=[f"doc {i}" for i in ids], metadatas=metas, embeddings=vectors)
+
+
+def test_window_touches_only_recent_partitions_and_merges_by_distance(chroma):
+    store(0, ["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    store(1, ["c"], [[0.9, 0.1]])
+    store(10, ["d", "b"], [[1.0, 0.01], [1.0, 0.0]])
+
+    recent = lifecycle.partitions_for(window_hours=36, now=NOW)
+    assert len(recent.collections) == 2
+    result = recent.query([[1.0, 0.0]], n_results=2)
+    assert result["ids"] == [["a", "c"]]
+
+    # the copy of "b" from the newest partition shadows the older one
+    everything = lifecycle.partitions_for()
+    result = everything.query([[1.0, 0.0]], n_results=5)
+    assert result["ids"][0][:2] == ["a", "d"] and result["ids"][0].count("b") == 1
+    assert result["metadatas"][0][result["ids"][0].index("b")]["ingested_at"] == int(NOW)
+    got = everything.get(ids=["d", "missing", "a"], include=["documents"])
+    assert got == {"ids": ["d", "a"], "documents": ["doc d", "doc a"]}
+    assert everything.count() == 5
+
+
+def test_retention_archives_then_drops_old_partitions(chroma, tmp_path, monkeypatch):
+    monkeypatch.setattr(lifecycle, "ARCHIVE_DIR", tmp_path / "archive")
+    store(0, ["new"], [[1.0, 0.0]])
+    store(20, ["old"], [[0.0, 1.0]])
+    old = lifecycle.partition_name(lifecycle.partition_day(NOW - 20 * DAY))
+
+    assert lifecycle.apply_retention(days=14, archive=True, now=NOW) == [old]
+    assert [name for _, name in lifecycle.list_partitions()] == \
+        [lifecycle.partition_name(lifecycle.partition_day(NOW))]
+    with gzip.open(tmp_path / "archive" / f"{old}.jsonl.gz", "rt") as f:
+        rows = [json.loads(line) for line in f]
+    assert [r["id"] for r in rows] == ["old"] and rows[0]["embedding"] == [0.0, 1.0]
+
+
+def test_compact_migrates_legacy_collection_and_removes_shadowed_copies(chroma):
+    legacy = resources.get_collection("news_articles__test")
+    legacy.upsert(ids=["x", "y"], documents=["doc x", "doc y"], embeddings=[[1.0, 0.0], [0.0, 1.0]],
+                  metadatas=[{"title": "x", "ingested_at": int(NOW - 2 * DAY)}, {"title": "y"}])
+    store(5, ["z"], [[0.5, 0.5]])
+    store(0, ["z"], [[0.5, 0.5]])
+
+    report = lifecycle.compact(retention_days=14, archive=False, now=NOW)
+    assert report["migrated"] == 2
+    assert report["duplicates_removed"] == 1 and report["empty_dropped"] == 1
+    assert "news_articles__test" not in [c.name for c in chroma.list_collections()]
+
+    days = [day for day, _ in lifecycle.list_partitions()]
+    assert days == [lifecycle.partition_day(NOW - 2 * DAY), lifecycle.partition_day(NOW)]
+    # an article stored before timestamps were recorded lands in today's partition, stamped
+    today = lifecycle.get_partition(lifecycle.partition_day(NOW)).get(ids=["y"], include=["metadatas"])
+    assert today["metadatas"][0]["ingested_at"] == int(NOW)
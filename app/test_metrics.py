@@ -0,0 +1,69 @@
+import json
+import threading
+
+from app.metrics import Metrics, METRICS, ThreadPool, incr, stage, track_run
+
+
+def test_stages_and_counters_accumulate_across_threads():
+    metrics = Metrics()
+
+    def work():
+        for _ in range(100):
+            metrics.incr("llm.calls")
+        with metrics.stage("script"):
+            pass
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    view = metrics.to_dict()
+    assert view["counters"]["llm.calls"] == 400
+    assert view["stages"]["script"]["calls"] == 4
+
+
+def test_run_report_holds_only_this_runs_deltas(tmp_path):
+    incr("summary_cache.hits", 5)
+    with track_run("episode_test", directory=str(tmp_path)) as run:
+        with stage("ingest") as t:
+            METRICS.record_feed("http://a/rss", 0.25, 200)
+            METRICS.record_feed("http://b/rss", 1.5, None, error="timeout")
+        incr("summary_cache.hits", 3)
+        incr("summary_cache.misses", 1)
+
+    assert t.seconds is not None
+    report = json.loads(open(run["report"]).read())
+    assert report["status"] == "ok"
+    assert report["counters"]["summary_cache.hits"] == 3
+    assert report["cache_hit_rates"]["summary_cache"] == 0.75
+    assert report["counters"]["feeds.failed"] == 1
+    assert [f["url"] for f in report["feeds"]] == ["http://b/rss", "http://a/rss"]
+    assert report["stages"]["ingest"]["calls"] == 1
+    assert METRICS.to_dict()["last_run"]["label"] == "episode_test"
+
+
+def test_overlapping_runs_report_only_their_own_work(tmp_path):
+    barrier = threading.Barrier(2)
+    runs = {}
+
+    def episode(name, calls):
+        with track_run(name, directory=str(tmp_path)) as run:
+            barrier.wait()
+            with ThreadPool(max_workers=2) as pool:
+                for _ in range(calls):
+                    pool.submit(incr, "tts.calls")
+            with stage("tts"):
+                barrier.wait()
+        runs[name] = json.loads(open(run["report"]).read())
+
+    threads = [threading.Thread(target=episode, args=(name, calls)) for name, calls in (("a", 3), ("b", 5))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert runs["a"]["counters"] == {"tts.calls": 3}
+    assert runs["b"]["counters"] == {"tts.calls": 5}
+    assert runs["a"]["stages"]["tts"]["calls"] == 1
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from app.neardup import NearDuplicateIndex, choose_bands, minhash
+
+WIRE = "FAA orders airlines to cut flights at 40 major airports as the government shutdown drags on."
+REWRITE = "The FAA ordered airlines to cut flights at 40 major airports as the government shutdown drags on."
+OTHER = "OpenAI released GPT-4o Mini for faster reasoning tasks, the company said on Tuesday."
+
+
+def test_bands_follow_threshold():
+    assert choose_bands(0.5) == (16, 4)
+    assert choose_bands(0.8)[1] > choose_bands(0.5)[1]
+
+
+def test_rewrites_collapse_across_runs(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "seen.db")
+    index.add("nyt", minhash(WIRE))
+    assert index.find(minhash(REWRITE)) == "nyt"  # visible before commit
+    assert index.find(minhash(OTHER)) is None
+    index.commit()
+    index.close()
+
+    reopened = NearDuplicateIndex(tmp_path / "seen.db")
+    assert reopened.find(minhash(REWRITE)) == "nyt"
+    assert reopened.find(minhash(WIRE), exclude="nyt") is None
+
+
+def test_threshold_is_tunable_and_signatures_expire(tmp_path):
+    strict = NearDuplicateIndex(tmp_path / "seen.db", threshold=0.95)
+    strict.add("nyt", minhash(WIRE))
+    assert strict.find(minhash(REWRITE)) is None
+
+    now = datetime(2025, 1, 2)
+    strict.commit(now=now - timedelta(hours=100))
+    assert strict.expire(60, now=now) == 1
+    assert strict.find(minhash(WIRE)) is None
@@ -0,0 +1,53 @@
+import time
+
+from app import pipeline
+from app.ratelimit import RateLimiter
+
+
+def fake_postprocess(path, chapters):
+    return {"path": path, "duration": 1.0, "chapters": chapters, "bytes_in": 10, "bytes_out": 5}
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=20, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start >= 4 / 20 * 0.9
+
+
+def test_batch_ingests_union_once_and_fans_out(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    feeds = {"a": ["f1", "f2"], "b": ["f2", "f3"]}
+    ingested = []
+    monkeypatch.setattr(pipeline, "load_feeds", lambda user: feeds[user])
+    monkeypatch.setattr(pipeline, "ingest_articles",
+                        lambda feeds, **kw: ingested.append(feeds) or 3)
+    monkeypatch.setattr(pipeline, "generate_podcast_script", lambda **kw: f"script for {kw['user']}")
+    monkeypatch.setattr(pipeline, "text_to_speech", lambda script, user, **kw: f"{user}.mp3")
+    monkeypatch.setattr(pipeline, "process_episode", fake_postprocess)
+
+    results = pipeline.run_batch(users=["a", "b"], max_workers=2)
+    assert ingested == [["f1", "f2", "f3"]]
+    assert [r["path"] for r in results] == ["a.mp3", "b.mp3"]
+    assert all("script" in r["timings"] for r in results)
+    assert len(list((tmp_path / "logs").glob("metrics_batch_*.json"))) == 1
+
+
+def test_batch_delivers_every_episode_in_one_send(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("RECIPIENT_EMAIL", "me@localhost, you@localhost")
+    batches = []
+    monkeypatch.setattr(pipeline, "load_feeds", lambda user: ["f1"])
+    monkeypatch.setattr(pipeline, "ingest_articles", lambda **kw: 1)
+    monkeypatch.setattr(pipeline, "generate_podcast_script", lambda **kw: "script")
+    monkeypatch.setattr(pipeline, "text_to_speech", lambda script, user, **kw: f"{user}.mp3")
+    monkeypatch.setattr(pipeline, "process_episode", fake_postprocess)
+    monkeypatch.setattr(pipeline, "send_episodes", lambda deliveries: batches.append(deliveries) or
+                        [{"sent": True, "seconds": 0.5} for _ in deliveries])
+
+    results = pipeline.run_batch(users=["a", "b"], max_workers=2, deliver=True)
+    assert len(batches) == 1
+    assert [d["path"] for d in batches[0]] == ["a.mp3", "b.mp3"]
+    assert batches[0][0]["to"] == ["me@localhost", "you@localhost"]
+    assert all(r["delivered"] and r["timings"]["delivery"] == 0.5 for r in results)
@@ -0,0 +1,19 @@
+import numpy as np
+
+from app.rank import rank_candidates
+
+
+def test_ranks_stored_vectors_by_cosine():
+    query = np.array([1.0, 0.0])
+    docs = np.array([[0.0, 1.0], [2.0, 0.1], [1.0, 1.0]])
+    order, scores = rank_candidates(query, docs, top_k=2)
+    assert order.tolist() == [1, 2]
+    assert scores.shape == (3,)
+
+
+def test_title_signal_can_rerank():
+    query = np.array([1.0, 0.0])
+    docs = np.array([[1.0, 0.2], [1.0, 0.3]])
+    titles = np.array([[0.0, 1.0], [1.0, 0.0]])
+    assert rank_candidates(query, docs)[0][0] == 0
+    assert rank_candidates(query, docs, titles, title_weight=0.5)[0][0] == 1
@@ -0,0 +1,34 @@
+import json
+
+from app import relevance
+from app.relevance import RelevanceFilter
+
+
+def test_word_boundaries_and_acronym_case():
+    f = RelevanceFilter({"US": 1.0, "AI": 1.0})
+    assert f.score("Business leaders gather") == 0
+    assert f.score("Let us talk about the air") == 0
+    assert f.score("US regulators weigh AI rules") == 2.0
+    assert f.score("AI-powered tools") == 1.0
+
+
+def test_weighted_phrases_count_once():
+    f = RelevanceFilter({"machine learning": 2.0, "innovation": 0.5}, min_score=1.0)
+    text = "Machine  learning drives innovation. More machine learning!"
+    assert f.score(text) == 2.5
+    assert not f.is_relevant("a note on innovation")
+
+
+def test_per_user_config_from_user_feeds(tmp_path, monkeypatch):
+    path = tmp_path / "user_feeds.json"
+    path.write_text(json.dumps({
+        "alice": {"groups": ["ai"], "keywords": {"LLM": 3}, "min_score": 2},
+        "bob": ["general"],
+    }))
+    monkeypatch.setattr(relevance, "USER_FEEDS_PATH", str(path))
+
+    assert relevance.load_user_config("alice")["groups"] == ["ai"]
+    assert relevance.load_user_config("bob")["keywords"] == relevance.DEFAULT_KEYWORDS
+    combined = relevance.combined_filter(["alice", "bob"])
+    assert combined.min_score == 1.0
+    assert combined.score("new LLM from a US lab") == 4.0
@@ -0,0 +1,89 @@
+import json
+import time
+
+import numpy as np
+
+from app.ingest import feeds_for_groups
+from app.retrieve import LexicalIndex, match_expression, reciprocal_rank_fusion, retrieve_candidates
+
+NOW = time.time()
+
+
+def test_lexical_index_filters_and_replaces(tmp_path):
+    index = LexicalIndex(tmp_path / "lexical.db")
+    index.add_many([
+        ("a", "<p>OpenAI ships a new AI model</p>", NOW, "ai"),
+        ("b", "Chip makers race to build AI accelerators", NOW - 3 * 86400, "ai"),
+        ("c", "Senate passes the budget", NOW, "general"),
+    ])
+    assert {d for d, _ in index.search(["AI"])} == {"a", "b"}
+    assert [d for d, _ in index.search(["AI"], since=NOW - 86400)] == ["a"]
+    assert [d for d, _ in index.search(["budget", "AI"], sources=["general"])] == ["c"]
+
+    # re-ingesting a link replaces its text instead of adding a second posting list
+    index.add_many([("a", "Weather update", NOW, "ai")])
+    assert len(index) == 3
+    assert "a" not in [d for d, _ in index.search(["AI"])]
+    assert index.expire(max_age_hours=48, now=NOW) == 1
+
+
+def test_match_expression_quotes_phrases():
+    assert match_expression(["machine learning", "AI", "AI", 'say "hi"']) == \
+        '"machine learning" OR "AI" OR "say ""hi"""'
+
+
+def test_rrf_rewards_agreement():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "z"]])
+    assert fused[0] == "y" and set(fused) == {"x", "y", "z"}
+
+
+def test_hybrid_retrieval_pushes_filters_into_chroma(tmp_path):
+    import chromadb
+
+    collection = chromadb.EphemeralClient().get_or_create_collection(
+        f"hybrid_{int(NOW * 1000)}", embedding_function=None)
+    docs = {
+        "fresh-ai": ("AI lab releases reasoning model", [1.0, 0.0], NOW, "ai"),
+        "fresh-ai-lexical": ("Chip export rules tighten for AI hardware", [0.0, 1.0], NOW, "ai"),
+        "stale-ai": ("AI model from last week", [1.0, 0.05], NOW - 5 * 86400, "ai"),
+        "fresh-politics": ("Senate budget vote", [0.99, 0.1], NOW, "general"),
+    }
+    collection.upsert(
+        ids=list(docs),
+        documents=[d[0] for d in docs.values()],
+        embeddings=[d[1] for d in docs.values()],
+        metadatas=[{"title": d[0], "ingested_at": int(d[2]), "source": d[3]} for d in docs.values()],
+    )
+    lexical = LexicalIndex(tmp_path / "lexical.db")
+    lexical.add_many((i, d[0], d[2], d[3]) for i, d in docs.items())
+
+    result = retrieve_candidates(collection, np.array([1.0, 0.0]), ["chip"], sources=["ai"],
+                                 window_hours=24, n_results=1, lexical=lexical)
+    # one vector hit plus the lexical-only hit fetched by id; stale and off-feed docs never appear
+    assert result["ids"] == ["fresh-ai", "fresh-ai-lexical"]
+    assert result["lexical"] == ["fresh-ai-lexical"]
+    assert len(result["embeddings"]) == 2
+
+
+def test_feed_listed_in_two_groups_matches_either(tmp_path, monkeypatch):
+    import chromadb
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "feeds").mkdir()
+    (tmp_path / "feeds" / "default_feeds.json").write_text(json.dumps({
+        "general": ["https://news.example/rss", "https://tech.example/rss"],
+        "technology": ["https://tech.example/rss"],
+    }))
+    assert feeds_for_groups(["general"]) == ["https://news.example/rss", "https://tech.example/rss"]
+
+    collection = chromadb.EphemeralClient().get_or_create_collection(
+        f"two_groups_{int(NOW * 1000)}", embedding_function=None)
+    collection.upsert(ids=["t"], documents=["Chip launch"], embeddings=[[1.0, 0.0]],
+                      metadatas=[{"title": "Chip launch", "ingested_at": int(NOW), "source": "https://tech.example/rss"}])
+    lexical = LexicalIndex(tmp_path / "lexical.db")
+    lexical.add_many([("t", "Chip launch", NOW, "https://tech.example/rss")])
+
+    for group in ("general", "technology"):
+        result = retrieve_candidates(collection, np.array([1.0, 0.0]), ["chip"], sources=feeds_for_groups([group]),
+                                     lexical=lexical)
+        assert result["ids"] == ["t"] and result["lexical"] == ["t"]
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from app.seen_store import SeenStore
+
+
+def record(link, h, when):
+    return {"link": link, "hash": h, "last_seen": when.isoformat(), "source": "feed"}
+
+
+def test_batched_upsert_and_indexed_lookups(tmp_path):
+    store = SeenStore(tmp_path / "seen.db")
+    t0 = datetime(2025, 1, 1)
+    store.upsert_many([record("a", "h1", t0), record("b", "h2", t0)])
+    store.upsert_many([record("a", "h3", t0 + timedelta(hours=1))])
+
+    seen = store.lookup(["a", "b", "c"])
+    assert set(seen) == {"a", "b"}
+    assert seen["a"]["hash"] == "h3"
+    assert seen["a"]["first_seen"] == t0.isoformat()
+    assert store.known_hashes(["h2", "h9"]) == {"h2"}
+
+
+def test_expire_drops_entries_past_ttl(tmp_path):
+    store = SeenStore(tmp_path / "seen.db")
+    now = datetime(2025, 1, 3)
+    store.upsert_many([record("old", "h1", now - timedelta(hours=80)), record("new", "h2", now)])
+    assert store.expire(60, now=now) == 1
+    assert set(store.lookup(["old", "new"])) == {"new"}
+
+
+def test_legacy_json_is_imported_once(tmp_path):
+    legacy = tmp_path / "seen_articles.json"
+    legacy.write_text('{"x": {"first_seen": "2025-01-01T00:00:00", "last_seen": "2025-01-01T00:00:00",'
+                      ' "hash": "h", "source": "s"}}')
+    store = SeenStore(tmp_path / "seen.db")
+    assert store.import_json(legacy) == 1
+    assert store.import_json(legacy) == 0
+    assert len(store) == 1
+
+
+def test_touch_sources_uses_the_source_index(tmp_path):
+    store = SeenStore(tmp_path / "seen.db")
+    t0 = datetime(2025, 1, 1)
+    store.upsert_many([record("a", "h1", t0)])
+    store.touch_sources(["feed"], now=t0 + timedelta(hours=1))
+    assert store.lookup(["a"])["a"]["last_seen"] == (t0 + timedelta(hours=1)).isoformat()
+    plan = store.conn.execute("EXPLAIN QUERY PLAN UPDATE seen SET last_seen = ? WHERE source IN (?)",
+                              ["x", "feed"]).fetchall()
+    assert any("seen_source" in row[-1] for row in plan)
@@ -0,0 +1,175 @@
+import random
+import threading
+import time
+
+from app.mp3 import duration, silent_frame
+from app.speak import split_script, synthesize_chunks
+from app.tts import LocalTTSBackend
+
+
+def test_split_keeps_segments_and_respects_limit():
+    script = "Here are today's top stories.\n\n" + " ".join(["A long sentence here."] * 50) + "\n\nGoodbye."
+    chunks = split_script(script, max_chars=200)
+    assert chunks[0] == "Here are today's top stories."
+    assert chunks[-1] == "Goodbye."
+    assert all(len(c) <= 200 for c in chunks)
+    assert all(c.endswith(".") for c in chunks)
+
+
+def test_split_breaks_overlong_sentence_on_words():
+    chunks = split_script("word " * 100, max_chars=50)
+    assert all(len(c) <= 50 for c in chunks)
+    assert sum(len(c.split()) for c in chunks) == 100
+
+
+class FlakyBackend(LocalTTSBackend):
+    """Finishes chunks out of order and fails each chunk once."""
+
+    def __init__(self):
+        super().__init__(words_per_minute=600)
+        self.failed = set()
+        self.lock = threading.Lock()
+
+    def synthesize(self, text, out_path):
+        time.sleep(random.random() / 50)
+        with self.lock:
+            first_try = text not in self.failed
+            self.failed.add(text)
+        if first_try:
+            raise RuntimeError("transient")
+        super().synthesize(text, out_path)
+
+
+def test_chunks_are_stitched_in_order_with_retries(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.speak.time.sleep", lambda s: None)
+    chunks = [" ".join([f"w{i}"] * (10 * (i + 1))) for i in range(6)]
+    out = synthesize_chunks(chunks, str(tmp_path / "ep.mp3"), backend=FlakyBackend(), max_workers=3)
+
+    data = open(out, "rb").read()
+    frame = silent_frame()
+    assert len(data) % len(frame) == 0
+    expected = sum(max(1, round(len(c.split()) * 60 / 600 / 0.036)) for c in chunks)
+    assert len(data) // len(frame) == expected
+    assert abs(duration(data) - expected * 0.036) < 1e-6
+    assert list(tmp_path.iterdir()) == [tmp_path / "ep.mp3"]
+
+
+class TaggedBackend(LocalTTSBackend):
+    """Writes chunks the way real encoders do: ID3v2 tag, Xing frame, audio, ID3v1 tag."""
+
+    ID3 = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + bytes(10)
+
+    def synthesize(self, text, out_path):
+        frame = silent_frame()
+        xing = frame[:36] + b"Xing" + frame[40:]
+        with open(out_path, "wb") as f:
+            f.write(self.ID3 + xing + frame * 3 + b"TAG" + bytes(125))
+
+
+def test_stitched_episode_keeps_no_per_chunk_xing_frame(tmp_path):
+    out = synthesize_chunks(["One.", "Two."], str(tmp_path / "ep.mp3"), backend=TaggedBackend())
+    # players trust a leading Xing frame's counts, which would describe the first chunk only
+    assert open(out, "rb").read() == TaggedBackend.ID3 + silent_frame() * 6
+
+
+class CountingBackend(LocalTTSBackend):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def synthesize(self, text, out_path):
+        self.calls.append(text)
+        super().synthesize(text, out_path)
+
+
+def test_audio_cache_reuses_segments_across_episodes(tmp_path):
+    from app.audio_cache import AudioCache
+
+    cache = AudioCache(tmp_path / "audio")
+    backend = CountingBackend()
+    intro = "Here are today’s top stories."
+    synthesize_chunks([intro, "Story one."], str(tmp_path / "a.mp3"), backend=backend, cache=cache)
+    synthesize_chunks([intro + " ", "Story two."], str(tmp_path / "b.mp3"), backend=backend, cache=cache)
+
+    assert sorted(backend.calls) == sorted([intro, "Story one.", "Story two."])
+    assert cache.hits == 1
+    assert (tmp_path / "b.mp3").stat().st_size > 0
+
+
+def test_audio_cache_evicts_least_recently_used(tmp_path):
+    from app.audio_cache import AudioCache
+
+    cache = AudioCache(tmp_path / "audio", max_bytes=1)
+    src = tmp_path / "seg.mp3"
+    src.write_bytes(silent_frame())
+    cache.put("ab" * 32, str(src))
+    assert cache.evict() == 1
+    assert cache.get("ab" * 32) is None
+
+
+def test_concurrent_puts_of_one_segment_keep_a_single_copy(tmp_path):
+    from app.audio_cache import AudioCache
+
+    cache = AudioCache(tmp_path / "audio")
+    key, frame = "cd" * 32, silent_frame()
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def put(i):
+        src = tmp_path / f"seg{i}.mp3"
+        src.write_bytes(frame)
+        barrier.wait()
+        try:
+            assert cache.put(key, str(src)) == str(cache.path_for(key))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert cache.size == len(frame)
+    assert [p.name for p in (tmp_path / "audio").rglob("*") if p.is_file()] == [f"{key}.mp3"]
+    assert not list(tmp_path.glob("seg*.mp3"))
+
+
+def test_cache_hits_survive_another_episodes_eviction(tmp_path):
+    from app.audio_cache import AudioCache, segment_key
+
+    cache = AudioCache(tmp_path / "audio", max_bytes=1)
+    backend = LocalTTSBackend()
+    src = tmp_path / "hit.mp3"
+    src.write_bytes(silent_frame() * 5)
+    cache.put(segment_key("Cached story.", backend.voice, backend.model), str(src))
+
+    class EvictingBackend(LocalTTSBackend):
+        def synthesize(self, text, out_path):
+            # a concurrent episode finishes and evicts while this one still waits on chunk 0
+            cache.evict()
+            super().synthesize(text, out_path)
+
+    out = synthesize_chunks(["Fresh intro.", "Cached story."], str(tmp_path / "ep.mp3"),
+                            backend=EvictingBackend(), cache=cache)
+    assert open(out, "rb").read().endswith(silent_frame() * 5)
+
+
+def test_streamed_segments_are_written_while_still_arriving(tmp_path):
+    out = tmp_path / "ep.mp3"
+    sizes = []
+
+    def segments():
+        for i in range(4):
+            yield f"Segment {i} " + "word " * 20
+            time.sleep(0.05)
+            part = tmp_path / "ep.mp3.part"
+            sizes.append(part.stat().st_size if part.exists() else 0)
+
+    synthesize_chunks(segments(), str(out), backend=LocalTTSBackend(), max_workers=2)
+    # audio for earlier segments is on disk before the last segment has been produced
+    assert 0 < sizes[1] < out.stat().st_size
+    expected = synthesize_chunks([f"Segment {i} " + "word " * 20 for i in range(4)],
+                                 str(tmp_path / "batch.mp3"), backend=LocalTTSBackend())
+    assert out.read_bytes() == open(expected, "rb").read()
+    assert not (tmp_path / "ep.mp3.part").exists()
@@ -0,0 +1,34 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from app.resources import IMPORT_BUDGET_SECONDS
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.ingest, app.reason, app.speak, app.delivery, app.pipeline
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("chromadb", "openai", "sklearn", "torch") if m in sys.modules]
+print(json.dumps({"elapsed": elapsed, "heavy": heavy}))
+"""
+
+
+def test_importing_the_pipeline_is_cheap_and_side_effect_free(tmp_path):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=tmp_path,
+        env={"PYTHONPATH": str(ROOT), "PATH": "/usr/bin:/bin"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = json.loads(out.stdout.strip().splitlines()[-1])
+    assert report["heavy"] == []
+    assert report["elapsed"] < IMPORT_BUDGET_SECONDS
+    # nothing printed, nothing created on disk
+    assert out.stdout.strip().startswith("{")
+    assert list(tmp_path.iterdir()) == []
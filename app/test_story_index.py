@@ -0,0 +1,67 @@
+import numpy as np
+
+from app.cluster import StoryIndex, cluster_articles
+
+
+def test_cluster_articles_uses_candidate_vectors():
+    embeddings = np.array([[0.9, 0.1, 0.2], [0.88, 0.12, 0.18], [0.1, 0.8, 0.5]])
+    articles = [{"title": "a"}, {"title": "a2"}, {"title": "b"}]
+    clusters = cluster_articles(embeddings, articles)
+    assert sorted(len(c) for c in clusters) == [1, 2]
+
+
+def test_new_articles_join_persisted_stories(tmp_path):
+    index = StoryIndex(tmp_path)
+    first = index.assign([[1.0, 0.0], [0.0, 1.0]], ids=["x", "y"])
+    assert first[0] != first[1]
+    index.save()
+
+    reloaded = StoryIndex(tmp_path)
+    later = reloaded.assign([[0.95, 0.05], [0.0, 1.0], [-1.0, 0.0]], ids=["x2", "y", "z"])
+    assert later[0] == first[0]
+    assert later[1] == first[1]
+    assert later[2] not in first
+    assert reloaded.stories[0]["count"] == 2  # "y" was already counted
+
+
+def test_large_batches_scale_without_agglomerative():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(5, 16))
+    points = np.repeat(centers, 600, axis=0) + rng.normal(scale=0.01, size=(3000, 16))
+    clusters = cluster_articles(points, list(range(3000)), threshold=0.9)
+    assert len(clusters) == 5
+
+
+def test_interrupted_save_keeps_stories_and_centroids_paired(tmp_path, monkeypatch):
+    import pytest
+    from app import cluster
+
+    index = StoryIndex(tmp_path)
+    index.assign([[1.0, 0.0]], ids=["x"])
+    index.save()
+    index.assign([[0.0, 1.0]], ids=["y"])
+
+    real_replace = cluster.os.replace
+
+    def crash(src, dst):
+        # the process dies once the centroids are down but before stories.json is replaced
+        if str(dst).endswith("stories.json"):
+            raise OSError("power cut")
+        real_replace(src, dst)
+    monkeypatch.setattr(cluster.os, "replace", crash)
+    with pytest.raises(OSError):
+        index.save()
+    monkeypatch.undo()
+
+    reloaded = StoryIndex(tmp_path)
+    assert len(reloaded) == 1 and reloaded.centroids.shape[0] == 1
+    assert set(reloaded.members) == {"x"}
+
+
+def test_mismatched_legacy_files_start_a_fresh_index(tmp_path):
+    import json
+
+    (tmp_path / "stories.json").write_text(json.dumps(
+        {"stories": [{"id": 0, "count": 1, "last_seen": 0, "title": "a"}], "members": {"x": 0}, "next_id": 1}))
+    np.save(tmp_path / "centroids.npy", np.ones((2, 2), dtype=np.float32))
+    assert len(StoryIndex(tmp_path)) == 0
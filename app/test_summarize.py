@@ -0,0 +1,108 @@
+import threading
+
+from app.llm import FakeLLMBackend, with_retries
+from app.summarize import parse_numbered, reduce_summaries, shard_articles, summarize_articles
+
+
+def article(i, words=50):
+    return {"title": f"Story {i}", "source": f"feed{i % 2}",
+            "text": f"Lead sentence for story {i}. " + "filler " * words}
+
+
+def test_shards_stay_within_budget():
+    articles = [article(i, words=400) for i in range(10)]
+    shards = shard_articles(articles, budget=1500)
+    assert len(shards) > 1
+    assert sorted(i for s in shards for i in s) == list(range(10))
+
+
+def test_parse_numbered_keeps_continuations():
+    text = "1. First summary\ncontinued here.\n2) Second.\n[3] Third."
+    assert parse_numbered(text) == {1: "First summary continued here.", 2: "Second.", 3: "Third."}
+
+
+class SlowFlakyLLM(FakeLLMBackend):
+    def __init__(self):
+        super().__init__(delay=0.05)
+        self.active = 0
+        self.peak = 0
+        self.failed_once = False
+        self.lock = threading.Lock()
+
+    def complete(self, messages, temperature=0.2):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            fail = not self.failed_once
+            self.failed_once = True
+        try:
+            if fail:
+                raise RuntimeError("rate limited")
+            return super().complete(messages, temperature)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_map_runs_shards_concurrently_with_retry(monkeypatch):
+    monkeypatch.setattr("app.summarize.with_retries",
+                        lambda fn, retries, label: with_retries(fn, retries, base_delay=0, label=label))
+    llm = SlowFlakyLLM()
+    articles = [article(i, words=400) for i in range(8)]
+    summaries = summarize_articles(articles, llm, budget=1200, concurrency=3)
+    assert summaries == [f"Story {i}: Lead sentence for story {i}." for i in range(8)]
+    assert 1 < llm.peak <= 3
+
+
+def test_reduce_merges_stories_without_an_llm_call_when_small():
+    llm = FakeLLMBackend()
+    a, b, c = article(1), article(2), article(3)
+    context = reduce_summaries([[(a, "Same story."), (b, "Same story.")], [(c, "Other.")]], llm)
+    assert context.splitlines() == [
+        "1. Story 1 / Story 2: Same story. (Sources: feed1, feed0)",
+        "2. Story 3: Other. (Sources: feed1)",
+    ]
+    assert llm.calls == 0
+
+
+def test_cache_sends_only_misses_and_recap_skips_the_llm(tmp_path):
+    from app.summary_cache import SummaryCache
+    cache = SummaryCache(tmp_path / "summaries.db")
+    articles = [dict(article(i), hash=f"h{i}") for i in range(4)]
+
+    llm = FakeLLMBackend()
+    first = summarize_articles(articles[:2], llm, cache=cache)
+    assert llm.calls == 1
+
+    llm = FakeLLMBackend()
+    second = summarize_articles(articles, llm, cache=cache)
+    assert second[:2] == first
+    assert llm.calls == 1 and cache.hits == 2
+
+    llm = FakeLLMBackend()
+    recap = summarize_articles(articles, llm, cache=cache, allow_llm=False)
+    assert llm.calls == 0
+    assert recap == second
+
+    # another model or prompt version never reuses these entries
+    assert cache.get_many(["h0"], "map-v0", "fake-llm") == {}
+
+
+def test_stream_yields_paragraphs_and_retries_before_first_delta():
+    from app.llm import iter_paragraphs, stream_with_retries
+
+    attempts = []
+
+    def open_stream():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("connection reset")
+        yield from ["First para", "graph.\n", "\nSecond one.\n\n\n", "Last."]
+
+    deltas = stream_with_retries(open_stream, base_delay=0)
+    assert list(iter_paragraphs(deltas)) == ["First paragraph.", "Second one.", "Last."]
+    assert len(attempts) == 2
+
+    llm = FakeLLMBackend()
+    messages = [{"role": "user", "content": "1. One.\n2. Two."}]
+    assert "\n\n".join(iter_paragraphs(llm.stream(messages))) == llm.complete(messages)
@@ -0,0 +1,108 @@
+import json
+
+import numpy as np
+
+from app.vector_cache import VectorCache
+
+
+def test_roundtrip_through_memmap(tmp_path):
+    cache = VectorCache(tmp_path)
+    vecs = np.random.rand(3, 4).astype(np.float32)
+    cache.put_many(["a", "b", "c"], vecs)
+
+    reopened = VectorCache(tmp_path)
+    out, hits = reopened.get_many(["c", "missing", "a"])
+    assert hits.tolist() == [True, False, True]
+    assert np.allclose(out[0], vecs[2])
+    assert np.allclose(out[2], vecs[0])
+    assert not out[1].any()
+
+
+def test_appends_do_not_rewrite_existing_rows(tmp_path):
+    cache = VectorCache(tmp_path)
+    cache.put_many(["a"], np.ones((1, 4)))
+    size = cache.matrix_path.stat().st_size
+    cache.put_many(["b"], np.zeros((1, 4)))
+    assert cache.matrix_path.stat().st_size == 2 * size
+
+
+def test_lru_eviction_and_compaction(tmp_path):
+    cache = VectorCache(tmp_path, max_entries=2)
+    cache.put_many(["a", "b"], np.eye(2, 4))
+    cache.get_many(["a"])  # touch a so b is least recently used
+    cache.put_many(["c"], np.full((1, 4), 3.0))
+
+    assert "b" not in cache
+    out, hits = cache.get_many(["a", "c"])
+    assert hits.all()
+    assert np.allclose(out[1], 3.0)
+    assert cache.rows == 2
+
+
+def test_import_legacy_json(tmp_path):
+    legacy = tmp_path / "embeddings_cache.json"
+    legacy.write_text(json.dumps({"k1": [0.1, 0.2], "k2": [0.3, 0.4]}))
+    cache = VectorCache(tmp_path / "store")
+    assert cache.import_json(legacy) == 2
+    assert np.allclose(cache.get("k2"), [0.3, 0.4])
+
+
+def test_compaction_interrupted_before_index_flush_keeps_old_matrix(tmp_path):
+    cache = VectorCache(tmp_path, max_entries=None)
+    vecs = np.arange(16, dtype=np.float32).reshape(4, 4)
+    cache.put_many(["a", "b", "c", "d"], vecs)
+    cache.entries = {k: cache.entries[k] for k in ("b", "d")}
+
+    def crash():
+        raise OSError("disk full")
+    cache.flush = crash
+    try:
+        cache.compact()
+    except OSError:
+        pass
+
+    reopened = VectorCache(tmp_path, max_entries=None)
+    out, hits = reopened.get_many(["a", "b", "d"])
+    assert hits.all() and np.allclose(out, vecs[[0, 1, 3]])
+    assert sorted(p.name for p in tmp_path.glob("*.f32")) == ["embeddings.f32"]
+
+
+def test_compaction_swaps_matrix_files_after_index(tmp_path):
+    cache = VectorCache(tmp_path, max_entries=None)
+    vecs = np.arange(12, dtype=np.float32).reshape(3, 4)
+    cache.put_many(["a", "b", "c"], vecs)
+    del cache.entries["a"]
+    cache.compact()
+    assert cache.matrix_path.name == "embeddings.1.f32"
+
+    # a crash after the index flush leaves the old file behind; it is removed on load
+    (tmp_path / "embeddings.f32").write_bytes(b"stale")
+    reopened = VectorCache(tmp_path, max_entries=None)
+    assert np.allclose(reopened.get_many(["b", "c"])[0], vecs[1:])
+    assert [p.name for p in tmp_path.glob("*.f32")] == ["embeddings.1.f32"]
+
+
+def test_matrix_shorter_than_index_resets_cache(tmp_path):
+    cache = VectorCache(tmp_path)
+    cache.put_many(["a", "b"], np.ones((2, 4)))
+    with cache.matrix_path.open("r+b") as f:
+        f.truncate(16)
+
+    reopened = VectorCache(tmp_path)
+    assert len(reopened) == 0 and reopened.get("a") is None
+    reopened.put_many(["c"], np.full((1, 4), 2.0))
+    assert np.allclose(VectorCache(tmp_path).get("c"), 2.0)
+
+
+def test_lookups_do_not_rewrite_the_index_until_due(tmp_path):
+    cache = VectorCache(tmp_path, touch_flush_seconds=3600)
+    cache.put_many(["a"], np.ones((1, 4)))
+    written = cache.index_path.read_bytes()
+    used = cache.entries["a"]["last_used"] = 0.0
+
+    cache.get_many(["a"])
+    cache.flush()
+    assert cache.index_path.read_bytes() == written
+
+    cache.close()
+    assert json.loads(cache.index_path.read_text())["entries"]["a"]["last_used"] > used
@@ -0,0 +1,83 @@
+import os
+import time
+
+from dotenv import load_dotenv
+
+from app.mp3 import silent_frame
+from app.metrics import incr
+
+load_dotenv()
+
+TTS_MODEL = "gpt-4o-mini-tts"
+TTS_VOICE = "alloy"
+# the speech endpoint rejects inputs longer than this
+MAX_TTS_CHARS = 4096
+
+
+class OpenAITTSBackend:
+    """Synthesizes speech through the OpenAI audio API, streaming straight to disk."""
+
+    name = "openai"
+
+    def __init__(self, client=None, model=TTS_MODEL, voice=TTS_VOICE, rate_limiter=None):
+        from app.resources import get_openai_client, get_rate_limiter
+        self.client = client or get_openai_client()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.model = model
+        self.voice = voice
+
+    def synthesize(self, text: str, out_path: str) -> None:
+        self.rate_limiter.acquire()
+        incr("tts.calls")
+        incr("tts.characters", len(text))
+        with self.client.audio.speech.with_streaming_response.create(
+            model=self.model,
+            voice=self.voice,
+            input=text,
+            response_format="mp3",
+        ) as response:
+            response.stream_to_file(out_path)
+
+
+class LocalTTSBackend:
+    """
+    Offline stand-in for tests and benchmarks. Writes valid silent MP3 frames
+    whose duration matches how long the text would take to read aloud.
+    """
+
+    name = "local"
+    model = "local-silence"
+
+    def __init__(self, voice=TTS_VOICE, words_per_minute=150, delay=0.0):
+        self.voice = voice
+        self.words_per_minute = words_per_minute
+        self.delay = delay
+
+    def synthesize(self, text: str, out_path: str) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        incr("tts.calls")
+        incr("tts.characters", len(text))
+        seconds = len(text.split()) * 60 / self.words_per_minute
+        frames = max(1, round(seconds / 0.036))
+        frame = silent_frame()
+        with open(out_path, "wb") as f:
+            for _ in range(frames):
+                f.write(frame)
+
+
+def voice_key(name: str = None, voice: str = TTS_VOICE) -> str:
+    """Identifies a backend/model/voice whose speaking pace is tracked, without building the backend."""
+    name = name or os.getenv("PODCAST_TTS_BACKEND", "openai")
+    model = LocalTTSBackend.model if name == "local" else TTS_MODEL
+    return f"{name}:{model}:{voice}"
+
+
+def get_tts_backend(name: str = None, voice: str = TTS_VOICE):
+    """Pick a TTS backend from PODCAST_TTS_BACKEND (openai or local)."""
+    name = name or os.getenv("PODCAST_TTS_BACKEND", "openai")
+    if name == "local":
+        return LocalTTSBackend(voice=voice)
+    if name == "openai":
+        return OpenAITTSBackend(voice=voice)
+    raise ValueError(f"Unknown TTS backend: {name}")
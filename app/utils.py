@@ -1,15 +1,36 @@
-import json
 import os
+import atexit
+import threading
 
-CACHE_PATH = "cache/embeddings_cache.json"
+from app.vector_cache import VectorCache
 
-def load_cache():
-    if os.path.exists(CACHE_PATH):
-        with open(CACHE_PATH, "r") as f:
-            return json.load(f)
-    return {}
+CACHE_DIR = "cache"
+# the old single-file JSON cache, migrated into the vector store on first use
+LEGACY_CACHE_PATH = "cache/embeddings_cache.json"
 
-def save_cache(cache):
-    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
-    with open(CACHE_PATH, "w") as f:
-        json.dump(cache, f, indent=2)
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "50000"))
+EMBED_CACHE_MAX_AGE_DAYS = int(os.getenv("EMBED_CACHE_MAX_AGE_DAYS", "30"))
+
+_caches = {}
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(name: str = "embeddings") -> VectorCache:
+    """Open each embedding cache once per process; one cache per embedding space."""
+    with _cache_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = VectorCache(
+                CACHE_DIR,
+                name=name,
+                max_entries=EMBED_CACHE_MAX_ENTRIES,
+                max_age_days=EMBED_CACHE_MAX_AGE_DAYS,
+            )
+            # lookups only update last-used times in memory between periodic writes
+            atexit.register(cache.close)
+            # the legacy JSON cache only ever held the default OpenAI model's vectors
+            if name == "embeddings" and os.path.exists(LEGACY_CACHE_PATH):
+                migrated = cache.import_json(LEGACY_CACHE_PATH)
+                os.replace(LEGACY_CACHE_PATH, LEGACY_CACHE_PATH + ".migrated")
+                print(f"[CACHE] Migrated {migrated} embeddings from {LEGACY_CACHE_PATH}")
+        return cache
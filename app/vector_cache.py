@@ -0,0 +1,234 @@
+import os
+import re
+import json
+import time
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# last-used times from lookups alone reach disk at most this often (or on close);
+# new keys are always written at once
+TOUCH_FLUSH_SECONDS = 300
+
+
+class VectorCache:
+    """
+    Disk-backed embedding cache.
+
+    Vectors live in one contiguous float32 matrix file that is memory-mapped on
+    load and only ever appended to. A small JSON index maps each key to its row
+    and tracks when it was created and last used, which drives LRU/age eviction.
+    Compaction writes a new matrix file and the index names which file is live,
+    so a crash at any point leaves the index describing a complete matrix.
+    """
+
+    def __init__(self, directory, name="embeddings", max_entries=50_000, max_age_days=30,
+                 touch_flush_seconds=TOUCH_FLUSH_SECONDS):
+        self.directory = Path(directory)
+        self.name = name
+        self.index_path = self.directory / f"{name}.index.json"
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self.touch_flush_seconds = touch_flush_seconds
+
+        self._lock = threading.RLock()
+        self._matrix = None
+        self._dirty = False      # keys or rows changed; the index must be rewritten
+        self._touched = False    # only last_used changed; rewritten at most every touch_flush_seconds
+        self._flushed_at = time.monotonic()
+        self._load()
+        self.evict()
+
+    # ---------- persistence ----------
+
+    def _load(self):
+        self.dim = None
+        self.rows = 0
+        self.entries = {}
+        # compactions write {name}.<generation>.f32; caches never compacted use {name}.f32
+        self.matrix_path = self.directory / f"{self.name}.f32"
+        if self.index_path.exists():
+            try:
+                with self.index_path.open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.dim = data.get("dim")
+                self.rows = data.get("rows", 0)
+                self.entries = data.get("entries", {})
+                self.matrix_path = self.directory / data.get("matrix", self.matrix_path.name)
+            except json.JSONDecodeError:
+                self.entries = {}
+
+        # matrix files the index does not name are from a compaction interrupted before or after the swap
+        pattern = re.compile(re.escape(self.name) + r"(\.\d+)?\.f32")
+        if self.directory.exists():
+            for path in self.directory.iterdir():
+                if pattern.fullmatch(path.name) and path != self.matrix_path:
+                    path.unlink(missing_ok=True)
+
+        expected = self.rows * (self.dim or 0) * 4
+        size = self.matrix_path.stat().st_size if self.matrix_path.exists() else 0
+        if size < expected:
+            # the index names rows the file does not hold; reading them would return garbage
+            print(f"[CACHE] {self.matrix_path} is shorter than its index; starting an empty cache")
+            self.dim, self.rows, self.entries = None, 0, {}
+            self.matrix_path.unlink(missing_ok=True)
+            self._dirty = True
+        elif size > expected:
+            # drop rows that were appended but never made it into the index (crash mid-write)
+            with self.matrix_path.open("r+b") as f:
+                f.truncate(expected)
+
+    def _map(self):
+        if self._matrix is None and self.rows and self.dim:
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r",
+                                     shape=(self.rows, self.dim))
+        return self._matrix
+
+    def flush(self, force=False):
+        """
+        Write the key index to disk (the matrix is already appended in place)
+        if keys changed, or if lookups changed last-used times and the last
+        write is older than touch_flush_seconds (or force is set).
+        """
+        with self._lock:
+            due = force or time.monotonic() - self._flushed_at >= self.touch_flush_seconds
+            if not (self._dirty or (self._touched and due)):
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_path.with_suffix(".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim, "rows": self.rows, "matrix": self.matrix_path.name,
+                           "entries": self.entries}, f)
+            os.replace(tmp, self.index_path)
+            self._dirty = self._touched = False
+            self._flushed_at = time.monotonic()
+
+    def close(self):
+        """Write any pending last-used times."""
+        self.flush(force=True)
+
+    # ---------- lookups ----------
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get_many(self, keys):
+        """
+        Batched lookup. Returns (vectors, hit_mask) where vectors is a
+        (len(keys), dim) float32 array and rows for missing keys are zero.
+        """
+        with self._lock:
+            hit_mask = np.array([k in self.entries for k in keys], dtype=bool)
+            dim = self.dim or 0
+            vectors = np.zeros((len(keys), dim), dtype=np.float32)
+            if hit_mask.any():
+                now = time.time()
+                rows = []
+                for k in np.asarray(keys, dtype=object)[hit_mask]:
+                    entry = self.entries[k]
+                    entry["last_used"] = now
+                    rows.append(entry["row"])
+                vectors[hit_mask] = self._map()[rows]
+                self._touched = True
+            return vectors, hit_mask
+
+    def get(self, key):
+        vectors, hit = self.get_many([key])
+        return vectors[0] if hit[0] else None
+
+    # ---------- writes ----------
+
+    def put_many(self, keys, vectors):
+        """Append new vectors to the matrix file and index them in one write."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(keys):
+            return
+        if vectors.ndim != 2 or vectors.shape[0] != len(keys):
+            raise ValueError("vectors must be a 2-D array with one row per key")
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"expected {self.dim}-dim vectors, got {vectors.shape[1]}")
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self.matrix_path.open("ab") as f:
+                f.write(np.ascontiguousarray(vectors).tobytes())
+
+            now = time.time()
+            for i, key in enumerate(keys):
+                # overwritten keys leave a dead row behind; compaction reclaims it
+                self.entries[key] = {"row": self.rows + i, "created": now, "last_used": now}
+            self.rows += len(keys)
+            self._matrix = None
+            self._dirty = True
+
+            if self.max_entries and len(self.entries) > self.max_entries:
+                self.evict()
+            self.flush()
+
+    def put(self, key, vector):
+        self.put_many([key], np.asarray(vector, dtype=np.float32).reshape(1, -1))
+
+    # ---------- eviction ----------
+
+    def evict(self):
+        """Drop entries past max age, then least-recently-used ones over the size cap."""
+        with self._lock:
+            before = len(self.entries)
+            if self.max_age:
+                cutoff = time.time() - self.max_age
+                self.entries = {k: e for k, e in self.entries.items() if e["last_used"] >= cutoff}
+            if self.max_entries and len(self.entries) > self.max_entries:
+                keep = sorted(self.entries.items(), key=lambda kv: kv[1]["last_used"], reverse=True)
+                self.entries = dict(keep[: self.max_entries])
+            if len(self.entries) != before:
+                self._dirty = True
+
+            # rewrite the matrix once a quarter of it is dead rows
+            if self.rows and len(self.entries) < self.rows * 0.75:
+                self.compact()
+            self.flush()
+
+    def compact(self):
+        """
+        Rewrite the live rows into the next generation's matrix file, point
+        the index at it, and only then delete the old file.
+        """
+        with self._lock:
+            matrix = self._map()
+            items = sorted(self.entries.items(), key=lambda kv: kv[1]["row"])
+            generation = self.matrix_path.name[len(self.name) + 1:-len(".f32")]
+            old_path = self.matrix_path
+            new_path = self.directory / f"{self.name}.{int(generation or 0) + 1}.f32"
+            with new_path.open("wb") as f:
+                for key, entry in items:
+                    f.write(np.asarray(matrix[entry["row"]], dtype=np.float32).tobytes())
+            del matrix
+            self._matrix = None
+            for new_row, (key, entry) in enumerate(items):
+                entry["row"] = new_row
+            self.matrix_path = new_path
+            self.rows = len(items)
+            if not self.rows:
+                self.dim = None
+            self._dirty = True
+            self.flush()
+            old_path.unlink(missing_ok=True)
+
+    def import_json(self, path):
+        """One-off migration from the old {key: [floats]} JSON cache."""
+        path = Path(path)
+        if not path.exists():
+            return 0
+        with path.open("r") as f:
+            data = json.load(f)
+        keys = [k for k in data if k not in self.entries]
+        if keys:
+            self.put_many(keys, np.array([data[k] for k in keys], dtype=np.float32))
+        return len(keys)
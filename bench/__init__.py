@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the pipeline. Feeds, the OpenAI API and SMTP are
+replaced by local servers so runs are repeatable and cost nothing; see
+bench/run.py for the suite and bench/compare.py to diff two result files.
+"""
@@ -0,0 +1,61 @@
+"""
+Compare two benchmark result files and flag timings that got slower:
+
+    python -m bench.compare bench/results/<old>.json bench/results/<new>.json [--threshold 1.2]
+
+Exits with status 1 when any timing regressed past the threshold.
+"""
+import sys
+import json
+import argparse
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """Every timing ("..._s") in a results tree, keyed by its dotted path."""
+    out = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(flatten(value, f"{path}."))
+        elif key.endswith("_s") and isinstance(value, (int, float)):
+            out[path] = float(value)
+    return out
+
+
+def compare(old: dict, new: dict, threshold: float = 1.2) -> list:
+    """(path, old, new, ratio, regressed) for every timing present in both runs."""
+    before, after = flatten(old["results"]), flatten(new["results"])
+    rows = []
+    for path in sorted(before.keys() & after.keys()):
+        ratio = after[path] / before[path] if before[path] else float("inf")
+        # sub-millisecond timings are noise, never call them regressions
+        regressed = ratio > threshold and after[path] - before[path] > 0.001
+        rows.append((path, before[path], after[path], ratio, regressed))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two bench result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    rows = compare(old, new, args.threshold)
+    print(f"{old['commit']} → {new['commit']}")
+    print(f"{'timing':<40}{'old':>10}{'new':>10}{'ratio':>8}")
+    for path, before, after, ratio, regressed in rows:
+        flag = "  REGRESSED" if regressed else ""
+        print(f"{path:<40}{before:>9.3f}s{after:>9.3f}s{ratio:>7.2f}x{flag}")
+    regressions = sum(r[4] for r in rows)
+    print(f"\n{regressions} regression(s) over {args.threshold:.2f}x")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
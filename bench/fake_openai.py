@@ -0,0 +1,158 @@
+import json
+import time
+import base64
+import hashlib
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from app.llm import FakeLLMBackend
+from app.mp3 import silent_frame
+from app.neardup import _WORD
+
+DEFAULT_LATENCY = {"embeddings": 0.05, "chat": 0.3, "speech": 0.2}
+
+
+@lru_cache(maxsize=50_000)
+def _word_vector(word: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "big")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def fake_embedding(text: str, dim: int) -> np.ndarray:
+    """Bag-of-words vector, so texts sharing words land close together like real embeddings."""
+    words = _WORD.findall(text.lower()) or ["empty"]
+    v = np.sum([_word_vector(w, dim) for w in words], axis=0)
+    return v / (np.linalg.norm(v) or 1.0)
+
+
+class FakeOpenAIServer:
+    """
+    Local stand-in for the OpenAI endpoints the pipeline calls: embeddings,
+    chat completions (plain and streamed) and speech. Each endpoint sleeps
+    for its configured latency, and the chat stream spreads chat_stream
+    seconds over its chunks. Point the SDK at it with base_url (or
+    OPENAI_BASE_URL=server.base_url).
+    """
+
+    def __init__(self, latency: dict = None, dim: int = 1536, chat_stream: float = 1.0,
+                 words_per_minute: int = 150):
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.dim = dim
+        self.chat_stream = chat_stream
+        self.words_per_minute = words_per_minute
+        self.requests = {"embeddings": 0, "chat": 0, "speech": 0}
+        self._lock = threading.Lock()
+        self._llm = FakeLLMBackend()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, endpoint: str) -> None:
+        with self._lock:
+            self.requests[endpoint] += 1
+        if self.latency.get(endpoint):
+            time.sleep(self.latency[endpoint])
+
+    def embeddings(self, body: dict) -> dict:
+        self._count("embeddings")
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_embedding(text, self.dim)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode()
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(t) // 4 + 1 for t in inputs)
+        return {"object": "list", "data": data, "model": body.get("model"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    def chat(self, body: dict):
+        self._count("chat")
+        text = self._llm.respond(body["messages"][-1]["content"])
+        prompt_tokens = sum(len(m["content"]) // 4 + 1 for m in body["messages"])
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(text) // 4 + 1,
+                 "total_tokens": prompt_tokens + len(text) // 4 + 1}
+        base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body.get("model")}
+        if not body.get("stream"):
+            return {**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]}
+
+        def chunks():
+            pieces = [text[i:i + 24] for i in range(0, len(text), 24)]
+            for piece in pieces:
+                time.sleep(self.chat_stream / len(pieces))
+                yield {**base, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            yield {**base, "object": "chat.completion.chunk", "choices": [
+                {"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield {**base, "object": "chat.completion.chunk", "choices": [], "usage": usage}
+        return chunks()
+
+    def speech(self, body: dict) -> bytes:
+        self._count("speech")
+        seconds = len(body["input"].split()) * 60 / self.words_per_minute
+        return silent_frame() * max(1, round(seconds / 0.036))
+
+    def _handler(self):
+        fake = self
+        routes = {"/v1/embeddings": fake.embeddings, "/v1/chat/completions": fake.chat,
+                  "/v1/audio/speech": fake.speech}
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                route = routes.get(self.path.split("?")[0])
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if route is None:
+                    return self._send(404, b'{"error": {"message": "not found"}}', "application/json")
+                result = route(body)
+                if isinstance(result, bytes):
+                    self._send(200, result, "audio/mpeg")
+                elif isinstance(result, dict):
+                    self._send(200, json.dumps(result).encode(), "application/json")
+                else:
+                    self._stream(result)
+
+            def _send(self, status: int, data: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, events):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for event in events:
+                    self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+                self._chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
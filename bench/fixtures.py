@@ -0,0 +1,124 @@
+import zlib
+import threading
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+TOPICS = [
+    ("AI", ["model", "chips", "startup", "regulators", "training", "benchmark", "open", "weights"]),
+    ("technology", ["smartphone", "launch", "battery", "privacy", "app", "store", "update", "cloud"]),
+    ("U.S.", ["senate", "budget", "shutdown", "airports", "flights", "vote", "governor", "court"]),
+    ("economy", ["inflation", "rates", "jobs", "report", "markets", "bonds", "earnings", "oil"]),
+]
+FILLER = ("officials said on monday that the plan would move ahead after weeks of talks "
+          "while analysts expect further details later this week").split()
+
+
+def make_articles(n: int, rewrites: int = 3, seed: int = 0) -> list:
+    """
+    n synthetic (title, summary) pairs. Every story is told `rewrites` times
+    with light wording changes, like the same wire story on several outlets.
+    """
+    rng = np.random.default_rng(seed)
+    articles = []
+    story = 0
+    while len(articles) < n:
+        keyword, vocab = TOPICS[story % len(TOPICS)]
+        words = list(rng.choice(vocab, size=4, replace=False))
+        base = [keyword, *words, f"story{story}", *rng.choice(FILLER, size=24)]
+        for r in range(rewrites):
+            if len(articles) == n:
+                break
+            text = list(base)
+            for i in rng.choice(len(text), size=2, replace=False):
+                text[i] = str(rng.choice(FILLER))
+            title = f"{keyword} {words[0]} {words[1]} story {story}" + (f" update {r}" if r else "")
+            articles.append((title, " ".join(text).capitalize() + "."))
+        story += 1
+    return articles
+
+
+def make_embeddings(n: int, dim: int = 384, stories: int = None, noise: float = 0.3, seed: int = 0):
+    """n unit vectors scattered around `stories` centres (n // 4 by default)."""
+    rng = np.random.default_rng(seed)
+    stories = stories or max(1, n // 4)
+    centres = rng.standard_normal((stories, dim)).astype(np.float32)
+    x = centres[rng.integers(0, stories, size=n)] + noise * rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def render_rss(items, link_prefix: str, now: datetime = None) -> bytes:
+    now = now or datetime.now(timezone.utc)
+    body = "".join(
+        f"<item><title>{escape(title)}</title><link>{link_prefix}/{i}</link>"
+        f"<description>{escape(summary)}</description>"
+        f"<pubDate>{format_datetime(now - timedelta(minutes=i))}</pubDate></item>"
+        for i, (title, summary) in enumerate(items)
+    )
+    return (f'<?xml version="1.0"?><rss version="2.0"><channel><title>bench</title>'
+            f"{body}</channel></rss>").encode()
+
+
+class RSSServer:
+    """
+    Serves synthetic feeds at /feed/<n>.xml with ETags, so a second fetch of
+    an unchanged feed is answered 304 like a real publisher would.
+    """
+
+    def __init__(self, feeds: int = 20, items_per_feed: int = 50, latency: float = 0.0, seed: int = 0):
+        articles = make_articles(feeds * items_per_feed, seed=seed)
+        self.latency = latency
+        self.bodies = {}
+        for f in range(feeds):
+            items = articles[f::feeds]
+            self.bodies[f"/feed/{f}.xml"] = render_rss(items, f"http://bench.local/{f}")
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+
+    def _handler(self):
+        bench = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body = bench.bodies.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if bench.latency:
+                    threading.Event().wait(bench.latency)
+                etag = f'"{zlib.crc32(body):x}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @property
+    def urls(self) -> list:
+        return [f"http://127.0.0.1:{self.server.server_port}{path}" for path in self.bodies]
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
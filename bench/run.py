@@ -0,0 +1,289 @@
+"""
+Run the offline benchmark suite and write the results to a JSON file:
+
+    python -m bench.run                      # everything, results in bench/results/<commit>.json
+    python -m bench.run --quick              # smaller sizes for a fast check
+    python -m bench.run --only cluster,rank --sizes 1000,10000,100000
+    python -m bench.compare bench/results/abc123.json bench/results/def456.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timezone
+
+import numpy as np
+
+from bench.fixtures import RSSServer, make_articles, make_embeddings
+from bench.fake_openai import FakeOpenAIServer
+from bench.smtp_sink import SMTPSink
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+QUICK_SIZES = (1_000, 10_000)
+
+
+@contextmanager
+def workdir():
+    """Run in a fresh directory so data/, cache/ and output/ start empty and the repo is untouched."""
+    from app import resources, utils, audio_cache
+    previous = os.getcwd()
+    path = tempfile.mkdtemp(prefix="podcast_bench_")
+    os.chdir(path)
+    resources.reset()
+    utils._caches.clear()
+    audio_cache._cache = None
+    try:
+        yield path
+    finally:
+        os.chdir(previous)
+        resources.reset()
+        utils._caches.clear()
+        audio_cache._cache = None
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@contextmanager
+def openai_env(server: FakeOpenAIServer):
+    saved = {k: os.environ.get(k) for k in ("OPENAI_BASE_URL", "OPENAI_API_KEY")}
+    os.environ.update(OPENAI_BASE_URL=server.base_url, OPENAI_API_KEY="bench")
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _client(server: FakeOpenAIServer):
+    from openai import OpenAI
+    return OpenAI(base_url=server.base_url, api_key="bench", max_retries=0)
+
+
+def _unlimited():
+    from app.ratelimit import RateLimiter
+    return RateLimiter(rate=0)
+
+
+def _timed(fn, repeat: int = 1) -> float:
+    """Best wall time of `repeat` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best, 4)
+
+
+def bench_ingest(feeds: int = 20, items: int = 50, feed_latency: float = 0.05) -> dict:
+    """Cold ingest of synthetic feeds (fetch, dedup, Chroma upsert), then an all-304 rerun."""
+    from app.ingest import ingest_articles
+
+    with workdir(), RSSServer(feeds, items, latency=feed_latency) as rss, \
+            FakeOpenAIServer(latency={"embeddings": 0.05}) as api, openai_env(api):
+        start = time.perf_counter()
+        stored = ingest_articles(limit_per_feed=items, user="bench", feeds=rss.urls)
+        cold = time.perf_counter() - start
+        warm = _timed(lambda: ingest_articles(limit_per_feed=items, user="bench", feeds=rss.urls))
+        return {"feeds": feeds, "items": feeds * items, "stored": stored, "cold_s": round(cold, 4),
+                "unchanged_s": warm, "embedding_requests": api.requests["embeddings"]}
+
+
+def bench_rank(sizes, dim: int = 384) -> dict:
+    """rank_candidates over n stored vectors, with and without the title rerank signal."""
+    from app.rank import rank_candidates
+
+    out = {}
+    for n in sizes:
+        docs = make_embeddings(n, dim)
+        titles = make_embeddings(n, dim, seed=1)
+        query = docs[0]
+        out[str(n)] = {
+            "docs_s": _timed(lambda: rank_candidates(query, docs, top_k=7), repeat=3),
+            "docs_titles_s": _timed(lambda: rank_candidates(query, docs, titles, title_weight=0.3, top_k=7),
+                                    repeat=3),
+        }
+    return out
+
+
+def bench_cluster(sizes, dim: int = 384, daily: int = 500) -> dict:
+    """cluster_articles at each size, and assigning one day's articles to a story index of that size."""
+    from app.cluster import cluster_articles, StoryIndex
+
+    out = {}
+    for n in sizes:
+        x = make_embeddings(n, dim)
+        start = time.perf_counter()
+        clusters = cluster_articles(x, list(range(n)))
+        seconds = time.perf_counter() - start
+
+        index = StoryIndex(path=None)
+        index.assign(x)
+        new = make_embeddings(daily, dim, seed=2)
+        out[str(n)] = {"cluster_s": round(seconds, 4), "clusters": len(clusters), "stories": len(index),
+                       "assign_daily_s": _timed(lambda: index.assign(new))}
+    return out
+
+
+def bench_summarize(articles: int = 60, latency: float = 0.3) -> dict:
+    """Map-step fan-out: sequential shards vs the configured concurrency, against a slow chat endpoint."""
+    from app.llm import OpenAIChatBackend
+    from app.summarize import summarize_articles, SUMMARIZE_CONCURRENCY
+
+    items = [{"title": t, "source": "bench", "text": s * 8} for t, s in make_articles(articles)]
+    with FakeOpenAIServer(latency={"chat": latency}) as api:
+        llm = OpenAIChatBackend(client=_client(api), rate_limiter=_unlimited())
+        sequential = _timed(lambda: summarize_articles(items, llm, concurrency=1))
+        calls = api.requests["chat"]
+        concurrent = _timed(lambda: summarize_articles(items, llm, concurrency=SUMMARIZE_CONCURRENCY))
+    return {"articles": articles, "shards": calls, "concurrency": SUMMARIZE_CONCURRENCY,
+            "sequential_s": sequential, "concurrent_s": concurrent}
+
+
+def bench_tts(chunks: int = 24, latency: float = 0.2) -> dict:
+    """Chunked TTS and in-order MP3 assembly, one worker vs the configured pool."""
+    from app.mp3 import duration
+    from app.speak import synthesize_chunks, TTS_CONCURRENCY
+    from app.tts import OpenAITTSBackend
+
+    texts = [f"{t}. {s}" for t, s in make_articles(chunks)]
+    with workdir(), FakeOpenAIServer(latency={"speech": latency}) as api:
+        backend = OpenAITTSBackend(client=_client(api), rate_limiter=_unlimited())
+        sequential = _timed(lambda: synthesize_chunks(texts, "seq.mp3", backend=backend, max_workers=1))
+        concurrent = _timed(lambda: synthesize_chunks(texts, "par.mp3", backend=backend))
+        with open("par.mp3", "rb") as f:
+            seconds_of_audio = duration(f.read())
+    return {"chunks": chunks, "workers": TTS_CONCURRENCY, "audio_seconds": round(seconds_of_audio, 1),
+            "sequential_s": sequential, "concurrent_s": concurrent}
+
+
+def bench_stream(stories: int = 12, chat_stream: float = 2.0, latency: float = 0.2) -> dict:
+    """Script completion then TTS, vs streaming paragraphs into TTS while the script is written."""
+    from app.llm import OpenAIChatBackend, iter_paragraphs
+    from app.speak import synthesize_chunks, split_script
+    from app.tts import OpenAITTSBackend
+
+    context = "\n".join(f"{i}. {t}: {s}" for i, (t, s) in enumerate(make_articles(stories), 1))
+    messages = [{"role": "user", "content": context}]
+    with workdir(), FakeOpenAIServer(latency={"chat": 0.0, "speech": latency}, chat_stream=chat_stream) as api:
+        llm = OpenAIChatBackend(client=_client(api), rate_limiter=_unlimited())
+        backend = OpenAITTSBackend(client=_client(api), rate_limiter=_unlimited())
+
+        def sequential():
+            script = "".join(llm.stream(messages))
+            synthesize_chunks(split_script(script), "seq.mp3", backend=backend)
+
+        first_audio = {}
+
+        def streamed():
+            start = time.perf_counter()
+
+            def chunks():
+                for paragraph in iter_paragraphs(llm.stream(messages)):
+                    yield from split_script(paragraph)
+                    if "s" not in first_audio and os.path.exists("stream.mp3.part") \
+                            and os.path.getsize("stream.mp3.part"):
+                        first_audio["s"] = round(time.perf_counter() - start, 4)
+
+            synthesize_chunks(chunks(), "stream.mp3", backend=backend)
+
+        return {"stories": stories, "sequential_s": _timed(sequential), "streamed_s": _timed(streamed),
+                "streamed_first_audio_s": first_audio.get("s")}
+
+
+def bench_delivery(megabytes: int = 8, fanout: int = 20, latency: float = 0.0) -> dict:
+    """
+    One episode email with an MP3 attachment, then the same episode fanned out
+    to `fanout` recipients, sent to the local SMTP sink over a pooled session.
+    """
+    from app.delivery import SMTPPool, send_episodes
+
+    with workdir(), SMTPSink(latency=latency) as sink:
+        pool = SMTPPool(user="bench@localhost", password="x", host=sink.host, port=sink.port, starttls=False)
+        with open("episode.mp3", "wb") as f:
+            f.write(os.urandom(megabytes * 1024 * 1024))
+        one = [{"path": "episode.mp3", "to": ["me@localhost"]}]
+        many = [{"path": "episode.mp3", "to": [f"user{i}@localhost"]} for i in range(fanout)]
+
+        seconds = _timed(lambda: send_episodes(one, pool=pool))
+        batch_seconds = _timed(lambda: send_episodes(many, pool=pool))
+        pool.close()
+        return {"attachment_mb": megabytes, "messages": len(sink.messages), "sessions": sink.sessions,
+                "send_s": seconds, "fanout": fanout, "fanout_s": batch_seconds}
+
+
+BENCHMARKS = {
+    "ingest": lambda a: bench_ingest(*((10, 20) if a.quick else (20, 50))),
+    "rank": lambda a: bench_rank(a.sizes),
+    "cluster": lambda a: bench_cluster(a.sizes),
+    "summarize": lambda a: bench_summarize(30 if a.quick else 60),
+    "tts": lambda a: bench_tts(12 if a.quick else 24),
+    "stream": lambda a: bench_stream(6 if a.quick else 12),
+    "delivery": lambda a: bench_delivery(*((2, 5) if a.quick else (8, 20))),
+}
+
+
+def git_commit() -> tuple:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks")
+    parser.add_argument("--only", type=str, default=None, help=f"Comma-separated subset of {','.join(BENCHMARKS)}")
+    parser.add_argument("--sizes", type=str, default=None, help="Article counts for rank/cluster")
+    parser.add_argument("--quick", action="store_true", help="Smaller workloads, skips the 100k sizes")
+    parser.add_argument("--out", type=str, default=None, help="Results file (default bench/results/<commit>.json)")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own log output")
+    args = parser.parse_args(argv)
+    args.sizes = tuple(int(s) for s in args.sizes.split(",")) if args.sizes else \
+        (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    return args
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    commit, dirty = git_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+        "numpy": np.__version__,
+        "quick": args.quick,
+        "results": {},
+    }
+    for name in names:
+        print(f"[BENCH] {name}...", flush=True)
+        quiet = io.StringIO()
+        with (redirect_stdout(sys.stdout) if args.verbose else redirect_stdout(quiet)):
+            report["results"][name] = BENCHMARKS[name](args)
+        print(f"[BENCH] {name}: {json.dumps(report['results'][name])}")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[BENCH] Results written to {out}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
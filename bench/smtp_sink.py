@@ -0,0 +1,89 @@
+import time
+import threading
+import socketserver
+
+
+class SMTPSink:
+    """
+    Minimal SMTP server that accepts any login and keeps every message in
+    memory. It speaks enough of the protocol for smtplib (EHLO, AUTH PLAIN,
+    MAIL, RCPT, DATA, RSET, NOOP, QUIT) but not STARTTLS, so point delivery at
+    it with SMTP_STARTTLS=0. latency delays each reply, like a remote server.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.messages = []    # {"from", "to", "data"} per accepted message
+        self.sessions = 0
+        self._lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def host(self) -> str:
+        return "127.0.0.1"
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                if sink.latency:
+                    time.sleep(sink.latency)
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                with sink._lock:
+                    sink.sessions += 1
+                self.reply("220 bench SMTP sink")
+                sender, recipients = None, []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode(errors="replace").strip()
+                    verb = command.split(" ", 1)[0].upper()
+                    if verb == "EHLO":
+                        self.wfile.write(b"250-bench\r\n250-AUTH PLAIN\r\n250-8BITMIME\r\n")
+                        self.reply("250 SIZE 104857600")
+                    elif verb == "HELO":
+                        self.reply("250 bench")
+                    elif verb == "AUTH":
+                        self.reply("235 2.7.0 Authentication successful")
+                    elif verb == "MAIL":
+                        sender, recipients = command.split(":", 1)[1].strip(), []
+                        self.reply("250 OK")
+                    elif verb == "RCPT":
+                        recipients.append(command.split(":", 1)[1].strip())
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        data = bytearray()
+                        for raw in iter(self.rfile.readline, b""):
+                            if raw in (b".\r\n", b".\n"):
+                                break
+                            data.extend(raw[1:] if raw.startswith(b"..") else raw)
+                        with sink._lock:
+                            sink.messages.append({"from": sender, "to": recipients, "data": bytes(data)})
+                        self.reply("250 OK queued")
+                    elif verb in ("RSET", "NOOP"):
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+        return Handler
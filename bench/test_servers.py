@@ -0,0 +1,44 @@
+import numpy as np
+from openai import OpenAI
+
+from app import delivery
+from app.llm import OpenAIChatBackend, iter_paragraphs
+from app.ratelimit import RateLimiter
+from bench.compare import compare
+from bench.fake_openai import FakeOpenAIServer
+from bench.smtp_sink import SMTPSink
+
+
+def test_fake_openai_serves_the_sdk():
+    with FakeOpenAIServer(latency={"embeddings": 0, "chat": 0, "speech": 0}, dim=64, chat_stream=0) as api:
+        client = OpenAI(base_url=api.base_url, api_key="bench", max_retries=0)
+        data = client.embeddings.create(input=["AI chips story", "AI chips story update"],
+                                        model="text-embedding-3-small").data
+        a, b = (np.array(d.embedding) for d in data)
+        assert len(a) == 64 and a @ b > 0.8
+
+        llm = OpenAIChatBackend(client=client, rate_limiter=RateLimiter(rate=0))
+        messages = [{"role": "user", "content": "1. One.\n2. Two."}]
+        assert "\n\n".join(iter_paragraphs(llm.stream(messages))) == llm.complete(messages)
+        assert api.requests["chat"] == 2
+
+
+def test_smtp_sink_receives_delivery(tmp_path, monkeypatch):
+    episode = tmp_path / "episode.mp3"
+    episode.write_bytes(b"\xff\xfb" * 1000)
+    with SMTPSink() as sink:
+        monkeypatch.setattr(delivery, "SMTP_HOST", sink.host)
+        monkeypatch.setattr(delivery, "SMTP_PORT", sink.port)
+        monkeypatch.setattr(delivery, "SMTP_STARTTLS", False)
+        for key, value in {"EMAIL_USER": "a@localhost", "EMAIL_PASS": "x", "RECIPIENT_EMAIL": "b@localhost"}.items():
+            monkeypatch.setenv(key, value)
+        delivery.send_email(str(episode))
+    assert len(sink.messages) == 1
+    assert b"episode.mp3" in sink.messages[0]["data"]
+
+
+def test_compare_flags_only_real_slowdowns():
+    old = {"results": {"tts": {"concurrent_s": 1.0, "chunks": 24}, "rank": {"1000": {"docs_s": 0.0002}}}}
+    new = {"results": {"tts": {"concurrent_s": 1.5, "chunks": 24}, "rank": {"1000": {"docs_s": 0.0004}}}}
+    rows = {path: regressed for path, _, _, _, regressed in compare(old, new)}
+    assert rows == {"tts.concurrent_s": True, "rank.1000.docs_s": False}
@@ -2,10 +2,7 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 
-from app.ingest import ingest_articles
-from app.reason import generate_podcast_script
-from app.speak import text_to_speech
-from app.delivery import send_email
+from app.pipeline import run_episode, run_batch
 import argparse
 
 load_dotenv()
@@ -13,37 +10,36 @@ load_dotenv()
 def parse_args():
     parser = argparse.ArgumentParser(description="Run the news-to-podcast pipeline")
     parser.add_argument("--user", type=str, default="default", help="User feed set (default, rohit, etc.)")
+    parser.add_argument("--all-users", action="store_true",
+                        help="Ingest every user's feeds once and build all episodes in parallel")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel episodes in --all-users mode")
+    parser.add_argument("--stream", action="store_true",
+                        help="Narrate the script paragraph by paragraph while it is being written")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue today's failed run for this user from its last finished stage")
     return parser.parse_args()
 
 
-def main(user="default"):
+def main(user="default", stream=False, resume=False):
     print("DAILY PODCAST PIPELINE")
     print(f"Run started: {datetime.now()}\n")
     print(f"User: {user}")
 
-    print("Step 1: Ingesting latest news...")
-    article_count = ingest_articles(limit_per_feed=20, user=user)
-    print(f"→ Ingested {article_count} articles.\n")
-
-    if article_count == 0:
-        print("No new articles — switching to recap mode.\n")
-        recap = True
-    else:
-        recap = False
-
-
-    print("Step 2: Generating podcast script...")
-    script = generate_podcast_script(max_minutes=10, recap=recap)
-    print("→ Script generated successfully.\n")
+    run_episode(user=user, minutes=10, limit_per_feed=20, deliver=True, stream=stream, resume=resume)
+    print("\nAll steps complete. Podcast saved in ./output/")
 
-    print("Step 3: Generating audio file...")
-    file_path = text_to_speech(script, user) # capture the returned path
 
-    print("Step 4: Sending email...")
-    send_email(file_path, subject=f"{user.title()}'s Daily News Podcast")
+def main_all_users(workers=None):
+    print("DAILY PODCAST PIPELINE (all users)")
+    print(f"Run started: {datetime.now()}\n")
 
-    print("\nAll steps complete. Podcast saved in ./output/")
+    kwargs = {"max_workers": workers} if workers else {}
+    run_batch(minutes=10, limit_per_feed=20, deliver=True, **kwargs)
+    print("\nAll steps complete. Podcasts saved in ./output/")
 
 if __name__ == "__main__":
     args = parse_args()
-    main(user=args.user)
+    if args.all_users:
+        main_all_users(workers=args.workers)
+    else:
+        main(user=args.user, stream=args.stream, resume=args.resume)